@@ -8,6 +8,7 @@ from collections.abc import Awaitable, Callable, Coroutine
 from typing import Any
 
 from .protocol import (
+    COMMAND_REJECTED_EVENT_TYPE,
     AuthErrorMessage,
     AuthErrorPayload,
     CommandAck,
@@ -47,6 +48,18 @@ def get_persona_data() -> str | None:
     return _PERSONA_DESCRIPTION
 
 
+_COMMAND_JOURNAL_DIR: str | None = None
+
+
+def set_command_journal_dir(path: str | None) -> None:
+    global _COMMAND_JOURNAL_DIR
+    _COMMAND_JOURNAL_DIR = (path or "").strip() or None
+
+
+def get_command_journal_dir() -> str | None:
+    return _COMMAND_JOURNAL_DIR
+
+
 ReflectLLMCallback = Callable[[str], Awaitable[Any]]
 _REFLECTION_LLM_CALLBACK: ReflectLLMCallback | None = None
 
@@ -70,14 +83,25 @@ except Exception as e:  # pragma: no cover
 
 from .astrtown_event import AstrTownMessageEvent
 from .id_util import new_id
-from .components.command_channel import CommandChannel
+from .config_snapshot import AdapterConfigSnapshot, config_fingerprint
+from .timer_wheel import ExpiringDict
+from .components.command_channel import CommandChannel, CommandHandle
+from .components.command_journal import CommandJournal
+from .components.latency_tracker import CommandLatencyTracker
+from .components.ws_writer import WsFrameWriter
+from .components.flow_credit import FlowCreditController
 from .components.event_ack_sender import EventAckSender
 from .components.event_text_formatter import EventTextFormatter
 from .components.gateway_http_client import GatewayHttpClient
+from .components.memory_search_cache import MemorySearchCache
+from .components.social_state_cache import SocialStateCache
+from .components.context_enrichment_stats import ContextEnrichmentStats
+from .components.transcript_buffer import ConversationTranscriptBuffer
 from .components.reflection_orchestrator import ReflectionOrchestrator
 from .components.reflection_parser import ReflectionParser
 from .components.session_context import SessionContextService
 from .components.world_event_dispatcher import WorldEventDispatcher
+from .components.ws_ingress import WsIngressQueue
 from .components.ws_lifecycle import WsLifecycleService
 from .components.ws_message_router import WsMessageRouter
 
@@ -105,6 +129,11 @@ class AstrTownAdapter(Platform):
 
         self.settings = platform_settings
 
+        # 热路径配置快照：组件只读 self._cfg，配置变化时整体替换（见 _refresh_config_snapshot）。
+        self._cfg = AdapterConfigSnapshot.from_config(platform_config)
+        self._cfg_fingerprint = config_fingerprint(platform_config)
+        self._cfg_last_check_ts: float = time.monotonic()
+
         # 方案C：adapter 侧兜底计数器（按 session_id 统计事件数量）
         self._session_event_count: dict[str, int] = {}
 
@@ -115,15 +144,17 @@ class AstrTownAdapter(Platform):
         # 3.4：维护当前会话对方 player_id，供插件侧张力 Prompt 注入使用。
         self._conversation_partner_id: str | None = None
 
-        # conversation.started 幂等去重：conversationId -> 最近处理时间(ms)
-        self._conversation_started_recent_ms: dict[str, int] = {}
+        # 以下短期状态均由时间轮到期清理（写入 O(1)，无需全量扫描），并设容量上限。
+        # 世界事件去重（处理器声明 dedupe_key，如 conversation.started）："eventType:key" -> 最近处理时间(ms)
+        self._conversation_started_recent_ms: ExpiringDict[str, int] = ExpiringDict(max_size=4096)
 
         # command.say 防抖状态："agentId:conversationId" -> 最近发送状态
-        self._say_debounce_state: dict[str, dict[str, Any]] = {}
+        self._say_debounce_state: ExpiringDict[str, dict[str, Any]] = ExpiringDict(max_size=4096)
 
-        # command ACK 竞态缓冲：记录“已超时”的 commandId，供迟到 ACK 识别。
-        # value 为过期时间戳(秒, time.time())。
-        self._recent_timed_out_commands: dict[str, float] = {}
+        # command ACK 竞态缓冲：记录“已超时”的 commandId（tombstone），供迟到 ACK 识别。
+        self._recent_timed_out_commands: ExpiringDict[str, bool] = ExpiringDict(max_size=4096)
+        # 超时的 command.respond_relationship：commandId -> 社交缓存键，迟到 ACK 到达时再次失效。
+        self._relationship_late_watch: ExpiringDict[str, tuple[str, str]] = ExpiringDict(max_size=256)
 
         self.gateway_url = str(
             platform_config.get("astrtown_gateway_url", "http://localhost:40010")
@@ -138,7 +169,7 @@ class AstrTownAdapter(Platform):
 
         # Internal hard-coded protocol details: do not expose as user config.
         self.subscribe = "*"
-        self.protocol_version_range = "1-1"
+        self.protocol_version_range = "1-4"
 
         self.reconnect_min_delay = self._safe_int(
             platform_config.get("astrtown_ws_reconnect_min_delay", 1),
@@ -191,20 +222,49 @@ class AstrTownAdapter(Platform):
         # --- 组件实例化（组合模式） ---
         self._session_ctx = SessionContextService(self)
         self._text_formatter = EventTextFormatter(self)
-        self._ack_sender = EventAckSender(self)
+        self._ws_writer = WsFrameWriter(self)
+        self._ack_sender = EventAckSender(self, self._ws_writer)
+        self._flow_credit = FlowCreditController(self, self._ws_writer)
         self._http_client = GatewayHttpClient(self)
         self._reflection_parser = ReflectionParser(self)
-        self._reflection_orch = ReflectionOrchestrator(self, self._reflection_parser, self._http_client)
-        self._cmd_channel = CommandChannel(self)
+        self._memory_cache = MemorySearchCache(self, self._http_client)
+        self._social_cache = SocialStateCache(self, self._http_client)
+        self._enrichment_stats = ContextEnrichmentStats(self)
+        self._reflection_orch = ReflectionOrchestrator(
+            self, self._reflection_parser, self._http_client, self._memory_cache, self._social_cache
+        )
+        self._cmd_journal = CommandJournal(self, get_command_journal_dir)
+        self._cmd_latency = CommandLatencyTracker(self)
+        self._transcripts = ConversationTranscriptBuffer(self)
+        self._cmd_channel = CommandChannel(
+            self, self._cmd_journal, self._cmd_latency, self._ws_writer, self._transcripts
+        )
         self._event_dispatcher = WorldEventDispatcher(
             self,
             self._ack_sender,
             self._session_ctx,
             self._text_formatter,
             self._reflection_orch,
+            self._cmd_latency,
+            self._flow_credit,
+            self._social_cache,
+            self._transcripts,
         )
-        self._msg_router = WsMessageRouter(self, self._http_client, self._event_dispatcher)
-        self._ws_lifecycle = WsLifecycleService(self, self._msg_router)
+        self._ingress = WsIngressQueue(
+            self, self._event_dispatcher, self._session_ctx, self._ack_sender, self._flow_credit
+        )
+        self._msg_router = WsMessageRouter(
+            self,
+            self._http_client,
+            self._event_dispatcher,
+            self._ingress,
+            self._ws_writer,
+            self._flow_credit,
+            self._transcripts,
+        )
+        self._ws_lifecycle = WsLifecycleService(self, self._msg_router, self._ws_writer)
+        self._cmd_channel.set_rejection_listener(self._surface_command_rejection)
+        self._cmd_channel.set_completion_listener(self._on_command_completed)
 
     def meta(self) -> PlatformMetadata:
         return self._metadata
@@ -237,6 +297,12 @@ class AstrTownAdapter(Platform):
                 fut.cancel()
         self._pending_commands.clear()
 
+        await self._ingress.stop()
+        self._ws_writer.stop()
+        await self._http_client.close()
+        # 取消后台任务前写完命令日志的 done 记录，避免重启后多一次（被 Gateway 去重的）重放。
+        await self._cmd_journal.flush()
+
         current_task = asyncio.current_task()
         tasks_to_cancel = [
             t for t in list(self._tasks) if not t.done() and t is not current_task
@@ -265,6 +331,24 @@ class AstrTownAdapter(Platform):
 
         task.add_done_callback(_cleanup)
 
+    def _refresh_config_snapshot(self) -> None:
+        """检测配置是否变化；变化时重新解析并原子替换快照。"""
+        self._cfg_last_check_ts = time.monotonic()
+        fingerprint = config_fingerprint(self.config)
+        if fingerprint == self._cfg_fingerprint:
+            return
+        old_cfg = self._cfg
+        new_cfg = AdapterConfigSnapshot.from_config(self.config)
+        self._cfg = new_cfg
+        self._cfg_fingerprint = fingerprint
+        changed = [
+            name
+            for name in new_cfg.__dataclass_fields__
+            if getattr(new_cfg, name) != getattr(old_cfg, name)
+        ]
+        if changed:
+            logger.info(f"[AstrTown] 配置已更新，新快照已生效: changed={','.join(changed)}")
+
     def get_binding(self) -> dict[str, str | int | None]:
         return {
             "agentId": self._agent_id,
@@ -274,9 +358,91 @@ class AstrTownAdapter(Platform):
             "protocolVersion": self._negotiated_version,
         }
 
+    def get_runtime_stats(self) -> dict[str, Any]:
+        """返回适配器运行时统计快照（仅用于诊断/观测）。"""
+        return {
+            "ingress": self._ingress.snapshot_stats(),
+            "eventAck": self._ack_sender.snapshot_stats(),
+            "wsWriter": self._ws_writer.snapshot_stats(),
+            "http": self._http_client.snapshot_stats(),
+            "memorySearch": self._memory_cache.snapshot_stats(),
+            "socialState": self._social_cache.snapshot_stats(),
+            "contextEnrichment": self._enrichment_stats.snapshot_stats(),
+            "transcripts": self._transcripts.snapshot_stats(),
+            "flowCredit": self._flow_credit.snapshot_stats(),
+            "commands": self._cmd_channel.snapshot_stats(),
+            "commandLatency": self._cmd_latency.snapshot_stats(),
+            "worldEventHandlers": self._event_dispatcher.registry.snapshot_stats(),
+            "expiredEvents": self._event_dispatcher.snapshot_expiry_stats(),
+            "eventIdCache": self._event_dispatcher.snapshot_event_id_cache_stats(),
+            "expiringState": {
+                "startedDedupe": self._conversation_started_recent_ms.snapshot_stats(),
+                "sayDebounce": self._say_debounce_state.snapshot_stats(),
+                "commandTombstones": self._recent_timed_out_commands.snapshot_stats(),
+            },
+        }
+
+    async def _surface_command_rejection(self, payload: dict[str, Any]) -> None:
+        """将异步模式下被拒绝的命令作为本地系统事件送入入站队列，唤醒 LLM 调整计划。"""
+        now_ms = int(time.time() * 1000)
+        await self._ingress.submit_local(
+            {
+                "type": COMMAND_REJECTED_EVENT_TYPE,
+                "id": new_id("local"),
+                "version": int(self._negotiated_version or 1),
+                "timestamp": now_ms,
+                "expiresAt": 0,
+                "payload": payload,
+            }
+        )
+
+    def _on_late_command_ack(self, payload: CommandAckPayload) -> None:
+        self._cmd_channel.reconcile_late_ack(payload)
+        key = self._relationship_late_watch.pop(payload.commandId)
+        if key is not None:
+            self._social_cache.invalidate(*key)
+
+    def _on_command_completed(self, handle: CommandHandle, fut: asyncio.Future[CommandAckPayload]) -> None:
+        """命令得到最终结果（ACK/超时/失败）。
+
+        接受关系提议时 Gateway 在 ACK 前写入关系，因此在最终 ACK 时（而非提交时）让该关系的缓存失效：
+        异步 ACK 与 command.batch 模式下提交与 ACK 之间的查询仍可能缓存旧关系，此时一并清除。
+        """
+        if handle.msg_type != "command.respond_relationship" or handle.payload is None:
+            return
+        key = (str(self._player_id or ""), str(handle.payload.get("proposerId") or ""))
+        self._social_cache.invalidate(*key)
+        if not fut.cancelled() and isinstance(fut.exception(), asyncio.TimeoutError):
+            # 超时不代表未执行：Gateway 之后仍可能写入关系，迟到 ACK 到达时再失效一次。
+            self._relationship_late_watch.set(handle.command_id, key, self._cfg.late_ack_tombstone_ttl_sec)
+
+    async def _replay_command_journal(self) -> None:
+        await self._cmd_channel.replay_journal()
+
+    def _note_llm_request(self, event_id: str) -> None:
+        """LLM 开始处理某个世界事件唤醒（on_llm_request 钩子调用），用于入站流控的 LLM 积压统计。"""
+        self._flow_credit.note_llm_started(event_id)
+
+    def _record_context_enrichment(
+        self, timings: dict[str, tuple[float, str]], total_ms: float, deadline_hit: bool
+    ) -> None:
+        """记录 on_llm_request 钩子中各上下文补充来源的耗时与结果。"""
+        self._enrichment_stats.record(timings, total_ms, deadline_hit)
+
     async def send_command(self, msg_type: str, payload: dict[str, Any]) -> dict[str, Any]:
         return await self._cmd_channel.send_command(msg_type, payload)
 
+    async def submit_command(self, msg_type: str, payload: dict[str, Any]) -> CommandHandle | dict[str, Any]:
+        """流水线发送命令：不等待 ACK，返回可 await result() 的句柄。"""
+        return await self._cmd_channel.submit_command(msg_type, payload)
+
+    async def send_turn_command(self, msg_type: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """LLM 工具调用入口：协议支持且开启聚合时，同一轮的命令合并为 command.batch。
+
+        command.respond_relationship 的社交缓存失效由 _on_command_completed 在最终 ACK 时处理。
+        """
+        return await self._cmd_channel.send_turn_command(msg_type, payload)
+
     def _build_ws_connect_url(self) -> str:
         return self._ws_lifecycle.build_ws_connect_url()
 
@@ -382,8 +548,15 @@ class AstrTownAdapter(Platform):
     def _build_http_base_url(self) -> str:
         return self._http_client.build_http_base_url()
 
+    def _get_http_session(self) -> Any:
+        """返回适配器共享的 aiohttp 会话（连接池）；aiohttp 不可用时为 None。"""
+        return self._http_client.session()
+
     async def search_world_memory(self, query_text: str, limit: int = 3) -> list[dict[str, Any]]:
-        return await self._http_client.search_world_memory(query_text, limit)
+        return await self._memory_cache.search(query_text, limit)
+
+    async def get_social_state(self, owner_id: str, target_id: str, world_id: str = "") -> dict[str, Any] | None:
+        return await self._social_cache.get(owner_id, target_id, world_id or str(self._world_id or ""))
 
     async def _sync_persona_to_gateway(self, player_id: str | None) -> None:
         return await self._http_client.sync_persona_to_gateway(player_id)
@@ -1,26 +1,368 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import time
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from astrbot import logger
 
 from ..id_util import new_id
 from ..protocol import CommandAckPayload
+from ..ttl_cache import TtlLruCache
+from .command_journal import CommandJournal
 from .contracts import AdapterHostProtocol
+from .latency_tracker import CommandLatencyTracker
+from .transcript_buffer import ConversationTranscriptBuffer
+from .ws_writer import LANE_COMMAND, WsFrameWriter
+
+# 协议 v3 起命令可按 LLM 轮次聚合为 command.batch 帧（逐条 command.ack + 批次 ACK）。
+BATCH_COMMAND_MIN_PROTOCOL_VERSION = 3
+
+
+class CommandHandle:
+    """已发出命令的句柄；result() 等待 ACK 并返回与 send_command 相同结构的结果。"""
+
+    __slots__ = ("command_id", "msg_type", "payload", "sent_at", "journaled", "ack_timer", "_fut", "_host")
+
+    def __init__(
+        self,
+        host: AdapterHostProtocol,
+        command_id: str,
+        msg_type: str,
+        fut: asyncio.Future[CommandAckPayload],
+    ) -> None:
+        self._host = host
+        self.command_id = command_id
+        self.msg_type = msg_type
+        self.payload: dict[str, Any] | None = None
+        self.sent_at = time.monotonic()
+        # 已写入命令日志：连接中断时不算失败，重连后会自动重放。
+        self.journaled = False
+        # ACK 超时计时器；帧写出后才启动（聚合窗口内等待的时间不计入超时与 RTT）。
+        self.ack_timer: asyncio.TimerHandle | None = None
+        self._fut = fut
+
+    def done(self) -> bool:
+        return self._fut.done()
+
+    def add_done_callback(self, callback: Callable[[asyncio.Future[CommandAckPayload]], None]) -> None:
+        self._fut.add_done_callback(callback)
+
+    async def result(self) -> dict[str, Any]:
+        command_id = self.command_id
+        msg_type = self.msg_type
+        try:
+            ack_payload = await asyncio.shield(self._fut)
+        except asyncio.TimeoutError:
+            return {
+                "ok": False,
+                "status": "timeout",
+                "commandId": command_id,
+                "note": "command sent, ack timeout",
+            }
+        except asyncio.CancelledError:
+            if self._fut.cancelled():
+                return {"ok": False, "commandId": command_id, "error": "ack wait failed: cancelled"}
+            raise
+        except ConnectionError as e:
+            if self.journaled:
+                return {
+                    "ok": True,
+                    "status": "journaled",
+                    "commandId": command_id,
+                    "note": "连接中断，命令已记录，重连后将自动重发",
+                }
+            return {"ok": False, "commandId": command_id, "error": f"ack wait failed: {e}"}
+        except Exception as e:
+            return {"ok": False, "commandId": command_id, "error": f"ack wait failed: {e}"}
+
+        if ack_payload.status == "rejected":
+            logger.warning(
+                f"[AstrTown] 命令被拒绝: commandType={msg_type}, agentId={self._host._agent_id}, reason={ack_payload.reason}"
+            )
+            return {"ok": False, "commandId": command_id, "reason": ack_payload.reason}
+
+        if ack_payload.status == "accepted":
+            semantics = getattr(ack_payload, "ackSemantics", None)
+            logger.info(
+                f"[AstrTown] 命令发送成功: commandType={msg_type}, agentId={self._host._agent_id}, status={ack_payload.status}, ackSemantics={semantics}"
+            )
+            return {"ok": True, "commandId": command_id}
+
+        return {
+            "ok": False,
+            "commandId": command_id,
+            "status": "invalid_ack_status",
+            "ackStatus": ack_payload.status,
+        }
 
 
 class CommandChannel:
-    """命令发送通道。"""
+    """命令发送通道。
+
+    命令以流水线方式发送：发出后立即返回 CommandHandle，ACK 在后台匹配；
+    在途命令数受 astrtown_command_inflight_window 限制，窗口满时按
+    astrtown_command_backpressure 等待空位（wait）或直接拒绝并给出 retryAfterMs（reject）。
+
+    协议 v3 且 astrtown_command_batch_window_ms > 0 时，LLM 工具调用经 send_turn_command 提交，
+    同一轮内窗口期提交的命令合并为一帧 command.batch，逐条结果仍由各自的 command.ack 回填。
+
+    astrtown_command_async_ack 开启（或批量生效）时，工具调用在帧写出后立即返回；
+    ACK 在后台核对，仅在命令被拒绝（含超时后迟到的拒绝 ACK）时通过拒绝监听器补发系统事件。
 
-    def __init__(self, host: AdapterHostProtocol) -> None:
+    astrtown_command_journal_enabled 开启时，LLM 工具调用的命令在 ACK 前记入命令日志，
+    断线/重启后于重连时按原 commandId 重放（过期的丢弃）。
+    """
+
+    def __init__(
+        self,
+        host: AdapterHostProtocol,
+        journal: CommandJournal,
+        latency: CommandLatencyTracker,
+        writer: WsFrameWriter,
+        transcripts: ConversationTranscriptBuffer,
+    ) -> None:
         self._host = host
+        self._journal = journal
+        self._latency = latency
+        self._writer = writer
+        self._transcripts = transcripts
+        self._window_size = max(
+            1,
+            self._safe_int(
+                host.config.get("astrtown_command_inflight_window", 8),
+                8,
+                "astrtown_command_inflight_window",
+                "platform_config",
+            ),
+        )
+        self._slots = asyncio.Semaphore(self._window_size)
+        self._inflight = 0
+
+        self._sent_total = 0
+        self._acked_total = 0
+        self._timeout_total = 0
+        self._failed_total = 0
+        self._backpressure_wait_total = 0
+        self._backpressure_reject_total = 0
+        self._max_inflight = 0
+        self._rtt_count = 0
+        self._rtt_total_ms = 0.0
+        self._rtt_max_ms = 0.0
+        self._rtt_last_ms = 0.0
+
+        # 自适应 ACK 超时（RFC 6298 风格）：平滑 RTT 与 RTT 偏差估计，超时后指数退避直到下一个样本。
+        self._srtt_ms: float | None = None
+        self._rttvar_ms = 0.0
+        self._rto_backoff = 1
+
+        # 命令批量聚合（协议 v3+）：窗口内提交的命令合并为一帧 command.batch。
+        self._batch_items: list[tuple[dict[str, Any], CommandHandle]] = []
+        self._batch_flush_task: asyncio.Task[Any] | None = None
+        self._batch_frames_total = 0
+        self._batched_commands_total = 0
+
+        # 异步 ACK 核对：commandId -> (命令类型, conversationId)。
+        # 在途的异步命令记录在 _async_pending；超时后移入 _async_late_watch 等待迟到 ACK。
+        self._async_pending: dict[str, tuple[str, str]] = {}
+        self._async_late_watch: TtlLruCache[str, tuple[str, str]] = TtlLruCache(1024, host._cfg.late_ack_tombstone_ttl_sec)
+        self._rejection_listener: Callable[[dict[str, Any]], Awaitable[None]] | None = None
+        self._completion_listener: (
+            Callable[[CommandHandle, asyncio.Future[CommandAckPayload]], None] | None
+        ) = None
+        self._async_submitted_total = 0
+        self._async_accepted_total = 0
+        self._async_rejected_total = 0
+        self._async_timeout_total = 0
+        self._async_failed_total = 0
+        self._async_late_accepted_total = 0
+        self._async_late_rejected_total = 0
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def _ack_timeout_sec(self) -> float:
+        """当前生效的 ACK 超时：未开启自适应或尚无 RTT 样本时使用固定配置。"""
+        cfg = self._host._cfg
+        if not cfg.command_ack_timeout_adaptive or self._srtt_ms is None:
+            return cfg.command_ack_timeout_sec
+        # RTO = SRTT + max(G, 4·RTTVAR)，G 取 100ms 时钟粒度。
+        rto_sec = (self._srtt_ms + max(100.0, 4.0 * self._rttvar_ms)) / 1000.0 * self._rto_backoff
+        return min(cfg.command_ack_timeout_max_sec, max(cfg.command_ack_timeout_min_sec, rto_sec))
+
+    def _observe_rtt(self, rtt_ms: float) -> None:
+        if self._srtt_ms is None:
+            self._srtt_ms = rtt_ms
+            self._rttvar_ms = rtt_ms / 2.0
+        else:
+            # α = 1/8, β = 1/4
+            self._rttvar_ms = 0.75 * self._rttvar_ms + 0.25 * abs(self._srtt_ms - rtt_ms)
+            self._srtt_ms = 0.875 * self._srtt_ms + 0.125 * rtt_ms
+        self._rto_backoff = 1
+
+    def set_rejection_listener(self, listener: Callable[[dict[str, Any]], Awaitable[None]] | None) -> None:
+        """设置异步模式下命令被拒绝时的回调（由适配器转为系统事件唤醒 LLM）。"""
+        self._rejection_listener = listener
+
+    def set_completion_listener(
+        self,
+        listener: Callable[[CommandHandle, asyncio.Future[CommandAckPayload]], None] | None,
+    ) -> None:
+        """设置命令得到最终结果（ACK/超时/失败/取消）时的同步回调，含批量、异步与重放的命令。"""
+        self._completion_listener = listener
+
+    def _retry_after_ms(self) -> int:
+        # 以平均 ACK 往返估算窗口腾出空位的时间。
+        if self._rtt_count:
+            return max(50, int(self._rtt_total_ms / self._rtt_count))
+        return 200
 
     async def send_command(self, msg_type: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """发送命令并等待 ACK 结果。"""
+        handle = await self.submit_command(msg_type, payload)
+        if isinstance(handle, dict):
+            return handle
+        return await handle.result()
+
+    async def send_turn_command(self, msg_type: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """LLM 工具调用发送命令。
+
+        批量或异步 ACK 模式下帧写出后立即返回 status=submitted，ACK 在后台核对；否则同 send_command。
+        """
+        self._latency.note_decided(msg_type)
+        if self._host._ws is None and self._journal.enabled():
+            # 断线期间的决策先落盘，重连后随日志一起重放，避免重新规划。
+            command_id = new_id("cmd")
+            if await self._journal.record(command_id, msg_type, payload):
+                return {
+                    "ok": True,
+                    "status": "journaled",
+                    "commandId": command_id,
+                    "note": "当前未连接，命令已记录，重连后将自动发送",
+                }
+
+        batching = self._batching_active()
+        handle = await self.submit_command(msg_type, payload, batch=batching, journal=True)
+        if isinstance(handle, dict):
+            return handle
+        if not batching and not self._host._cfg.command_async_ack:
+            return await handle.result()
+        self._watch_async(handle, str(payload.get("conversationId") or ""))
+        return {
+            "ok": True,
+            "status": "submitted",
+            "commandId": handle.command_id,
+            "note": "命令已发出，结果在后台核对；若被拒绝会另行通知",
+        }
+
+    def _watch_async(self, handle: CommandHandle, conversation_id: str) -> None:
+        self._async_submitted_total += 1
+        self._async_pending[handle.command_id] = (handle.msg_type, conversation_id)
+        handle.add_done_callback(lambda f: self._reconcile_async(handle, conversation_id, f))
+
+    def _reconcile_async(
+        self,
+        handle: CommandHandle,
+        conversation_id: str,
+        fut: asyncio.Future[CommandAckPayload],
+    ) -> None:
+        self._async_pending.pop(handle.command_id, None)
+        if fut.cancelled():
+            self._async_failed_total += 1
+            return
+        err = fut.exception()
+        if isinstance(err, asyncio.TimeoutError):
+            # 超时不代表失败：_on_ack_timeout 已将其移入迟到 ACK 核对表（有效期与 tombstone 一致）。
+            self._async_timeout_total += 1
+            return
+        if err is not None:
+            self._async_failed_total += 1
+            if handle.journaled and isinstance(err, ConnectionError):
+                # 已落盘的命令会在重连后重放，结果届时再核对。
+                return
+            logger.warning(
+                f"[AstrTown] 异步命令未确认: commandType={handle.msg_type}, commandId={handle.command_id}, error={err}"
+            )
+            return
+        ack = fut.result()
+        if ack.status == "rejected":
+            self._async_rejected_total += 1
+            self._surface_rejection(handle.command_id, handle.msg_type, conversation_id, ack.reason, "ack")
+            return
+        self._async_accepted_total += 1
+
+    def reconcile_late_ack(self, ack: CommandAckPayload) -> None:
+        """超时后到达的 command.ack：若属于异步命令，被拒绝时补发系统事件。"""
+        self._journal.complete(ack.commandId, f"late_{ack.status}")
+        watched = self._async_late_watch.get(ack.commandId)
+        if watched is None:
+            return
+        self._async_late_watch.pop(ack.commandId)
+        msg_type, conversation_id = watched
+        if ack.status == "rejected":
+            self._async_late_rejected_total += 1
+            self._surface_rejection(ack.commandId, msg_type, conversation_id, ack.reason, "late_ack")
+            return
+        self._async_late_accepted_total += 1
+
+    def _surface_rejection(
+        self,
+        command_id: str,
+        msg_type: str,
+        conversation_id: str,
+        reason: str | None,
+        source: str,
+    ) -> None:
+        logger.warning(
+            f"[AstrTown] 异步命令被拒绝: commandType={msg_type}, commandId={command_id}, reason={reason}, source={source}"
+        )
+        listener = self._rejection_listener
+        if listener is None:
+            return
+        task = asyncio.create_task(
+            listener(
+                {
+                    "commandId": command_id,
+                    "commandType": msg_type,
+                    "reason": reason or "",
+                    "conversationId": conversation_id,
+                    "source": source,
+                }
+            ),
+            name="astrtown_command_rejected",
+        )
+        self._host._track_background_task(task)
+
+    async def submit_command(
+        self,
+        msg_type: str,
+        payload: dict[str, Any],
+        *,
+        batch: bool = False,
+        journal: bool = False,
+    ) -> CommandHandle | dict[str, Any]:
+        """发送命令但不等待 ACK；返回 CommandHandle，发送前被拦截/失败时返回结果 dict。
+
+        batch=True 且可批量时进入聚合窗口，随后与同一轮的其他命令合并为 command.batch 发送。
+        journal=True 且命令日志开启时，发送前先落盘，ACK 后移除。
+        """
+        if self._host._ws is None:
+            return {"ok": False, "error": "WebSocket not connected"}
+
+        rejected = await self._acquire_slot(msg_type)
+        if rejected is not None:
+            return rejected
+
+        # 等待窗口期间连接可能已变化。
         ws = self._host._ws
         if ws is None:
+            self._slots.release()
             return {"ok": False, "error": "WebSocket not connected"}
 
         now_ms = int(time.time() * 1000)
@@ -31,22 +373,8 @@ class CommandChannel:
             if conversation_id:
                 agent_id = str(self._host._agent_id or "").strip() or "unknown"
                 state_key = f"{agent_id}:{conversation_id}"
-                debounce_window_ms = 1200
-                duplicate_window_ms = 3000
-                try:
-                    debounce_window_ms = int(
-                        self._host.config.get("astrtown_say_debounce_window_ms", debounce_window_ms)
-                        or debounce_window_ms
-                    )
-                except (TypeError, ValueError):
-                    debounce_window_ms = 1200
-                try:
-                    duplicate_window_ms = int(
-                        self._host.config.get("astrtown_say_duplicate_window_ms", duplicate_window_ms)
-                        or duplicate_window_ms
-                    )
-                except (TypeError, ValueError):
-                    duplicate_window_ms = 3000
+                debounce_window_ms = self._host._cfg.say_debounce_window_ms
+                duplicate_window_ms = self._host._cfg.say_duplicate_window_ms
 
                 text = str(payload.get("text") or "")
                 prev = self._host._say_debounce_state.get(state_key)
@@ -58,6 +386,7 @@ class CommandChannel:
                         hit_window = debounce_window_ms > 0 and elapsed < debounce_window_ms
                         hit_duplicate = duplicate_window_ms > 0 and elapsed < duplicate_window_ms and text == prev_text
                         if hit_window or hit_duplicate:
+                            self._slots.release()
                             retry_after = max(0, (debounce_window_ms if hit_window else duplicate_window_ms) - elapsed)
                             logger.info(
                                 "[AstrTown] 命中 say 防抖: "
@@ -70,19 +399,31 @@ class CommandChannel:
                                 "retryAfterMs": retry_after,
                             }
 
-                self._host._say_debounce_state[state_key] = {
-                    "sentAtMs": now_ms,
-                    "text": text,
-                }
-
-                # 轻量清理，避免状态无限增长。
-                gc_before = now_ms - max(duplicate_window_ms * 2, 10_000)
-                for key, item in list(self._host._say_debounce_state.items()):
-                    sent_at = item.get("sentAtMs") if isinstance(item, dict) else None
-                    if isinstance(sent_at, int) and sent_at < gc_before:
-                        self._host._say_debounce_state.pop(key, None)
+                # 状态只需保留到两个窗口中较长者结束，之后由时间轮清理。
+                state_ttl_ms = max(debounce_window_ms, duplicate_window_ms)
+                if state_ttl_ms > 0:
+                    self._host._say_debounce_state.set(
+                        state_key,
+                        {"sentAtMs": now_ms, "text": text},
+                        state_ttl_ms / 1000.0,
+                    )
 
         command_id = new_id("cmd")
+        journaled = journal and await self._journal.record(command_id, msg_type, payload)
+        return await self._dispatch_command(ws, msg_type, payload, command_id, now_ms, batch=batch, journaled=journaled)
+
+    async def _dispatch_command(
+        self,
+        ws: Any,
+        msg_type: str,
+        payload: dict[str, Any],
+        command_id: str,
+        now_ms: int,
+        *,
+        batch: bool,
+        journaled: bool,
+    ) -> CommandHandle | dict[str, Any]:
+        """构造命令帧并发送（或进入聚合窗口）；调用方已占用在途窗口。"""
         version = int(self._host._negotiated_version or 1)
         msg = {
             "type": msg_type,
@@ -95,57 +436,341 @@ class CommandChannel:
         loop = asyncio.get_running_loop()
         fut: asyncio.Future[CommandAckPayload] = loop.create_future()
         self._host._pending_commands[command_id] = fut
+        handle = CommandHandle(self._host, command_id, msg_type, fut)
+        handle.journaled = journaled
+        handle.payload = payload
+
+        if batch and self._batching_active():
+            # 在途计数随占用窗口立即生效；ACK 计时器由 flush_batch 在 command.batch 写出后启动。
+            self._track_inflight(handle, fut, arm_timer=False)
+            self._enqueue_batch_item(msg, handle)
+            return handle
+
+        # 直接发送前先冲刷已聚合的命令，保持命令到达 Gateway 的先后顺序。
+        if self._batch_items:
+            await self.flush_batch()
 
         try:
-            await ws.send(json.dumps(msg, ensure_ascii=False))
+            await self._writer.send(ws, msg, LANE_COMMAND)
+        except asyncio.CancelledError:
+            self._host._pending_commands.pop(command_id, None)
+            self._slots.release()
+            raise
         except Exception as e:
             self._host._pending_commands.pop(command_id, None)
+            self._slots.release()
+            self._failed_total += 1
             return {"ok": False, "error": f"send failed: {e}"}
 
-        ack_timeout_sec = 10.0
+        self._sent_total += 1
+        self._track_inflight(handle, fut)
+        return handle
+
+    async def replay_journal(self) -> None:
+        """重连后按原 commandId 重放命令日志中未确认的命令（过期的丢弃）。"""
+        pending = await self._journal.take_replayable()
+        if not pending:
+            return
+        replayed = 0
+        for rec in pending:
+            command_id = str(rec.get("id") or "")
+            msg_type = str(rec.get("type") or "")
+            payload = rec.get("payload")
+            if not command_id or not msg_type.startswith("command.") or not isinstance(payload, dict):
+                self._journal.complete(command_id, "invalid")
+                continue
+            if command_id in self._host._pending_commands:
+                # 同一命令仍在途（如超时前已重发），不再重复发送。
+                self._journal.note_deduplicated()
+                continue
+
+            rejected = await self._acquire_slot(msg_type)
+            if rejected is not None:
+                break
+            ws = self._host._ws
+            if ws is None:
+                self._slots.release()
+                break
+            handle = await self._dispatch_command(
+                ws, msg_type, payload, command_id, int(time.time() * 1000), batch=False, journaled=True
+            )
+            if isinstance(handle, dict):
+                # 连接再次中断：剩余命令留在日志中，等待下次重连。
+                break
+            replayed += 1
+            self._journal.note_replayed()
+            # 原调用方已拿到结果，重放结果按异步命令核对，被拒绝时补发系统事件。
+            self._watch_async(handle, str(payload.get("conversationId") or ""))
+
+        logger.info(f"[AstrTown] 命令日志重放完成: replayed={replayed}, total={len(pending)}")
+
+    def _track_inflight(
+        self,
+        handle: CommandHandle,
+        fut: asyncio.Future[CommandAckPayload],
+        *,
+        arm_timer: bool = True,
+    ) -> None:
+        self._inflight += 1
+        if self._inflight > self._max_inflight:
+            self._max_inflight = self._inflight
+        if arm_timer:
+            self._arm_ack_timer(handle, fut)
+        fut.add_done_callback(lambda f: self._on_command_done(handle, f))
+
+    def _arm_ack_timer(self, handle: CommandHandle, fut: asyncio.Future[CommandAckPayload]) -> None:
+        """帧写出后启动 ACK 超时计时器（ACK 已先到达时不再启动）。"""
+        if fut.done():
+            return
+        handle.ack_timer = asyncio.get_running_loop().call_later(
+            self._ack_timeout_sec(), self._on_ack_timeout, handle.command_id, fut
+        )
+
+    def batching_supported(self) -> bool:
+        return int(self._host._negotiated_version or 1) >= BATCH_COMMAND_MIN_PROTOCOL_VERSION
+
+    def _batching_active(self) -> bool:
+        return self._host._cfg.command_batch_window_ms > 0 and self.batching_supported()
+
+    def _enqueue_batch_item(self, msg: dict[str, Any], handle: CommandHandle) -> None:
+        self._batch_items.append((msg, handle))
+        batch_max = self._host._cfg.command_batch_max
+        if len(self._batch_items) >= batch_max:
+            task = asyncio.create_task(self.flush_batch(), name="astrtown_command_batch_flush")
+            self._host._track_background_task(task)
+            return
+        if self._batch_flush_task is None or self._batch_flush_task.done():
+            delay = self._host._cfg.command_batch_window_ms / 1000.0
+            self._batch_flush_task = asyncio.create_task(
+                self._flush_batch_later(delay), name="astrtown_command_batch_flush"
+            )
+            self._host._track_background_task(self._batch_flush_task)
+
+    async def _flush_batch_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if self._batch_flush_task is asyncio.current_task():
+            self._batch_flush_task = None
+        await self.flush_batch()
+
+    async def flush_batch(self) -> None:
+        """将聚合窗口内的命令作为一帧 command.batch 发出（仅 1 条时按普通命令发送）。"""
+        items = [(msg, handle) for msg, handle in self._batch_items if not handle.done()]
+        self._batch_items.clear()
+        if not items:
+            return
+
+        ws = self._host._ws
+        if ws is None:
+            self._fail_batch_items(items, ConnectionError("WebSocket not connected"))
+            return
+
+        if len(items) == 1:
+            frame = items[0][0]
+            batch_fut: asyncio.Future[CommandAckPayload] | None = None
+        else:
+            batch_id = new_id("batch")
+            frame = {
+                "type": "command.batch",
+                "id": batch_id,
+                "version": int(self._host._negotiated_version or 1),
+                "timestamp": int(time.time() * 1000),
+                "payload": {
+                    "commands": [
+                        {"type": msg["type"], "id": msg["id"], "payload": msg["payload"]} for msg, _ in items
+                    ],
+                },
+            }
+            # 批次级 ACK：校验失败时 Gateway 只回复批次 ID，需要据此拒绝批内全部命令。
+            batch_fut = asyncio.get_running_loop().create_future()
+            self._host._pending_commands[batch_id] = batch_fut
+
         try:
-            ack_timeout_sec = float(self._host.config.get("astrtown_command_ack_timeout_sec", ack_timeout_sec) or ack_timeout_sec)
-        except (TypeError, ValueError):
-            ack_timeout_sec = 10.0
+            await self._writer.send(ws, frame, LANE_COMMAND)
+        except Exception as e:
+            if batch_fut is not None:
+                self._host._pending_commands.pop(frame["id"], None)
+                if not batch_fut.done():
+                    batch_fut.cancel()
+            self._fail_batch_items(items, ConnectionError(f"send failed: {e}"))
+            return
 
+        # 计时从帧写出开始：聚合窗口与写出排队的时间不计入 ACK 超时和 RTT 样本。
+        sent_at = time.monotonic()
+        for msg, handle in items:
+            handle.sent_at = sent_at
+            fut = self._host._pending_commands.get(msg["id"])
+            if fut is not None:
+                self._arm_ack_timer(handle, fut)
+        self._sent_total += len(items)
+        if batch_fut is not None:
+            timer: asyncio.TimerHandle | None = None
+            if not batch_fut.done():
+                timer = asyncio.get_running_loop().call_later(
+                    self._ack_timeout_sec(), self._on_ack_timeout, frame["id"], batch_fut
+                )
+            batch_fut.add_done_callback(lambda f: self._on_batch_done(items, f, timer))
+            self._batch_frames_total += 1
+            self._batched_commands_total += len(items)
+
+    def _fail_batch_items(self, items: list[tuple[dict[str, Any], CommandHandle]], err: Exception) -> None:
+        for msg, _ in items:
+            fut = self._host._pending_commands.pop(msg["id"], None)
+            if fut is not None and not fut.done():
+                fut.set_exception(err)
+
+    def _on_batch_done(
+        self,
+        items: list[tuple[dict[str, Any], CommandHandle]],
+        batch_fut: asyncio.Future[CommandAckPayload],
+        timer: asyncio.TimerHandle | None,
+    ) -> None:
+        if timer is not None:
+            timer.cancel()
+        if batch_fut.cancelled() or batch_fut.exception() is not None:
+            return
+        ack = batch_fut.result()
+        if ack.status != "rejected":
+            return
+        for msg, _ in items:
+            fut = self._host._pending_commands.pop(msg["id"], None)
+            if fut is not None and not fut.done():
+                fut.set_result(CommandAckPayload(commandId=msg["id"], status="rejected", reason=ack.reason))
+
+    async def _acquire_slot(self, msg_type: str) -> dict[str, Any] | None:
+        """占用在途窗口；成功返回 None，背压拒绝时返回结果 dict。"""
+        slots = self._slots
+        if not slots.locked():
+            await slots.acquire()
+            return None
+
+        if self._host._cfg.command_backpressure == "reject":
+            self._backpressure_reject_total += 1
+            retry_after = self._retry_after_ms()
+            logger.info(
+                f"[AstrTown] 命令在途窗口已满，拒绝发送: commandType={msg_type}, inflight={self._inflight}, "
+                f"retryAfterMs={retry_after}"
+            )
+            return {"ok": False, "status": "backpressure", "inflight": self._inflight, "retryAfterMs": retry_after}
+
+        self._backpressure_wait_total += 1
         try:
-            ack_payload = await asyncio.wait_for(fut, timeout=max(0.1, ack_timeout_sec))
+            await asyncio.wait_for(slots.acquire(), timeout=self._ack_timeout_sec())
         except asyncio.TimeoutError:
-            self._host._pending_commands.pop(command_id, None)
-            tombstone_ttl_sec = 120.0
-            try:
-                tombstone_ttl_sec = float(
-                    self._host.config.get("astrtown_late_ack_tombstone_ttl_sec", tombstone_ttl_sec) or tombstone_ttl_sec
-                )
-            except (TypeError, ValueError):
-                tombstone_ttl_sec = 120.0
-            self._host._recent_timed_out_commands[command_id] = time.time() + max(1.0, tombstone_ttl_sec)
+            self._backpressure_reject_total += 1
             return {
                 "ok": False,
-                "status": "timeout",
-                "commandId": command_id,
-                "note": "command sent, ack timeout",
+                "status": "backpressure",
+                "inflight": self._inflight,
+                "retryAfterMs": self._retry_after_ms(),
             }
-        except Exception as e:
-            self._host._pending_commands.pop(command_id, None)
-            return {"ok": False, "commandId": command_id, "error": f"ack wait failed: {e}"}
+        return None
 
-        if ack_payload.status == "rejected":
-            logger.warning(
-                f"[AstrTown] 命令被拒绝: commandType={msg_type}, agentId={self._host._agent_id}, reason={ack_payload.reason}"
-            )
-            return {"ok": False, "commandId": command_id, "reason": ack_payload.reason}
+    def _on_ack_timeout(self, command_id: str, fut: asyncio.Future[CommandAckPayload]) -> None:
+        if fut.done():
+            return
+        self._host._pending_commands.pop(command_id, None)
+        self._host._recent_timed_out_commands.set(command_id, True, self._host._cfg.late_ack_tombstone_ttl_sec)
+        # 与 tombstone 同步登记，保证紧随超时到达的迟到 ACK 也能被核对。
+        watched = self._async_pending.pop(command_id, None)
+        if watched is not None:
+            self._async_late_watch.put(command_id, watched)
+        fut.set_exception(asyncio.TimeoutError())
 
-        if ack_payload.status == "accepted":
-            semantics = getattr(ack_payload, "ackSemantics", None)
-            logger.info(
-                f"[AstrTown] 命令发送成功: commandType={msg_type}, agentId={self._host._agent_id}, status={ack_payload.status}, ackSemantics={semantics}"
-            )
-            return {"ok": True, "commandId": command_id}
+    def _on_command_done(
+        self,
+        handle: CommandHandle,
+        fut: asyncio.Future[CommandAckPayload],
+    ) -> None:
+        if handle.ack_timer is not None:
+            handle.ack_timer.cancel()
+        self._inflight -= 1
+        self._slots.release()
+        if handle.msg_type == "command.say" and handle.payload is not None:
+            self._note_say_outcome(handle.payload, fut)
+        listener = self._completion_listener
+        if listener is not None:
+            try:
+                listener(handle, fut)
+            except Exception as e:
+                logger.warning(f"[AstrTown] 命令完成回调异常: commandId={handle.command_id}, error={e}")
+        if fut.cancelled():
+            self._failed_total += 1
+            return
+        err = fut.exception()
+        if err is None:
+            ack = fut.result()
+            self._latency.record_ack(handle.command_id, handle.msg_type, handle.sent_at, ack)
+            if handle.journaled:
+                self._journal.complete(handle.command_id, ack.status)
+                if ack.duplicate:
+                    self._journal.note_deduplicated()
+            rtt_ms = (time.monotonic() - handle.sent_at) * 1000.0
+            self._acked_total += 1
+            self._rtt_count += 1
+            self._rtt_total_ms += rtt_ms
+            self._rtt_last_ms = rtt_ms
+            if rtt_ms > self._rtt_max_ms:
+                self._rtt_max_ms = rtt_ms
+            self._observe_rtt(rtt_ms)
+        elif isinstance(err, asyncio.TimeoutError):
+            self._timeout_total += 1
+            # 超时后退避：链路可能拥塞，下一次放宽超时，直到拿到新的 RTT 样本（上限由 ceiling 约束）。
+            if self._srtt_ms is not None and self._rto_backoff < 64:
+                self._rto_backoff *= 2
+        else:
+            self._failed_total += 1
+
+    def _note_say_outcome(self, payload: dict[str, Any], fut: asyncio.Future[CommandAckPayload]) -> None:
+        """本方发言写入会话转录缓冲；结果未知（超时/断线）时标记缺口，会话结束时回退到 HTTP 拉取。"""
+        if not fut.cancelled() and fut.exception() is None:
+            if fut.result().status == "accepted":
+                self._transcripts.record_own_say(payload)
+            return
+        self._transcripts.mark_gap(str(payload.get("conversationId") or "").strip())
 
+    def snapshot_stats(self) -> dict[str, Any]:
         return {
-            "ok": False,
-            "commandId": command_id,
-            "status": "invalid_ack_status",
-            "ackStatus": ack_payload.status,
+            "window": self._window_size,
+            "inflight": self._inflight,
+            "maxInflight": self._max_inflight,
+            "sent": self._sent_total,
+            "acked": self._acked_total,
+            "timeouts": self._timeout_total,
+            "failed": self._failed_total,
+            "backpressureWaits": self._backpressure_wait_total,
+            "backpressureRejects": self._backpressure_reject_total,
+            "async": {
+                "enabled": self._host._cfg.command_async_ack,
+                "submitted": self._async_submitted_total,
+                "accepted": self._async_accepted_total,
+                "rejected": self._async_rejected_total,
+                "timeouts": self._async_timeout_total,
+                "failed": self._async_failed_total,
+                "lateAccepted": self._async_late_accepted_total,
+                "lateRejected": self._async_late_rejected_total,
+                "awaitingLateAck": len(self._async_late_watch),
+            },
+            "batching": {
+                "supported": self.batching_supported(),
+                "windowMs": self._host._cfg.command_batch_window_ms,
+                "frames": self._batch_frames_total,
+                "commands": self._batched_commands_total,
+                "pending": len(self._batch_items),
+            },
+            "journal": self._journal.snapshot_stats(),
+            "ackRtt": {
+                "count": self._rtt_count,
+                "avgMs": round(self._rtt_total_ms / self._rtt_count, 3) if self._rtt_count else 0.0,
+                "maxMs": round(self._rtt_max_ms, 3),
+                "lastMs": round(self._rtt_last_ms, 3),
+            },
+            "ackTimeout": {
+                "adaptive": self._host._cfg.command_ack_timeout_adaptive,
+                "currentSec": round(self._ack_timeout_sec(), 3),
+                "srttMs": round(self._srtt_ms, 3) if self._srtt_ms is not None else None,
+                "rttvarMs": round(self._rttvar_ms, 3),
+                "backoff": self._rto_backoff,
+                "floorSec": self._host._cfg.command_ack_timeout_min_sec,
+                "ceilingSec": self._host._cfg.command_ack_timeout_max_sec,
+            },
         }
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from astrbot import logger
+
+from .. import json_codec
+from .contracts import AdapterHostProtocol
+
+# 日志条目累计超过 max(下限, 倍数 × 未完成条数) 时重写文件，只保留未完成的命令。
+_COMPACT_MIN_LINES = 256
+_COMPACT_FACTOR = 4
+
+
+def _read_text(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8")
+
+
+def _append_line(path: Path, line: str, sync: bool) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _rewrite(path: Path, text: str) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CommandJournal:
+    """未确认命令的落盘日志（append-only JSONL）。
+
+    LLM 工具调用发出的命令在发送前写入一条 put 记录（fsync），收到 ACK（受理或拒绝）后追加 done 记录。
+    连接断开或进程重启后，未完成的命令在重连时以原 commandId 作为幂等键重放；
+    超过 astrtown_command_journal_ttl_sec 的命令视为过期直接丢弃，避免执行已不合时宜的决策。
+    Gateway 会识别已受理过的 commandId 并回复 duplicate ACK，不会重复执行。
+
+    文件读写经 asyncio.to_thread 在线程中执行，不阻塞事件循环（WS 收发与 ACK 计时器）；
+    所有文件操作由同一把锁串行化，保证追加顺序，压缩期间的追加排在压缩之后。
+    record() 等待 put 落盘后才返回，调用方随后再发送命令；done 记录在后台追加。
+    """
+
+    def __init__(self, host: AdapterHostProtocol, dir_resolver: Callable[[], str | None]) -> None:
+        self._host: Any = host
+        self._dir_resolver = dir_resolver
+        self._path: Path | None = None
+        self._loaded = False
+        # commandId -> put 记录；dict 保持写入顺序，即重放顺序。
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._lines = 0
+        # 文件以半行结尾（进程中途退出）时，下一次追加先补换行，避免新记录与残行拼成一行。
+        self._needs_newline = False
+        self._io_lock: asyncio.Lock | None = None
+        # 后台追加 done 记录/压缩的任务；flush() 等待其完成。
+        self._writes: set[asyncio.Task[Any]] = set()
+
+        self._recorded_total = 0
+        self._completed_total = 0
+        self._replayed_total = 0
+        self._expired_total = 0
+        self._deduplicated_total = 0
+        self._write_errors_total = 0
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def enabled(self) -> bool:
+        return self._host._cfg.command_journal_enabled
+
+    def _resolve_path(self) -> Path | None:
+        if self._path is not None:
+            return self._path
+        base_dir = self._dir_resolver()
+        if not base_dir:
+            return None
+        # 每个 token 对应一个 agent，按 token 摘要区分文件，避免多个适配器实例互相覆盖。
+        digest = hashlib.sha1(str(self._host.token or "").encode("utf-8")).hexdigest()[:12]
+        self._path = Path(base_dir) / f"command_journal_{digest}.jsonl"
+        return self._path
+
+    def _lock(self) -> asyncio.Lock:
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        return self._io_lock
+
+    async def _ensure_loaded(self) -> Path | None:
+        path = self._resolve_path()
+        if path is None or self._loaded:
+            return path
+        async with self._lock():
+            if self._loaded:
+                return path
+            self._loaded = True
+            try:
+                raw = await asyncio.to_thread(_read_text, path)
+            except OSError as e:
+                logger.warning(f"[AstrTown] 读取命令日志失败: path={path}, error={e}")
+                return path
+        if raw is None:
+            return path
+        self._needs_newline = bool(raw) and not raw.endswith("\n")
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            self._lines += 1
+            try:
+                rec = json_codec.loads(line)
+            except Exception:
+                # 进程中途退出可能留下半行，忽略即可。
+                continue
+            if not isinstance(rec, dict):
+                continue
+            command_id = str(rec.get("id") or "")
+            if not command_id:
+                continue
+            if rec.get("op") == "put":
+                self._entries[command_id] = rec
+            elif rec.get("op") == "done":
+                self._entries.pop(command_id, None)
+        if self._entries:
+            logger.info(f"[AstrTown] 命令日志载入未确认命令: count={len(self._entries)}, path={path}")
+        return path
+
+    async def _append(self, rec: dict[str, Any], *, sync: bool) -> bool:
+        path = await self._ensure_loaded()
+        if path is None:
+            return False
+        line = json_codec.dumps(rec) + "\n"
+        try:
+            async with self._lock():
+                if self._needs_newline:
+                    line = "\n" + line
+                await asyncio.to_thread(_append_line, path, line, sync)
+                self._needs_newline = False
+        except OSError as e:
+            self._write_errors_total += 1
+            logger.warning(f"[AstrTown] 写入命令日志失败: path={path}, error={e}")
+            return False
+        self._lines += 1
+        return True
+
+    async def record(self, command_id: str, msg_type: str, payload: dict[str, Any]) -> bool:
+        """发送前登记命令；put 落盘后返回是否成功（未启用或写入失败时为 False）。"""
+        if not self.enabled():
+            return False
+        now_ms = int(time.time() * 1000)
+        rec = {
+            "op": "put",
+            "id": command_id,
+            "type": msg_type,
+            "payload": payload,
+            "createdAt": now_ms,
+            "deadline": now_ms + self._host._cfg.command_journal_ttl_ms,
+        }
+        # put 需要 fsync：丢失 put 即丢失命令；done 丢失只会导致一次被 Gateway 去重的重放。
+        if not await self._append(rec, sync=True):
+            return False
+        self._entries[command_id] = rec
+        self._recorded_total += 1
+        return True
+
+    def complete(self, command_id: str, outcome: str) -> None:
+        """命令已得到 ACK（或过期放弃），从日志中移除。"""
+        if self._entries.pop(command_id, None) is None:
+            return
+        self._completed_total += 1
+        # 在 ACK 回调中调用（同步），done 记录交给后台任务追加。
+        task = asyncio.create_task(self._write_done(command_id, outcome), name="astrtown_command_journal_done")
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+        self._host._track_background_task(task)
+
+    async def _write_done(self, command_id: str, outcome: str) -> None:
+        await self._append({"op": "done", "id": command_id, "outcome": outcome}, sync=False)
+        await self._maybe_compact()
+
+    async def flush(self) -> None:
+        """等待后台追加的 done 记录与压缩完成（终止前调用）。"""
+        while self._writes:
+            await asyncio.gather(*list(self._writes), return_exceptions=True)
+
+    async def take_replayable(self) -> list[dict[str, Any]]:
+        """返回仍在有效期内的未确认命令（按原顺序）；过期的命令就地标记完成。"""
+        if not self.enabled():
+            return []
+        await self._ensure_loaded()
+        now_ms = int(time.time() * 1000)
+        replayable: list[dict[str, Any]] = []
+        for command_id, rec in list(self._entries.items()):
+            deadline = self._safe_int(rec.get("deadline"), 0, "deadline", "command_journal")
+            if deadline <= now_ms:
+                self._expired_total += 1
+                logger.info(
+                    f"[AstrTown] 命令日志条目已过期，不再重放: commandType={rec.get('type')}, commandId={command_id}"
+                )
+                self.complete(command_id, "expired")
+                continue
+            replayable.append(rec)
+        return replayable
+
+    def note_replayed(self) -> None:
+        self._replayed_total += 1
+
+    def note_deduplicated(self) -> None:
+        self._deduplicated_total += 1
+
+    def _should_compact(self) -> bool:
+        return self._lines > max(_COMPACT_MIN_LINES, _COMPACT_FACTOR * len(self._entries))
+
+    async def _maybe_compact(self) -> None:
+        path = self._path
+        if path is None or not self._should_compact():
+            return
+        async with self._lock():
+            # 持锁后再判断并取快照：等锁期间可能已压缩过；其后完成的命令追加在压缩后的文件末尾。
+            if not self._should_compact():
+                return
+            entries = list(self._entries.values())
+            text = "".join(json_codec.dumps(rec) + "\n" for rec in entries)
+            try:
+                await asyncio.to_thread(_rewrite, path, text)
+            except OSError as e:
+                self._write_errors_total += 1
+                logger.warning(f"[AstrTown] 压缩命令日志失败: path={path}, error={e}")
+                return
+            self._lines = len(entries)
+            self._needs_newline = False
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled(),
+            "pending": len(self._entries),
+            "recorded": self._recorded_total,
+            "completed": self._completed_total,
+            "replayed": self._replayed_total,
+            "expired": self._expired_total,
+            "deduplicated": self._deduplicated_total,
+            "writeErrors": self._write_errors_total,
+        }
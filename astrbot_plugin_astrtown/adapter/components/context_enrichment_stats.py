@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Any
+
+from .contracts import AdapterHostProtocol
+
+_OUTCOMES = ("ok", "empty", "timeout", "error")
+
+
+class ContextEnrichmentStats:
+    """LLM 请求前上下文补充（世界记忆、社交状态等）的分来源耗时统计。
+
+    各来源在 on_llm_request 钩子中并发执行并共用一个截止时间，这里记录每个来源每轮的耗时与结果
+    （ok/empty/timeout/error），以及整轮的墙钟耗时和触达截止时间的轮数，用于判断哪个来源拖慢了 LLM 请求。
+    """
+
+    def __init__(self, host: AdapterHostProtocol) -> None:
+        self._host: Any = host
+        self._rounds = 0
+        self._deadline_hit_rounds = 0
+        self._total_ms_sum = 0.0
+        self._total_ms_max = 0.0
+        # source -> {count, msSum, msMax, outcomes...}
+        self._sources: dict[str, dict[str, Any]] = {}
+
+    def record(self, timings: dict[str, tuple[float, str]], total_ms: float, deadline_hit: bool) -> None:
+        self._rounds += 1
+        if deadline_hit:
+            self._deadline_hit_rounds += 1
+        self._total_ms_sum += total_ms
+        if total_ms > self._total_ms_max:
+            self._total_ms_max = total_ms
+        for name, (elapsed_ms, outcome) in timings.items():
+            entry = self._sources.get(name)
+            if entry is None:
+                entry = {"count": 0, "msSum": 0.0, "msMax": 0.0, **{o: 0 for o in _OUTCOMES}}
+                self._sources[name] = entry
+            entry["count"] += 1
+            entry["msSum"] += elapsed_ms
+            if elapsed_ms > entry["msMax"]:
+                entry["msMax"] = elapsed_ms
+            if outcome in _OUTCOMES:
+                entry[outcome] += 1
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        sources: dict[str, Any] = {}
+        for name, entry in self._sources.items():
+            count = entry["count"]
+            sources[name] = {
+                "count": count,
+                "avgMs": round(entry["msSum"] / count, 3) if count else 0.0,
+                "maxMs": round(entry["msMax"], 3),
+                **{o: entry[o] for o in _OUTCOMES},
+            }
+        return {
+            "rounds": self._rounds,
+            "deadlineHitRounds": self._deadline_hit_rounds,
+            "avgTotalMs": round(self._total_ms_sum / self._rounds, 3) if self._rounds else 0.0,
+            "maxTotalMs": round(self._total_ms_max, 3),
+            "sources": sources,
+        }
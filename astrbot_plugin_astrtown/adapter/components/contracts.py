@@ -3,6 +3,9 @@ from __future__ import annotations
 import asyncio
 from typing import Any, Protocol
 
+from ..config_snapshot import AdapterConfigSnapshot
+from ..timer_wheel import ExpiringDict
+
 
 class AdapterHostProtocol(Protocol):
     """组件可访问的适配器宿主协议。"""
@@ -14,6 +17,8 @@ class AdapterHostProtocol(Protocol):
     reconnect_min_delay: int
     reconnect_max_delay: int
     _ws: Any
+    _cfg: AdapterConfigSnapshot
+    _cfg_last_check_ts: float
     _stop_event: asyncio.Event
     _tasks: list[asyncio.Task[Any]]
     _pending_commands: dict[str, asyncio.Future[Any]]
@@ -28,9 +33,9 @@ class AdapterHostProtocol(Protocol):
     _auth_failed_token: str
     _auth_failed_code: str | None
     _auth_failed_last_log_ts: float
-    _conversation_started_recent_ms: dict[str, int]
-    _say_debounce_state: dict[str, dict[str, Any]]
-    _recent_timed_out_commands: dict[str, float]
+    _conversation_started_recent_ms: ExpiringDict[str, int]
+    _say_debounce_state: ExpiringDict[str, dict[str, Any]]
+    _recent_timed_out_commands: ExpiringDict[str, bool]
     _last_refill_wake_ts: float
     _queue_refill_gate_last_log_ts: float
     _queue_refill_gate_last_should_wake: bool | None
@@ -58,3 +63,12 @@ class AdapterHostProtocol(Protocol):
 
     def commit_event(self, event: Any) -> None:
         ...
+
+    def _on_late_command_ack(self, payload: Any) -> None:
+        ...
+
+    async def _replay_command_journal(self) -> None:
+        ...
+
+    def _refresh_config_snapshot(self) -> None:
+        ...
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import time
+from typing import Any
 
 try:
     from websockets.exceptions import ConnectionClosed
@@ -14,40 +15,167 @@ from astrbot import logger
 
 from ..id_util import new_id
 from .contracts import AdapterHostProtocol
+from .ws_writer import LANE_ACK, WsFrameWriter
+
+# 协议 v2 起 event.ack 支持 payload.eventIds 批量确认。
+BATCH_ACK_MIN_PROTOCOL_VERSION = 2
 
 
 class EventAckSender:
-    """世界事件 ACK 发送服务。"""
+    """世界事件 ACK 发送服务。
+
+    协商版本支持批量 ACK 时，按“首个立即发送 + 窗口内合并”的方式聚合 eventId：
+    空闲后的第一个 ACK 立即发出（不增加单事件延迟），flush 窗口内后续 ACK
+    合并为一帧，达到批量上限或窗口到期时发送。不支持时逐条发送。
+    wait=False 时只把 ACK 帧交给写者排队、不等待写出，供接收循环使用（ACK lane 优先级最低，
+    等待写出会让接收循环排在命令帧之后）。
+    """
+
+    def __init__(self, host: AdapterHostProtocol, writer: WsFrameWriter) -> None:
+        self._host: Any = host
+        self._writer = writer
+        self._pending_ids: list[str] = []
+        # 待发 ACK 所属的 ws 连接；重连后旧连接的 eventId 不再发送（Gateway 已清理 inflight）。
+        self._pending_ws: Any = None
+        self._flush_task: asyncio.Task[Any] | None = None
+        self._last_flush_ts = 0.0
+
+        self._frames_sent = 0
+        self._ids_acked = 0
+        self._batched_frames = 0
+        self._max_batch = 0
 
-    def __init__(self, host: AdapterHostProtocol) -> None:
-        self._host = host
+    def _batch_supported(self) -> bool:
+        return int(self._host._negotiated_version or 1) >= BATCH_ACK_MIN_PROTOCOL_VERSION
 
-    async def send_event_ack(self, event_id: str) -> None:
+    async def send_event_ack(self, event_id: str, *, wait: bool = True) -> None:
         if not event_id:
             return
+        if self._host._ws is None:
+            return
+
+        flush_ms = self._host._cfg.event_ack_flush_ms
+        if flush_ms <= 0 or not self._batch_supported():
+            await self._send_ack_frame([event_id], wait=wait)
+            return
+
+        self._bind_pending_ws()
+        self._pending_ids.append(event_id)
+        now = time.monotonic()
+        if len(self._pending_ids) >= self._host._cfg.event_ack_batch_max:
+            await self.flush(wait=wait)
+            return
+        if (now - self._last_flush_ts) * 1000.0 >= flush_ms:
+            # 空闲后的首个 ACK 立即发送，避免在 Gateway 逐条投递时引入额外延迟。
+            await self.flush(wait=wait)
+            return
+        if self._flush_task is None or self._flush_task.done():
+            delay = max(0.0, flush_ms / 1000.0 - (now - self._last_flush_ts))
+            self._flush_task = asyncio.create_task(self._flush_later(delay), name="astrtown_event_ack_flush")
+            self._host._track_background_task(self._flush_task)
+
+    async def send_event_acks(self, event_ids: list[str], *, wait: bool = True) -> None:
+        """一次性确认多个事件（如被合并/丢弃的事件）。"""
+        ids = [eid for eid in event_ids if eid]
+        if not ids or self._host._ws is None:
+            return
+        if not self._batch_supported():
+            for eid in ids:
+                await self._send_ack_frame([eid], wait=wait)
+            return
+        self._bind_pending_ws()
+        self._pending_ids.extend(ids)
+        await self.flush(wait=wait)
+
+    async def flush(self, *, wait: bool = True) -> None:
+        self._last_flush_ts = time.monotonic()
+        if not self._pending_ids:
+            return
+        if self._pending_ws is not self._host._ws:
+            self.reset()
+            return
+        batch_max = self._host._cfg.event_ack_batch_max
+        while self._pending_ids:
+            ids = self._pending_ids[:batch_max]
+            del self._pending_ids[:batch_max]
+            await self._send_ack_frame(ids, wait=wait)
+
+    def reset(self) -> None:
+        """丢弃未发出的 ACK 并取消待执行的 flush。"""
+        self._pending_ids.clear()
+        self._pending_ws = None
+        task = self._flush_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._flush_task = None
+
+    def _bind_pending_ws(self) -> None:
+        ws = self._host._ws
+        if self._pending_ws is not ws:
+            self._pending_ids.clear()
+            self._pending_ws = ws
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "batchSupported": self._batch_supported(),
+            "framesSent": self._frames_sent,
+            "eventsAcked": self._ids_acked,
+            "batchedFrames": self._batched_frames,
+            "maxBatch": self._max_batch,
+            "pending": len(self._pending_ids),
+        }
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def _send_ack_frame(self, event_ids: list[str], *, wait: bool = True) -> None:
         ws = self._host._ws
         if ws is None:
             return
+        if len(event_ids) == 1:
+            payload: dict[str, Any] = {"eventId": event_ids[0]}
+        else:
+            payload = {"eventIds": event_ids}
         ack = {
             "type": "event.ack",
             "id": new_id("ack"),
             "timestamp": int(time.time() * 1000),
-            "payload": {"eventId": event_id},
+            "payload": payload,
         }
+        if not wait:
+            fut = self._writer.post(ws, ack, LANE_ACK)
+            fut.add_done_callback(lambda f: self._on_posted(f, event_ids))
+            return
         try:
-            await ws.send(json.dumps(ack, ensure_ascii=False))
+            await self._writer.send(ws, ack, LANE_ACK)
         except ConnectionClosed:
             return
         except Exception:
             return
+        self._record_sent(event_ids)
+
+    def _on_posted(self, fut: asyncio.Future[None], event_ids: list[str]) -> None:
+        # 取出异常，避免未等待的 future 在失败时告警；发送失败与 await 路径一样静默丢弃。
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        self._record_sent(event_ids)
+
+    def _record_sent(self, event_ids: list[str]) -> None:
+        self._frames_sent += 1
+        self._ids_acked += len(event_ids)
+        if len(event_ids) > 1:
+            self._batched_frames += 1
+        if len(event_ids) > self._max_batch:
+            self._max_batch = len(event_ids)
 
         # 方案B：ACK 已发送保持功能不变，但降低日志噪声。
         # 这里采用“时间窗口汇总”采样：每 10s 最多打印一次，并附带窗口内 ACK 数量。
         now = time.time()
-        self._host._event_ack_sample_count += 1
+        self._host._event_ack_sample_count += len(event_ids)
         if (now - float(self._host._event_ack_last_log_ts or 0.0)) >= 10.0:
             count = int(self._host._event_ack_sample_count)
             self._host._event_ack_sample_count = 0
             self._host._event_ack_last_log_ts = now
             # astrbot.logger 不一定支持 trace，这里用 debug 但采样输出，避免刷屏。
-            logger.debug(f"[AstrTown] 事件ACK已发送(采样): lastEventId={event_id}, count={count}/10s")
+            logger.debug(f"[AstrTown] 事件ACK已发送(采样): lastEventId={event_ids[-1]}, count={count}/10s")
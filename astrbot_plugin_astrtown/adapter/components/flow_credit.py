@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from astrbot import logger
+
+from ..id_util import new_id
+from ..timer_wheel import ExpiringDict
+from .contracts import AdapterHostProtocol
+from .ws_writer import LANE_CONTROL, WsFrameWriter
+
+# 协议 v4 起支持 flow.credit（基于额度的入站流控）。
+FLOW_CREDIT_MIN_PROTOCOL_VERSION = 4
+
+# 已唤醒但 LLM 尚未开始处理的事件超过该时长不再计入积压（可能被流水线过滤，不会再有 LLM 请求）。
+_PENDING_WAKE_TTL_SEC = 120.0
+
+
+class FlowCreditController:
+    """入站世界事件的额度流控（协议 v4 flow.credit）。
+
+    连接建立后向 Gateway 授予额度，Gateway 每下发一条世界事件消耗 1；额度耗尽时事件留在 Gateway
+    的优先级队列中照常过期/淘汰，而不是堆积在处理不过来的 NPC 本地。
+    目标在途额度 = 窗口 - 本地未处理完的事件数 - 等待 LLM 处理的唤醒数（至少为 1，保证不会停滞），
+    事件处理完成后按差额补发额度；差额达到窗口的 1/4 或在途额度归零时才发送，减少小帧。
+    """
+
+    def __init__(self, host: AdapterHostProtocol, writer: WsFrameWriter) -> None:
+        self._host: Any = host
+        self._writer = writer
+        # 当前连接是否启用流控，以及授予额度所属的连接。
+        self._enabled = False
+        self._ws: Any = None
+        # 已授予 Gateway 尚未消耗的额度（本地估计）。
+        self._outstanding = 0
+        # 已收到尚未处理完（ACK 丢弃或分发完成）的世界事件数；跨重连保留，反映本地积压。
+        self._held = 0
+        # 已 commit_event 唤醒、LLM 尚未开始处理的事件：eventId -> True
+        self._pending_wakes: ExpiringDict[str, bool] = ExpiringDict(max_size=1024)
+        self._grant_task: asyncio.Task[Any] | None = None
+
+        self._granted_total = 0
+        self._grant_frames = 0
+        self._received_total = 0
+        self._overdrawn_total = 0
+        self._throttled_total = 0
+
+    def _window(self) -> int:
+        return self._host._cfg.flow_credit_window
+
+    def supported(self) -> bool:
+        return int(self._host._negotiated_version or 1) >= FLOW_CREDIT_MIN_PROTOCOL_VERSION
+
+    def _target(self) -> int:
+        backlog = self._held + len(self._pending_wakes)
+        return max(1, self._window() - backlog)
+
+    def on_connected(self) -> None:
+        """连接鉴权成功后调用：重置额度并授予初始窗口。"""
+        self._outstanding = 0
+        self._ws = self._host._ws
+        self._enabled = self._window() > 0 and self.supported()
+        if self._enabled:
+            logger.info(
+                f"[AstrTown] 已启用入站流控: window={self._window()}, backlog={self._held}, "
+                f"pendingWakes={len(self._pending_wakes)}"
+            )
+            self._schedule_grant(force=True)
+
+    def on_event_received(self) -> None:
+        """收到一条 Gateway 下发的世界事件（进入去重/入队之前）。"""
+        self._received_total += 1
+        self._held += 1
+        if not self._enabled:
+            return
+        if self._outstanding > 0:
+            self._outstanding -= 1
+        else:
+            # Gateway 在收到首次授予前下发的事件，不占用额度。
+            self._overdrawn_total += 1
+
+    def release(self) -> None:
+        """一条世界事件已处理完（或被去重/过期/合并丢弃），归还额度。"""
+        if self._held > 0:
+            self._held -= 1
+        self._schedule_grant()
+
+    def note_wake(self, event_id: str) -> None:
+        if event_id:
+            self._pending_wakes.set(event_id, True, _PENDING_WAKE_TTL_SEC)
+
+    def note_llm_started(self, event_id: str) -> None:
+        if event_id and self._pending_wakes.pop(event_id) is not None:
+            self._schedule_grant()
+
+    def _deficit(self) -> int:
+        return self._target() - self._outstanding
+
+    def _schedule_grant(self, *, force: bool = False) -> None:
+        if not self._enabled or self._ws is not self._host._ws:
+            return
+        deficit = self._deficit()
+        if deficit <= 0:
+            if self._outstanding > 0 and self._target() < self._window():
+                self._throttled_total += 1
+            return
+        if not force and self._outstanding > 0 and deficit < max(1, self._window() // 4):
+            return
+        if self._grant_task is not None and not self._grant_task.done():
+            return
+        self._grant_task = asyncio.create_task(self._send_grant(), name="astrtown_flow_credit")
+        self._host._track_background_task(self._grant_task)
+
+    async def _send_grant(self) -> None:
+        ws = self._ws
+        if ws is None or ws is not self._host._ws:
+            return
+        credits = self._deficit()
+        if credits <= 0:
+            return
+        # 先记账再发送，期间到达的事件按新额度扣减。
+        self._outstanding += credits
+        frame = {
+            "type": "flow.credit",
+            "id": new_id("credit"),
+            "timestamp": int(time.time() * 1000),
+            # window 供 Gateway 限制累积额度，避免记账偏差时额度超出本地窗口。
+            "payload": {"credits": credits, "window": self._window()},
+        }
+        try:
+            await self._writer.send(ws, frame, LANE_CONTROL)
+        except Exception:
+            # 连接已断开：重连后 on_connected 会重新授予。
+            return
+        self._granted_total += credits
+        self._grant_frames += 1
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self._enabled,
+            "window": self._window(),
+            "outstanding": self._outstanding,
+            "held": self._held,
+            "pendingWakes": len(self._pending_wakes),
+            "target": self._target(),
+            "received": self._received_total,
+            "granted": self._granted_total,
+            "grantFrames": self._grant_frames,
+            "overdrawn": self._overdrawn_total,
+            "throttled": self._throttled_total,
+        }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from typing import Any
 from urllib.parse import urlparse
 
@@ -12,12 +14,115 @@ from astrbot import logger
 
 from .contracts import AdapterHostProtocol
 
+# 连接池参数：Gateway 为单一主机，少量 keep-alive 连接即可覆盖并发的检索/回写请求。
+_POOL_LIMIT = 32
+_POOL_LIMIT_PER_HOST = 16
+_POOL_KEEPALIVE_SEC = 30.0
+_DNS_CACHE_TTL_SEC = 300
+
 
 class GatewayHttpClient:
-    """Gateway HTTP 客户端。"""
+    """Gateway HTTP 客户端。
+
+    所有 Gateway HTTP 请求共用一个长生命周期的 aiohttp 会话（keep-alive 连接池 + DNS 缓存），
+    避免每次调用重新建立 TCP/TLS 连接；超时按请求单独指定。会话在适配器 terminate 时关闭，
+    关闭后不再创建新会话。连接新建/复用次数由 aiohttp 连接追踪信号统计。
+    """
 
     def __init__(self, host: AdapterHostProtocol) -> None:
         self._host = host
+        self._session: Any = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+        self._closed = False
+
+        self._sessions_created = 0
+        self._stale_sessions_closed = 0
+        self._connections_created = 0
+        self._connection_reuses = 0
+
+    def session(self) -> Any:
+        """返回共享会话（需在事件循环内调用）；首次使用时创建。aiohttp 不可用时返回 None。
+
+        事件循环变化时关闭绑定在旧循环上的会话后重建；close() 之后调用抛出 RuntimeError。
+        """
+        if aiohttp is None:
+            return None
+        if self._closed:
+            raise RuntimeError("Gateway HTTP client closed")
+        loop = asyncio.get_running_loop()
+        session = self._session
+        if session is not None and not session.closed:
+            if self._session_loop is loop:
+                return session
+            self._discard_stale_session(session, self._session_loop)
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(self._on_connection_create_end)
+        trace.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        connector = aiohttp.TCPConnector(
+            limit=_POOL_LIMIT,
+            limit_per_host=_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=_POOL_KEEPALIVE_SEC,
+            ttl_dns_cache=_DNS_CACHE_TTL_SEC,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=10.0),
+            trace_configs=[trace],
+        )
+        self._session = session
+        self._session_loop = loop
+        self._sessions_created += 1
+        return session
+
+    def _discard_stale_session(self, session: Any, loop: asyncio.AbstractEventLoop | None) -> None:
+        """关闭绑定在旧事件循环上的会话，释放其连接器。
+
+        旧循环仍在（其他线程）运行时交给它关闭；否则在当前循环关闭（旧循环已关闭时连接器直接标记为关闭）。
+        """
+        self._stale_sessions_closed += 1
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._close_session(session), loop)
+            return
+        task = asyncio.create_task(self._close_session(session), name="astrtown_http_stale_close")
+        self._host._track_background_task(task)
+
+    @staticmethod
+    async def _close_session(session: Any) -> None:
+        try:
+            await session.close()
+        except Exception as e:
+            logger.debug(f"[AstrTown] 关闭 HTTP 会话失败: {e}")
+
+    async def _on_connection_create_end(self, _session: Any, _ctx: Any, _params: Any) -> None:
+        self._connections_created += 1
+
+    async def _on_connection_reuseconn(self, _session: Any, _ctx: Any, _params: Any) -> None:
+        self._connection_reuses += 1
+
+    async def close(self) -> None:
+        """关闭共享会话；此后 session() 拒绝创建新会话。"""
+        self._closed = True
+        session = self._session
+        self._session = None
+        self._session_loop = None
+        if session is None or session.closed:
+            return
+        await self._close_session(session)
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        session = self._session
+        connector = getattr(session, "connector", None) if session is not None else None
+        return {
+            "open": session is not None and not session.closed,
+            "closed": self._closed,
+            "sessionsCreated": self._sessions_created,
+            "staleSessionsClosed": self._stale_sessions_closed,
+            "connectionsCreated": self._connections_created,
+            "connectionReuses": self._connection_reuses,
+            "poolLimit": _POOL_LIMIT,
+            "poolLimitPerHost": _POOL_LIMIT_PER_HOST,
+            "connectorClosed": bool(getattr(connector, "closed", True)),
+        }
 
     async def post_json_best_effort(
         self,
@@ -26,9 +131,11 @@ class GatewayHttpClient:
         headers: dict[str, str],
         body: dict[str, Any],
         action_name: str,
+        timeout_sec: float = 8.0,
     ) -> bool:
         try:
-            async with session.post(url, json=body, headers=headers) as resp:
+            timeout = aiohttp.ClientTimeout(total=timeout_sec) if aiohttp is not None else None
+            async with session.post(url, json=body, headers=headers, timeout=timeout) as resp:
                 if 200 <= resp.status < 300:
                     return True
                 text = ""
@@ -88,27 +195,73 @@ class GatewayHttpClient:
 
         try:
             timeout = aiohttp.ClientTimeout(total=3.0)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, json=body, headers=headers) as resp:
-                    if resp.status < 200 or resp.status >= 300:
+            session = self.session()
+            async with session.post(url, json=body, headers=headers, timeout=timeout) as resp:
+                if resp.status < 200 or resp.status >= 300:
+                    text = ""
+                    try:
+                        text = await resp.text()
+                    except Exception:
                         text = ""
-                        try:
-                            text = await resp.text()
-                        except Exception:
-                            text = ""
-                        logger.warning(f"[AstrTown] 记忆检索 http {resp.status}: {text[:200]}")
-                        return []
-
-                    data = await resp.json()
-                    if isinstance(data, dict):
-                        memories = data.get("memories")
-                        if isinstance(memories, list):
-                            return [m for m in memories if isinstance(m, dict)]
+                    logger.warning(f"[AstrTown] 记忆检索 http {resp.status}: {text[:200]}")
+                    return []
+
+                data = await resp.json()
+                if isinstance(data, dict):
+                    memories = data.get("memories")
+                    if isinstance(memories, list):
+                        return [m for m in memories if isinstance(m, dict)]
         except Exception as e:
             logger.error(f"[AstrTown] AstrTown 记忆检索网络异常: {e}")
 
         return []
 
+    async def get_social_state(
+        self,
+        world_id: str,
+        owner_id: str,
+        target_id: str,
+        timeout_sec: float = 2.0,
+    ) -> dict[str, Any] | None:
+        """查询 owner 对 target 的社交状态（关系 + 好感度）。
+
+        返回：
+            dict：形如 {relationship, affinity}；非 2xx 或格式异常时返回 None。
+            网络异常与超时向上抛出，由调用方区分提示。
+        """
+        if aiohttp is None:
+            logger.warning("[AstrTown] aiohttp not available; social state query skipped")
+            return None
+
+        base = self.build_http_base_url()
+        if not base:
+            return None
+
+        url = base + "/api/bot/social/state"
+        headers = {"Authorization": f"Bearer {self._host.token}"}
+        query = {
+            "worldId": str(world_id or "").strip(),
+            "ownerId": str(owner_id or "").strip(),
+            "targetId": str(target_id or "").strip(),
+        }
+
+        timeout = aiohttp.ClientTimeout(total=timeout_sec)
+        session = self.session()
+        async with session.get(url, params=query, headers=headers, timeout=timeout) as resp:
+            if resp.status < 200 or resp.status >= 300:
+                text = ""
+                try:
+                    text = await resp.text()
+                except Exception:
+                    text = ""
+                logger.warning(f"[AstrTown] social state 查询失败 http={resp.status}: {text[:200]}")
+                return None
+
+            data = await resp.json()
+            if not isinstance(data, dict):
+                return None
+            return data
+
     async def get_conversation_transcript(
         self,
         world_id: str,
@@ -156,51 +309,51 @@ class GatewayHttpClient:
 
         try:
             timeout = aiohttp.ClientTimeout(total=8.0)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, json=body, headers=headers) as resp:
-                    if resp.status < 200 or resp.status >= 300:
+            session = self.session()
+            async with session.post(url, json=body, headers=headers, timeout=timeout) as resp:
+                if resp.status < 200 or resp.status >= 300:
+                    text = ""
+                    try:
+                        text = await resp.text()
+                    except Exception:
                         text = ""
-                        try:
-                            text = await resp.text()
-                        except Exception:
-                            text = ""
-                        logger.warning(
-                            f"[AstrTown] conversation transcript 失败 http={resp.status}, "
-                            f"conversationId={cid}: {text[:200]}"
-                        )
-                        return None
-
-                    data = await resp.json()
-                    if not isinstance(data, dict):
-                        logger.warning(
-                            f"[AstrTown] conversation transcript 响应格式异常: type={type(data)!r}, conversationId={cid}"
+                    logger.warning(
+                        f"[AstrTown] conversation transcript 失败 http={resp.status}, "
+                        f"conversationId={cid}: {text[:200]}"
+                    )
+                    return None
+
+                data = await resp.json()
+                if not isinstance(data, dict):
+                    logger.warning(
+                        f"[AstrTown] conversation transcript 响应格式异常: type={type(data)!r}, conversationId={cid}"
+                    )
+                    return None
+
+                raw_messages = data.get("messages")
+                normalized_messages: list[dict[str, str]] = []
+                if isinstance(raw_messages, list):
+                    for item in raw_messages:
+                        if not isinstance(item, dict):
+                            continue
+                        speaker_id = str(
+                            item.get("speakerId")
+                            or item.get("senderId")
+                            or item.get("authorId")
+                            or item.get("author")
+                            or "unknown"
+                        ).strip() or "unknown"
+                        content = str(item.get("content") or item.get("text") or "").strip()
+                        if not content:
+                            continue
+                        normalized_messages.append(
+                            {
+                                "speakerId": speaker_id,
+                                "content": content,
+                            }
                         )
-                        return None
-
-                    raw_messages = data.get("messages")
-                    normalized_messages: list[dict[str, str]] = []
-                    if isinstance(raw_messages, list):
-                        for item in raw_messages:
-                            if not isinstance(item, dict):
-                                continue
-                            speaker_id = str(
-                                item.get("speakerId")
-                                or item.get("senderId")
-                                or item.get("authorId")
-                                or item.get("author")
-                                or "unknown"
-                            ).strip() or "unknown"
-                            content = str(item.get("content") or item.get("text") or "").strip()
-                            if not content:
-                                continue
-                            normalized_messages.append(
-                                {
-                                    "speakerId": speaker_id,
-                                    "content": content,
-                                }
-                            )
-                    data["messages"] = normalized_messages
-                    return data
+                data["messages"] = normalized_messages
+                return data
         except Exception as e:
             logger.warning(f"[AstrTown] conversation transcript 网络异常: {e}")
             return None
@@ -232,18 +385,18 @@ class GatewayHttpClient:
 
         try:
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(url, json=body, headers=headers) as resp:
-                    if resp.status < 200 or resp.status >= 300:
+            session = self.session()
+            async with session.post(url, json=body, headers=headers, timeout=timeout) as resp:
+                if resp.status < 200 or resp.status >= 300:
+                    text = ""
+                    try:
+                        text = await resp.text()
+                    except Exception:
                         text = ""
-                        try:
-                            text = await resp.text()
-                        except Exception:
-                            text = ""
-                        logger.warning(
-                            f"[AstrTown] persona sync http {resp.status} for playerId={pid}: {text[:200]}"
-                        )
-                        return
+                    logger.warning(
+                        f"[AstrTown] persona sync http {resp.status} for playerId={pid}: {text[:200]}"
+                    )
+                    return
         except Exception as e:
             logger.warning(f"[AstrTown] persona sync request failed for playerId={pid}: {e}")
             return
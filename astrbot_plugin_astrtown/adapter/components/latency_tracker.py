@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Any
+
+from ..protocol import CommandAckPayload
+from ..ttl_cache import TtlLruCache
+from .contracts import AdapterHostProtocol
+
+# 每个（阶段, 命令类型）保留最近的样本数；分位数在快照时排序计算。
+_SAMPLE_WINDOW = 512
+# 唤醒到命令发出超过该时长不计入 decide 阶段（多半不是同一轮 LLM 决策）。
+_DECIDE_MAX_SEC = 120.0
+
+# action.finished 的 actionType 与命令类型不完全一致（活动完成上报为 activity）。
+_ACTION_TYPE_ALIASES: dict[str, tuple[str, ...]] = {
+    "activity": ("set_activity", "do_something"),
+}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return round(sorted_values[rank], 3)
+
+
+def _summarize(samples: deque[float]) -> dict[str, Any]:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "maxMs": round(values[-1], 3) if values else 0.0,
+    }
+
+
+class CommandLatencyTracker:
+    """命令端到端延迟关联表。
+
+    以 commandId 为键记录每条命令的发送、ACK 与 action.finished 时间（ACK 携带的 inputId 作为辅助键），
+    按命令类型统计各阶段延迟分位数：
+    - decide：LLM 被唤醒到命令发出（我们自己的 LLM 耗时）；
+    - ack：命令发出到 command.ack（Gateway 队列 + HTTP 受理）；
+    - execute：ACK 到 action.finished（Convex 引擎排队与执行）；
+    - total：命令发出到 action.finished。
+    action.finished 不携带 commandId 时，按动作类型匹配最早一条未完成的命令（引擎按序消费同一 agent 的命令）。
+    """
+
+    def __init__(self, host: AdapterHostProtocol) -> None:
+        self._host: Any = host
+        # commandId -> {"type", "sentAt", "ackAt", "inputId"}（monotonic 秒）
+        self._open: TtlLruCache[str, dict[str, Any]] = TtlLruCache(2048, 600.0)
+        self._by_input_id: TtlLruCache[str, str] = TtlLruCache(2048, 600.0)
+        # 动作类型 -> 等待 action.finished 的 commandId（按 ACK 顺序）
+        self._fifo: dict[str, deque[str]] = {}
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+        self._last_wake_at: float | None = None
+
+        self._finished_matched = 0
+        self._finished_by_id = 0
+        self._finished_unmatched = 0
+
+    def _sample(self, stage: str, command_type: str, value_ms: float) -> None:
+        key = (stage, command_type)
+        bucket = self._samples.get(key)
+        if bucket is None:
+            bucket = deque(maxlen=_SAMPLE_WINDOW)
+            self._samples[key] = bucket
+        bucket.append(max(0.0, value_ms))
+
+    @staticmethod
+    def _action_type(msg_type: str) -> str:
+        return msg_type[len("command.") :] if msg_type.startswith("command.") else msg_type
+
+    def note_wake(self) -> None:
+        """LLM 唤醒（commit_event）时调用，作为 decide 阶段起点。"""
+        self._last_wake_at = time.monotonic()
+
+    def note_decided(self, msg_type: str) -> None:
+        """LLM 工具调用发出命令时调用。"""
+        wake_at = self._last_wake_at
+        if wake_at is None:
+            return
+        elapsed = time.monotonic() - wake_at
+        if elapsed <= _DECIDE_MAX_SEC:
+            self._sample("decide", self._action_type(msg_type), elapsed * 1000.0)
+
+    def record_ack(self, command_id: str, msg_type: str, sent_at: float, ack: CommandAckPayload) -> None:
+        now = time.monotonic()
+        action_type = self._action_type(msg_type)
+        self._sample("ack", action_type, (now - sent_at) * 1000.0)
+        if ack.status != "accepted" or ack.duplicate:
+            return
+        self._open.put(
+            command_id,
+            {"type": action_type, "sentAt": sent_at, "ackAt": now, "inputId": ack.inputId},
+        )
+        if ack.inputId:
+            self._by_input_id.put(str(ack.inputId), command_id)
+        fifo = self._fifo.get(action_type)
+        if fifo is None:
+            fifo = deque(maxlen=256)
+            self._fifo[action_type] = fifo
+        fifo.append(command_id)
+
+    def _match_by_id(self, result: dict[str, Any]) -> str | None:
+        for field in ("commandId", "inputId", "eventId"):
+            value = result.get(field)
+            if not value:
+                continue
+            value = str(value)
+            if self._open.get(value) is not None:
+                return value
+            command_id = self._by_input_id.get(value)
+            if command_id is not None:
+                return command_id
+        return None
+
+    def _match_fifo(self, action_type: str) -> str | None:
+        for candidate in (action_type, *_ACTION_TYPE_ALIASES.get(action_type, ())):
+            fifo = self._fifo.get(candidate)
+            while fifo:
+                command_id = fifo.popleft()
+                if self._open.get(command_id) is not None:
+                    return command_id
+        return None
+
+    def record_finished(self, action_type: str, result: dict[str, Any]) -> None:
+        """action.finished 到达：关联到发出它的命令并记录执行/总耗时。"""
+        command_id = self._match_by_id(result)
+        by_id = command_id is not None
+        if command_id is None:
+            command_id = self._match_fifo(action_type)
+        entry = self._open.get(command_id) if command_id is not None else None
+        if command_id is None or entry is None:
+            self._finished_unmatched += 1
+            return
+        self._open.pop(command_id)
+        if entry.get("inputId"):
+            self._by_input_id.pop(str(entry["inputId"]))
+        self._finished_matched += 1
+        if by_id:
+            self._finished_by_id += 1
+        now = time.monotonic()
+        command_type = str(entry["type"])
+        self._sample("execute", command_type, (now - float(entry["ackAt"])) * 1000.0)
+        self._sample("total", command_type, (now - float(entry["sentAt"])) * 1000.0)
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        by_type: dict[str, dict[str, Any]] = {}
+        for (stage, command_type), samples in self._samples.items():
+            by_type.setdefault(command_type, {})[stage] = _summarize(samples)
+        return {
+            "byType": by_type,
+            "awaitingFinish": len(self._open),
+            "finishedMatched": self._finished_matched,
+            "finishedMatchedById": self._finished_by_id,
+            "finishedUnmatched": self._finished_unmatched,
+        }
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any
+
+from astrbot import logger
+
+from ..ttl_cache import TtlLruCache
+from .contracts import AdapterHostProtocol
+from .gateway_http_client import GatewayHttpClient
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# 查询首尾的标点对向量检索结果几乎没有影响，归一化时去掉以提高命中率。
+_EDGE_PUNCTUATION = " \t\r\n.,!?;:，。！？；：、…\"'“”‘’()（）[]【】"
+
+
+def normalize_memory_query(query_text: str) -> str:
+    text = _WHITESPACE_RE.sub(" ", str(query_text or "")).strip(_EDGE_PUNCTUATION)
+    return text.casefold()
+
+
+class MemorySearchCache:
+    """世界记忆检索缓存（TTL + LRU + single-flight）。
+
+    以 (playerId, 归一化查询, limit) 为键缓存 /api/bot/memory/search 的结果；
+    并发的相同查询只发起一次请求，其余调用等待同一结果。
+    本适配器写入新记忆（memory.inject）后整体失效，进行中的请求结果也不再写入缓存。
+    空结果不缓存（无法区分“确实没有”与请求失败）。
+    """
+
+    def __init__(self, host: AdapterHostProtocol, http_client: GatewayHttpClient) -> None:
+        self._host: Any = host
+        self._http_client = http_client
+        self._ttl_sec = float(
+            self._safe_int(
+                host.config.get("astrtown_memory_search_cache_ttl_sec", 60),
+                60,
+                "astrtown_memory_search_cache_ttl_sec",
+                "platform_config",
+            )
+        )
+        self._cache: TtlLruCache[tuple[str, str, int], list[dict[str, Any]]] = TtlLruCache(
+            max(
+                1,
+                self._safe_int(
+                    host.config.get("astrtown_memory_search_cache_size", 256),
+                    256,
+                    "astrtown_memory_search_cache_size",
+                    "platform_config",
+                ),
+            ),
+            self._ttl_sec,
+        )
+        self._inflight: dict[tuple[str, str, int], asyncio.Task[list[dict[str, Any]]]] = {}
+        # 每次失效递增；请求发起时的代数与完成时不一致则结果不入缓存。
+        self._generation = 0
+
+        self._lookups = 0
+        self._coalesced = 0
+        self._fetches = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def enabled(self) -> bool:
+        return self._ttl_sec > 0
+
+    async def search(self, query_text: str, limit: int = 3) -> list[dict[str, Any]]:
+        if not self.enabled():
+            return await self._http_client.search_world_memory(query_text, limit)
+
+        normalized = normalize_memory_query(query_text)
+        if not normalized:
+            return []
+        key = (str(self._host._player_id or ""), normalized, int(limit))
+        self._lookups += 1
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch(key, query_text, int(limit), self._generation),
+                name="astrtown_memory_search",
+            )
+            self._inflight[key] = task
+        else:
+            self._coalesced += 1
+        # shield：单个调用方被取消不影响其他等待同一结果的调用方。
+        return list(await asyncio.shield(task))
+
+    async def _fetch(
+        self,
+        key: tuple[str, str, int],
+        query_text: str,
+        limit: int,
+        generation: int,
+    ) -> list[dict[str, Any]]:
+        self._fetches += 1
+        try:
+            memories = await self._http_client.search_world_memory(query_text, limit)
+            if memories and generation == self._generation:
+                self._cache.put(key, memories)
+            return memories
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                self._inflight.pop(key, None)
+
+    def invalidate(self) -> None:
+        """本适配器写入了新记忆：丢弃全部缓存结果。"""
+        self._generation += 1
+        self._invalidations += 1
+        self._cache.clear()
+        # 失效前发起的请求仍返回给已在等待的调用方，但新的查询不再合并到这些请求上。
+        self._inflight.clear()
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        stats = self._cache.snapshot_stats()
+        lookups = self._lookups
+        stats.update(
+            {
+                "enabled": self.enabled(),
+                "lookups": lookups,
+                "coalesced": self._coalesced,
+                "fetches": self._fetches,
+                "invalidations": self._invalidations,
+                "inflight": len(self._inflight),
+                # 命中缓存或合并到进行中的请求，均未产生额外的检索请求。
+                "effectiveHitRate": round((stats["hits"] + self._coalesced) / lookups, 4) if lookups else 0.0,
+            }
+        )
+        return stats
@@ -14,7 +14,9 @@ from astrbot import logger
 from ..astrtown_adapter import get_reflection_llm_callback
 from .contracts import AdapterHostProtocol
 from .gateway_http_client import GatewayHttpClient
+from .memory_search_cache import MemorySearchCache
 from .reflection_parser import ReflectionParser
+from .social_state_cache import SocialStateCache
 
 
 class ReflectionOrchestrator:
@@ -25,10 +27,14 @@ class ReflectionOrchestrator:
         host: AdapterHostProtocol,
         parser: ReflectionParser,
         http_client: GatewayHttpClient,
+        memory_cache: MemorySearchCache,
+        social_cache: SocialStateCache,
     ) -> None:
         self._host = host
         self._parser = parser
         self._http_client = http_client
+        self._memory_cache = memory_cache
+        self._social_cache = social_cache
 
     async def async_reflect_on_conversation(
         self,
@@ -132,53 +138,58 @@ class ReflectionOrchestrator:
                 return
 
             headers = {"Authorization": f"Bearer {self._host.token}"}
-            timeout = aiohttp.ClientTimeout(total=8.0)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                memory_body = {
-                    "agentId": agent_id,
-                    "playerId": owner_id,
-                    "summary": summary,
-                    "importance": importance,
-                    "memoryType": "conversation",
-                }
-                memory_ok = await self._http_client.post_json_best_effort(
-                    session=session,
-                    url=base + "/api/bot/memory/inject",
-                    headers=headers,
-                    body=memory_body,
-                    action_name="memory.inject",
+            session = self._http_client.session()
+            memory_body = {
+                "agentId": agent_id,
+                "playerId": owner_id,
+                "summary": summary,
+                "importance": importance,
+                "memoryType": "conversation",
+            }
+            memory_ok = await self._http_client.post_json_best_effort(
+                session=session,
+                url=base + "/api/bot/memory/inject",
+                headers=headers,
+                body=memory_body,
+                action_name="memory.inject",
+            )
+            # 失败也可能已在服务端写入（如超时），统一让检索缓存失效。
+            self._memory_cache.invalidate()
+            if not memory_ok:
+                logger.warning(
+                    f"[AstrTown] reflection memory.inject 失败，跳过累计 importance, conversationId={conversation_id}"
                 )
-                if not memory_ok:
-                    logger.warning(
-                        f"[AstrTown] reflection memory.inject 失败，跳过累计 importance, conversationId={conversation_id}"
-                    )
-                    return
+                return
 
-                target_id = str(other_player_id or "").strip()
-                if not target_id:
-                    logger.warning(
-                        f"[AstrTown] reflection 缺少 other_player_id，跳过好感度回写和累计 importance, conversationId={conversation_id}"
-                    )
-                    return
+            target_id = str(other_player_id or "").strip()
+            if not target_id:
+                logger.warning(
+                    f"[AstrTown] reflection 缺少 other_player_id，跳过好感度回写和累计 importance, conversationId={conversation_id}"
+                )
+                return
 
-                affinity_body = {
-                    "ownerId": owner_id,
-                    "targetId": target_id,
-                    "scoreDelta": affinity_delta,
-                    "label": affinity_label,
-                }
-                affinity_ok = await self._http_client.post_json_best_effort(
-                    session=session,
-                    url=base + "/api/bot/social/affinity",
-                    headers=headers,
-                    body=affinity_body,
-                    action_name="social.affinity",
+            affinity_body = {
+                "ownerId": owner_id,
+                "targetId": target_id,
+                "scoreDelta": affinity_delta,
+                "label": affinity_label,
+            }
+            affinity_ok = await self._http_client.post_json_best_effort(
+                session=session,
+                url=base + "/api/bot/social/affinity",
+                headers=headers,
+                body=affinity_body,
+                action_name="social.affinity",
+            )
+            if not affinity_ok:
+                # 回写可能已在服务端生效（如超时），让缓存重新拉取。
+                self._social_cache.invalidate(owner_id, target_id)
+                logger.warning(
+                    f"[AstrTown] reflection social.affinity 失败，跳过累计 importance, conversationId={conversation_id}"
                 )
-                if not affinity_ok:
-                    logger.warning(
-                        f"[AstrTown] reflection social.affinity 失败，跳过累计 importance, conversationId={conversation_id}"
-                    )
-                    return
+                return
+
+            self._social_cache.apply_affinity_delta(owner_id, target_id, affinity_delta, affinity_label)
 
             logger.info(
                 f"[AstrTown] conversation reflection completed: conversationId={conversation_id}, delta={affinity_delta}"
@@ -235,23 +246,23 @@ class ReflectionOrchestrator:
                 {"worldId": world_id, "playerId": owner_id, "count": 50}
             )
             recent_memories: Any = None
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                try:
-                    async with session.get(recent_url, headers=headers) as resp:
-                        if resp.status < 200 or resp.status >= 300:
+            session = self._http_client.session()
+            try:
+                async with session.get(recent_url, headers=headers, timeout=timeout) as resp:
+                    if resp.status < 200 or resp.status >= 300:
+                        text = ""
+                        try:
+                            text = await resp.text()
+                        except Exception:
                             text = ""
-                            try:
-                                text = await resp.text()
-                            except Exception:
-                                text = ""
-                            logger.warning(
-                                f"[AstrTown] 获取近期记忆失败 http={resp.status}, worldId={world_id}, playerId={owner_id}, body={text[:200]}"
-                            )
-                            return
-                        recent_memories = await resp.json()
-                except Exception as e:
-                    logger.warning(f"[AstrTown] 获取近期记忆网络异常: {e}")
-                    return
+                        logger.warning(
+                            f"[AstrTown] 获取近期记忆失败 http={resp.status}, worldId={world_id}, playerId={owner_id}, body={text[:200]}"
+                        )
+                        return
+                    recent_memories = await resp.json()
+            except Exception as e:
+                logger.warning(f"[AstrTown] 获取近期记忆网络异常: {e}")
+                return
 
             if not isinstance(recent_memories, list):
                 logger.warning("[AstrTown] higher reflection skipped: recent memories payload invalid")
@@ -285,24 +296,25 @@ class ReflectionOrchestrator:
                 return
 
             success_count = 0
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                for insight in insights:
-                    body = {
-                        "agentId": agent_id,
-                        "playerId": owner_id,
-                        "summary": insight,
-                        "importance": 10,
-                        "memoryType": "reflection",
-                    }
-                    ok = await self._http_client.post_json_best_effort(
-                        session=session,
-                        url=base + "/api/bot/memory/inject",
-                        headers=headers,
-                        body=body,
-                        action_name="memory.inject.higher_reflection",
-                    )
-                    if ok:
-                        success_count += 1
+            session = self._http_client.session()
+            for insight in insights:
+                body = {
+                    "agentId": agent_id,
+                    "playerId": owner_id,
+                    "summary": insight,
+                    "importance": 10,
+                    "memoryType": "reflection",
+                }
+                ok = await self._http_client.post_json_best_effort(
+                    session=session,
+                    url=base + "/api/bot/memory/inject",
+                    headers=headers,
+                    body=body,
+                    action_name="memory.inject.higher_reflection",
+                )
+                if ok:
+                    success_count += 1
+            self._memory_cache.invalidate()
 
             if success_count <= 0:
                 logger.warning("[AstrTown] higher reflection completed but no insight persisted")
@@ -57,7 +57,8 @@ class SessionContextService:
             )
         return messages
 
-    def build_session_id(self, event_type: str, payload: dict[str, Any]) -> str:
+    def resolve_session_id(self, event_type: str, payload: dict[str, Any]) -> str:
+        """计算事件归属的会话 ID（无日志，可用于热路径分片）。"""
         player_id = str(self._host._player_id or payload.get("playerId") or "").strip()
         world_id = str(self._host._world_id or payload.get("worldId") or "").strip()
 
@@ -74,18 +75,12 @@ class SessionContextService:
             conversation_id = str(payload.get("conversationId") or "").strip()
 
         if conversation_id and player_id:
-            sid = f"astrtown:world:{world_id}:player:{player_id}:conversation:{conversation_id}"
-        elif not unique_session:
-            sid = f"astrtown:world:{world_id}"
-        else:
-            if player_id:
-                sid = f"astrtown:world:{world_id}:player:{player_id}"
-            else:
-                sid = f"astrtown:world:{world_id}"
-
-        logger.info(
-            "[AstrTown] _build_session_id: "
-            f"event_type={event_type}, unique_session={unique_session}, world_id={world_id}, "
-            f"player_id={player_id}, conversation_id={conversation_id}, sid={sid}"
-        )
+            return f"astrtown:world:{world_id}:player:{player_id}:conversation:{conversation_id}"
+        if unique_session and player_id:
+            return f"astrtown:world:{world_id}:player:{player_id}"
+        return f"astrtown:world:{world_id}"
+
+    def build_session_id(self, event_type: str, payload: dict[str, Any]) -> str:
+        sid = self.resolve_session_id(event_type, payload)
+        logger.info(f"[AstrTown] _build_session_id: event_type={event_type}, sid={sid}")
         return sid
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+from typing import Any
+
+from astrbot import logger
+
+from ..ttl_cache import TtlLruCache
+from .contracts import AdapterHostProtocol
+from .gateway_http_client import GatewayHttpClient
+
+# 与 Convex 侧 social.affinity 的取值范围一致。
+_AFFINITY_MIN = -100
+_AFFINITY_MAX = 100
+
+
+class SocialStateCache:
+    """社交状态（关系 + 好感度）缓存，按 (ownerId, targetId) 存储 /api/bot/social/state 的结果。
+
+    两者只会因社交事件（关系提议/回应）或本适配器的好感度回写而变化：
+    关系事件到达或本方回应关系提议的命令得到最终 ACK（含超时后的迟到 ACK）时失效对应条目；
+    好感度回写成功时就地更新缓存，无需重新查询。
+    TTL 仅作为兜底（防止漏掉其他途径的变更），并发的相同查询只发起一次请求。
+    """
+
+    def __init__(self, host: AdapterHostProtocol, http_client: GatewayHttpClient) -> None:
+        self._host: Any = host
+        self._http_client = http_client
+        self._ttl_sec = float(
+            self._safe_int(
+                host.config.get("astrtown_social_state_cache_ttl_sec", 300),
+                300,
+                "astrtown_social_state_cache_ttl_sec",
+                "platform_config",
+            )
+        )
+        self._cache: TtlLruCache[tuple[str, str], dict[str, Any]] = TtlLruCache(256, self._ttl_sec)
+        self._inflight: dict[tuple[str, str], asyncio.Task[dict[str, Any] | None]] = {}
+        # 每个键的失效代数：请求发起后该键被失效，则结果不再写入缓存。
+        self._generations: dict[tuple[str, str], int] = {}
+
+        self._lookups = 0
+        self._coalesced = 0
+        self._fetches = 0
+        self._invalidations = 0
+        self._local_updates = 0
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def enabled(self) -> bool:
+        return self._ttl_sec > 0
+
+    @staticmethod
+    def _key(owner_id: str, target_id: str) -> tuple[str, str]:
+        return (str(owner_id or "").strip(), str(target_id or "").strip())
+
+    async def get(self, owner_id: str, target_id: str, world_id: str = "") -> dict[str, Any] | None:
+        """返回 {relationship, affinity}；查询失败（非 2xx/格式异常）返回 None，网络异常/超时向上抛出。"""
+        key = self._key(owner_id, target_id)
+        if not self.enabled():
+            return await self._http_client.get_social_state(world_id, key[0], key[1])
+
+        self._lookups += 1
+        cached = self._cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch(key, world_id, self._generations.get(key, 0)),
+                name="astrtown_social_state",
+            )
+            self._inflight[key] = task
+        else:
+            self._coalesced += 1
+        # shield：单个调用方超时取消不影响其他等待同一结果的调用方。
+        data = await asyncio.shield(task)
+        return copy.deepcopy(data) if data is not None else None
+
+    async def _fetch(self, key: tuple[str, str], world_id: str, generation: int) -> dict[str, Any] | None:
+        self._fetches += 1
+        try:
+            data = await self._http_client.get_social_state(world_id, key[0], key[1])
+            if data is not None and generation == self._generations.get(key, 0):
+                self._cache.put(key, data)
+            return data
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                self._inflight.pop(key, None)
+
+    def invalidate(self, owner_id: str, target_id: str) -> None:
+        """(owner, target) 的关系可能已变化：丢弃缓存条目，下次查询重新拉取。"""
+        key = self._key(owner_id, target_id)
+        if not key[0] or not key[1]:
+            return
+        self._invalidations += 1
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.pop(key)
+        self._inflight.pop(key, None)
+
+    def apply_affinity_delta(self, owner_id: str, target_id: str, delta: int, label: str) -> None:
+        """好感度回写成功后按服务端相同规则（累加并限幅）更新缓存条目；未缓存时无需处理。"""
+        key = self._key(owner_id, target_id)
+        cached = self._cache.get(key)
+        if cached is None:
+            return
+        affinity = cached.get("affinity")
+        score = 0
+        if isinstance(affinity, dict):
+            try:
+                score = int(float(affinity.get("score", 0)))
+            except (TypeError, ValueError):
+                # 无法本地推算，改为失效重新拉取。
+                self.invalidate(owner_id, target_id)
+                return
+        updated = dict(cached)
+        updated["affinity"] = {
+            **(affinity if isinstance(affinity, dict) else {}),
+            "score": max(_AFFINITY_MIN, min(_AFFINITY_MAX, score + int(delta))),
+            "label": label,
+        }
+        self._cache.put(key, updated)
+        self._local_updates += 1
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        stats = self._cache.snapshot_stats()
+        lookups = self._lookups
+        stats.update(
+            {
+                "enabled": self.enabled(),
+                "lookups": lookups,
+                "coalesced": self._coalesced,
+                "fetches": self._fetches,
+                "invalidations": self._invalidations,
+                "localUpdates": self._local_updates,
+                "inflight": len(self._inflight),
+                "effectiveHitRate": round((stats["hits"] + self._coalesced) / lookups, 4) if lookups else 0.0,
+            }
+        )
+        return stats
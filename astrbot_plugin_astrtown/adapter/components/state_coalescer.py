@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from astrbot import logger
+
+from .contracts import AdapterHostProtocol
+from .event_ack_sender import EventAckSender
+
+STATE_CHANGED_EVENT_TYPE = "agent.state_changed"
+
+
+class StateChangeCoalescer:
+    """agent.state_changed 合并器（位于分发器之前）。
+
+    state_changed 只用于刷新最新状态快照，后到的快照完全覆盖先到的。
+    Gateway 对每个 agent 逐条投递（收到 ACK 才发下一条），因此这里在收到时即 ACK，
+    让 Gateway 快速排空积压；窗口期内只保留每个 agent 的最新一条，窗口到期后
+    作为“已 ACK”事件交给入站 lane 应用一次，被覆盖的事件直接丢弃。
+    其他事件入站前会先冲刷待应用的快照，保证读取快照的处理器（如 queue_refill）看到最新状态。
+    """
+
+    def __init__(
+        self,
+        host: AdapterHostProtocol,
+        ack_sender: EventAckSender,
+        emit: Callable[[dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        self._host: Any = host
+        self._ack_sender = ack_sender
+        self._emit = emit
+        # agent key -> 窗口内最新的 state_changed 原始消息
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._flush_task: asyncio.Task[Any] | None = None
+
+        self._received_total = 0
+        self._applied_total = 0
+        self._dropped_total = 0
+
+    def enabled(self) -> bool:
+        return self._host._cfg.state_coalesce_window_ms > 0
+
+    def _agent_key(self, data: dict[str, Any]) -> str:
+        payload = data.get("payload")
+        if isinstance(payload, dict):
+            agent_id = payload.get("agentId")
+            if agent_id:
+                return str(agent_id)
+        return str(self._host._agent_id or "")
+
+    async def offer(self, data: dict[str, Any]) -> None:
+        """收下一条 state_changed：立即 ACK（只入队不等待写出），并在窗口内覆盖同一 agent 的旧快照。"""
+        self._received_total += 1
+        event_id = str(data.get("id") or "")
+        try:
+            await self._ack_sender.send_event_ack(event_id, wait=False)
+        except Exception as e:
+            logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
+
+        key = self._agent_key(data)
+        if self._pending.get(key) is not None:
+            self._dropped_total += 1
+        self._pending[key] = data
+
+        if self._flush_task is None or self._flush_task.done():
+            delay = self._host._cfg.state_coalesce_window_ms / 1000.0
+            self._flush_task = asyncio.create_task(self._flush_later(delay), name="astrtown_state_coalesce_flush")
+            self._host._track_background_task(self._flush_task)
+
+    async def flush(self) -> None:
+        """将待应用的最新快照交给入站 lane（每个 agent 一条）。"""
+        if not self._pending:
+            return
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for data in pending:
+            self._applied_total += 1
+            await self._emit(data)
+
+    def reset(self) -> None:
+        self._pending.clear()
+        task = self._flush_task
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        self._flush_task = None
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "windowMs": self._host._cfg.state_coalesce_window_ms,
+            "received": self._received_total,
+            "applied": self._applied_total,
+            "dropped": self._dropped_total,
+            "pending": len(self._pending),
+        }
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # 先解除占位，冲刷期间到达的新快照可以调度下一次窗口。
+        if self._flush_task is asyncio.current_task():
+            self._flush_task = None
+        try:
+            await self.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[AstrTown] state_changed 合并冲刷失败: {e}")
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+from astrbot import logger
+
+from .contracts import AdapterHostProtocol
+
+# 同时缓冲的会话数上限；超出时丢弃最早开始缓冲的会话（其结束时回退到 HTTP 拉取）。
+_MAX_CONVERSATIONS = 8
+
+
+class _Transcript:
+    __slots__ = ("messages", "complete")
+
+    def __init__(self, max_messages: int, complete: bool) -> None:
+        self.messages: deque[dict[str, str]] = deque(maxlen=max_messages)
+        # 从 conversation.started 起完整观察到的会话才可直接用于反思。
+        self.complete = complete
+
+
+class ConversationTranscriptBuffer:
+    """按会话增量维护的对话转录缓冲。
+
+    由 conversation.message 事件与本方已受理的 command.say 填充，conversation.ended 时直接交给反思，
+    省去一次转录 HTTP 拉取。以下情况视为存在缺口，结束时回退到 Gateway 拉取：
+    未观察到 conversation.started（如中途重启）、期间发生重连、对话消息过期未处理、本方发言 ACK 超时。
+    每个会话只保留最近 astrtown_transcript_buffer_max_messages 条（与转录拉取的默认条数一致）。
+    """
+
+    def __init__(self, host: AdapterHostProtocol) -> None:
+        self._host: Any = host
+        self._max_messages = self._safe_int(
+            host.config.get("astrtown_transcript_buffer_max_messages", 80),
+            80,
+            "astrtown_transcript_buffer_max_messages",
+            "platform_config",
+        )
+        # conversationId -> 转录；dict 保持开始缓冲的先后顺序。
+        self._buffers: dict[str, _Transcript] = {}
+
+        self._local_hits = 0
+        self._fallbacks = 0
+        self._gaps = 0
+        self._evicted = 0
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def enabled(self) -> bool:
+        return self._max_messages > 0
+
+    def _ensure(self, conversation_id: str, *, complete: bool) -> _Transcript:
+        transcript = self._buffers.get(conversation_id)
+        if transcript is not None:
+            return transcript
+        transcript = _Transcript(self._max_messages, complete)
+        self._buffers[conversation_id] = transcript
+        while len(self._buffers) > _MAX_CONVERSATIONS:
+            self._buffers.pop(next(iter(self._buffers)))
+            self._evicted += 1
+        return transcript
+
+    def on_started(self, conversation_id: str) -> None:
+        if self.enabled() and conversation_id:
+            self._ensure(conversation_id, complete=True)
+
+    def append(self, conversation_id: str, speaker_id: str, content: str) -> None:
+        text = str(content or "").strip()
+        if not self.enabled() or not conversation_id or not text:
+            return
+        # 未见到 conversation.started 就收到消息：之前的内容未知。
+        transcript = self._ensure(conversation_id, complete=False)
+        transcript.messages.append({"speakerId": str(speaker_id or "").strip() or "unknown", "content": text})
+
+    def record_own_say(self, payload: dict[str, Any]) -> None:
+        """本方 command.say 已被受理。"""
+        self.append(
+            str(payload.get("conversationId") or "").strip(),
+            str(self._host._player_id or ""),
+            str(payload.get("text") or ""),
+        )
+
+    def mark_gap(self, conversation_id: str | None = None) -> None:
+        """标记会话可能缺失消息；conversation_id 为空时标记全部正在缓冲的会话。"""
+        if conversation_id:
+            targets = [self._buffers[conversation_id]] if conversation_id in self._buffers else []
+        else:
+            targets = list(self._buffers.values())
+        for transcript in targets:
+            if transcript.complete:
+                transcript.complete = False
+                self._gaps += 1
+
+    def take(self, conversation_id: str) -> list[dict[str, str]] | None:
+        """会话结束：取出并移除缓冲。缓冲完整时返回消息列表，否则返回 None（调用方应回退到 HTTP 拉取）。"""
+        transcript = self._buffers.pop(conversation_id, None) if conversation_id else None
+        if transcript is None or not transcript.complete:
+            self._fallbacks += 1
+            return None
+        self._local_hits += 1
+        return list(transcript.messages)
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled(),
+            "maxMessages": self._max_messages,
+            "buffering": len(self._buffers),
+            "localHits": self._local_hits,
+            "fallbacks": self._fallbacks,
+            "gaps": self._gaps,
+            "evicted": self._evicted,
+        }
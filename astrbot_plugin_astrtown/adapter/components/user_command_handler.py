@@ -201,35 +201,16 @@ class UserCommandHandler:
         if not base_url or not token:
             return "关系查询失败：目标 AstrTown 连接尚未就绪。"
 
-        query = {
-            "worldId": world_id,
-            "ownerId": owner_id,
-            "targetId": target_id,
-        }
-        url = f"{base_url}/api/bot/social/state"
-        headers = {"Authorization": f"Bearer {token}"}
-
         try:
-            timeout = aiohttp.ClientTimeout(total=2.0)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, params=query, headers=headers) as resp:
-                    if resp.status < 200 or resp.status >= 300:
-                        text = ""
-                        try:
-                            text = await resp.text()
-                        except Exception:
-                            text = ""
-                        logger.warning(f"[AstrTown] relations 查询失败 http={resp.status}: {text[:200]}")
-                        return "关系查询失败：网关返回异常状态。"
-
-                    data = await resp.json()
-                    if not isinstance(data, dict):
-                        return "关系查询失败：返回数据格式不正确。"
+            # 与 LLM 上下文注入共用适配器的社交状态缓存。
+            data = await asyncio.wait_for(adapter.get_social_state(owner_id, target_id, world_id), timeout=2.0)
         except asyncio.TimeoutError:
             return "关系查询超时，请稍后重试。"
         except Exception as e:
             logger.warning(f"[AstrTown] relations 查询异常: {e}")
             return "关系查询失败：网络异常。"
+        if data is None:
+            return "关系查询失败：网关返回异常状态。"
 
         relationship_raw = data.get("relationship")
         relationship = relationship_raw if isinstance(relationship_raw, dict) else {}
@@ -11,12 +11,42 @@ from astrbot.api.platform import AstrBotMessage, MessageMember, MessageType
 
 from ..astrtown_event import AstrTownMessageEvent
 from ..id_util import new_id
-from ..protocol import WorldEvent
+from ..protocol import (
+    COMMAND_REJECTED_EVENT_TYPE,
+    ActionFinishedPayload,
+    AgentQueueRefillRequestedPayload,
+    AgentStateChangedPayload,
+    CommandRejectedPayload,
+    ConversationEndedPayload,
+    ConversationInvitedPayload,
+    ConversationMessagePayload,
+    ConversationStartedPayload,
+    ConversationTimeoutPayload,
+    SocialRelationshipProposedPayload,
+    SocialRelationshipRespondedPayload,
+    WorldEvent,
+    decode_world_event_body,
+)
+from ..ttl_cache import TtlLruCache
 from .contracts import AdapterHostProtocol
 from .event_ack_sender import EventAckSender
 from .event_text_formatter import EventTextFormatter
+from .flow_credit import FlowCreditController
+from .latency_tracker import CommandLatencyTracker
 from .reflection_orchestrator import ReflectionOrchestrator
 from .session_context import SessionContextService
+from .social_state_cache import SocialStateCache
+from .transcript_buffer import ConversationTranscriptBuffer
+from .world_event_registry import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    WakeRequest,
+    WorldEventHandler,
+    WorldEventHandlerFunc,
+    WorldEventHandlerRegistry,
+    WorldEventTraits,
+)
 
 
 class WorldEventDispatcher:
@@ -29,16 +59,54 @@ class WorldEventDispatcher:
         session_ctx: SessionContextService,
         text_formatter: EventTextFormatter,
         reflection_orch: ReflectionOrchestrator,
+        latency: CommandLatencyTracker,
+        flow: FlowCreditController,
+        social_cache: SocialStateCache,
+        transcripts: ConversationTranscriptBuffer,
     ) -> None:
         self._host: Any = host
         self._ack_sender = ack_sender
         self._session_ctx = session_ctx
         self._text_formatter = text_formatter
         self._reflection_orch = reflection_orch
+        self._latency = latency
+        self._flow = flow
+        self._social_cache = social_cache
+        self._transcripts = transcripts
 
         # queue_refill 门控：记录上次处理的 requestId，用于识别新请求。
         self._last_refill_request_id: str | None = None
 
+        # 过期事件计数：事件类型 -> 丢弃次数；以及按检查点（ingress/dispatch/commit）汇总。
+        self._expired_by_type: dict[str, int] = {}
+        self._expired_by_stage: dict[str, int] = {}
+        self._expired_last_log_ts = 0.0
+
+        # 已完成（已 ACK）事件的 ID 幂等缓存：Gateway 重连后重投的事件直接 ACK，不再处理。
+        self._processed_event_ids: TtlLruCache[str, bool] = TtlLruCache(
+            max(
+                1,
+                self._safe_int(
+                    host.config.get("astrtown_event_id_cache_size", 4096),
+                    4096,
+                    "astrtown_event_id_cache_size",
+                    "platform_config",
+                ),
+            ),
+            self._safe_int(
+                host.config.get("astrtown_event_id_cache_ttl_sec", 600),
+                600,
+                "astrtown_event_id_cache_ttl_sec",
+                "platform_config",
+            ),
+        )
+
+        # 事件类型 -> 处理器 查表分发；未注册类型走默认“唤醒 LLM”路径。
+        self._registry = WorldEventHandlerRegistry(
+            WorldEventHandler("*", self._on_default_event, WorldEventTraits()),
+        )
+        self._register_builtin_handlers()
+
     @staticmethod
     def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
         try:
@@ -83,19 +151,19 @@ class WorldEventDispatcher:
 
         return result
 
-    def _build_queue_refill_world_context(self, payload: dict[str, Any]) -> dict[str, Any]:
+    def _build_queue_refill_world_context(self, body: AgentQueueRefillRequestedPayload) -> dict[str, Any]:
         # 优先使用 queue_refill 事件 payload；缺失时回退到最近一次 state_changed 快照。
         snapshot_raw = getattr(self._host, "_latest_state_snapshot", None)
         snapshot = snapshot_raw if isinstance(snapshot_raw, dict) else {}
 
-        position = self._build_position_dict(payload.get("position"))
+        position = self._build_position_dict(body.position)
         if not position:
             position = self._build_position_dict(snapshot.get("position"))
         self_x = self._to_float(position.get("x"))
         self_y = self._to_float(position.get("y"))
 
-        nearby_raw = payload.get("nearbyPlayers")
-        if not isinstance(nearby_raw, list):
+        nearby_raw = body.nearbyPlayers
+        if nearby_raw is None:
             nearby_raw = snapshot.get("nearbyPlayers")
         nearby_players = nearby_raw if isinstance(nearby_raw, list) else []
         nearby_items: list[dict[str, Any]] = []
@@ -126,9 +194,9 @@ class WorldEventDispatcher:
         nearby_items.sort(key=self._distance_sort_key)
 
         now_ms = int(time.time() * 1000)
-        last_dequeued_raw = payload.get("lastDequeuedAt")
+        last_dequeued_raw = body.lastDequeuedAt
         last_dequeued_ago_sec = None
-        if isinstance(last_dequeued_raw, (int, float)):
+        if last_dequeued_raw is not None:
             # Convex 侧 now 来自 Date.now()，这里按 ms 口径计算时间差。
             last_dequeued_ago_sec = max(0.0, (now_ms - float(last_dequeued_raw)) / 1000.0)
 
@@ -156,7 +224,7 @@ class WorldEventDispatcher:
             },
             "nearbyPlayers": nearby_items[:5],
             "queue": {
-                "remaining": payload.get("remaining"),
+                "remaining": body.remaining,
                 "lastDequeuedAt": last_dequeued_raw,
                 "lastDequeuedAgoSec": last_dequeued_ago_sec,
                 "nowTimestamp": now_ms,
@@ -164,556 +232,280 @@ class WorldEventDispatcher:
         }
         return world_context
 
-    async def handle_world_event(self, data: dict[str, Any]) -> None:
-        if self._host._stop_event.is_set():
-            return
+    @property
+    def registry(self) -> WorldEventHandlerRegistry:
+        return self._registry
+
+    def register_handler(
+        self,
+        event_type: str,
+        func: WorldEventHandlerFunc,
+        traits: WorldEventTraits | None = None,
+    ) -> WorldEventHandler:
+        """注册新的事件处理器；无需修改 handle_world_event 主路径。"""
+        return self._registry.register(event_type, func, traits)
+
+    def _register_builtin_handlers(self) -> None:
+        register = self._registry.register
+        register(
+            "conversation.message",
+            self._on_conversation_message,
+            WorldEventTraits(priority=PRIORITY_HIGH),
+        )
+        register(
+            "conversation.started",
+            self._on_conversation_started,
+            WorldEventTraits(
+                priority=PRIORITY_HIGH,
+                dedupe_key=lambda evt: evt.body.conversationId,
+            ),
+        )
+        register(
+            "conversation.invited",
+            self._on_conversation_invited,
+            WorldEventTraits(priority=PRIORITY_HIGH),
+        )
+        register(
+            "conversation.timeout",
+            self._on_conversation_timeout,
+            WorldEventTraits(priority=PRIORITY_HIGH),
+        )
+        # conversation.ended 在本地转录缓冲有缺口时需要拉取转录（最长 8s），先 ACK 释放 Gateway 投递窗口。
+        register(
+            "conversation.ended",
+            self._on_conversation_ended,
+            WorldEventTraits(wakes_llm=False, ack_policy="before_handle", priority=PRIORITY_NORMAL),
+        )
+        register(
+            "social.relationship_proposed",
+            self._on_relationship_proposed,
+            WorldEventTraits(priority=PRIORITY_HIGH),
+        )
+        register(
+            "social.relationship_responded",
+            self._on_relationship_responded,
+            WorldEventTraits(priority=PRIORITY_HIGH),
+        )
+        register(
+            "agent.state_changed",
+            self._on_agent_state_changed,
+            WorldEventTraits(wakes_llm=False, priority=PRIORITY_LOW),
+        )
+        register(
+            "agent.queue_refill_requested",
+            self._on_queue_refill_requested,
+            WorldEventTraits(priority=PRIORITY_LOW),
+        )
+        register(
+            "action.finished",
+            self._on_action_finished,
+            WorldEventTraits(wakes_llm=False, priority=PRIORITY_LOW),
+        )
+        # 本地合成事件：异步命令模式下的拒绝回执。
+        register(
+            COMMAND_REJECTED_EVENT_TYPE,
+            self._on_command_rejected,
+            WorldEventTraits(priority=PRIORITY_NORMAL),
+        )
 
+    def _parse_world_event(self, data: dict[str, Any]) -> WorldEvent | None:
         payload_raw = data.get("payload")
         metadata_raw = data.get("metadata")
         if payload_raw is None:
             payload_raw = {}
         if not isinstance(payload_raw, dict):
             logger.debug(f"[AstrTown] world event payload invalid: {type(payload_raw)!r}")
-            return
+            return None
         if metadata_raw is not None and not isinstance(metadata_raw, dict):
             logger.debug(f"[AstrTown] world event metadata invalid: {type(metadata_raw)!r}")
             metadata_raw = None
 
-        evt = WorldEvent(
-            type=str(data.get("type") or ""),
+        event_type = str(data.get("type") or "")
+        return WorldEvent(
+            type=event_type,
             id=str(data.get("id") or ""),
             version=self._safe_int(data.get("version", 1), 1, "version", "world_event"),
             timestamp=self._safe_int(data.get("timestamp", 0), 0, "timestamp", "world_event"),
             expiresAt=self._safe_int(data.get("expiresAt", 0), 0, "expiresAt", "world_event"),
             payload=payload_raw,
             metadata=metadata_raw,
+            body=decode_world_event_body(event_type, payload_raw),
         )
 
-        event_id = evt.id
-        event_type = evt.type
-        payload = evt.payload
-
-        # 方案C：conversation.message 前置过滤
-        # 当消息不属于当前 NPC 的活跃对话时，仅 ACK，不 commit_event（不唤醒 LLM）。
-        if event_type == "conversation.message":
-            incoming_cid = str(payload.get("conversationId") or "").strip()
-            active_cid = str(self._host._active_conversation_id or "").strip()
-            if active_cid and incoming_cid and incoming_cid != active_cid:
-                logger.info(
-                    f"[AstrTown] 过滤 conversation.message: incoming={incoming_cid} active={active_cid} agentId={self._host._agent_id}"
-                )
-                try:
-                    await self._ack_sender.send_event_ack(event_id)
-                except Exception as e:
-                    logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-                return
-
-        if event_type == "conversation.message":
-            message_raw = payload.get("message")
-            message = message_raw if isinstance(message_raw, dict) else {}
-            speaker_id = str(message.get("speakerId") or "").strip()
-            owner_id = str(self._host._player_id or "").strip()
-            if speaker_id and speaker_id != owner_id:
-                self._host._conversation_partner_id = speaker_id
-
-        # 维护最近一次 agent.state_changed 快照，供 queue_refill 提示词注入世界状态使用。
-        # 该事件仅用于状态同步，不应触发 LLM：更新快照后仅 ACK 并返回。
-        if event_type == "agent.state_changed":
-            self._host._latest_state_snapshot = {
-                "state": payload.get("state"),
-                "position": self._build_position_dict(payload.get("position")),
-                "nearbyPlayers": payload.get("nearbyPlayers") if isinstance(payload.get("nearbyPlayers"), list) else [],
-                "inConversation": payload.get("inConversation"),
-                "currentActivity": payload.get("currentActivity"),
-                "updatedAt": int(time.time() * 1000),
-            }
-            logger.debug(
-                f"[AstrTown] state_changed 仅更新快照，不唤醒 LLM: eventId={event_id}, agentId={self._host._agent_id}"
-            )
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
+    async def handle_world_event(self, data: dict[str, Any], *, acked: bool = False) -> None:
+        """处理单条世界事件；acked=True 表示上游已 ACK（如合并后的 state_changed），此处不再发送。"""
+        if self._host._stop_event.is_set():
             return
 
-        # 方案C：活跃对话状态更新（invited/started/ended/timeout）
-        if event_type == "conversation.ended":
-            ended_cid = str(payload.get("conversationId") or "").strip()
-            if ended_cid and self._host._active_conversation_id == ended_cid:
-                self._host._active_conversation_id = None
-                self._host._conversation_partner_id = None
-            elif not ended_cid:
-                # 没有 conversationId 时保守清空，避免残留。
-                self._host._active_conversation_id = None
-                self._host._conversation_partner_id = None
-
-            other_player_id = SessionContextService.pick_first_non_empty_str(
-                payload,
-                [
-                    "otherPlayerId",
-                    "other_player_id",
-                    "otherParticipantId",
-                    "targetPlayerId",
-                    "counterpartId",
-                ],
-            )
-            other_player_name = SessionContextService.pick_first_non_empty_str(
-                payload,
-                [
-                    "otherPlayerName",
-                    "other_player_name",
-                    "otherParticipantName",
-                    "targetPlayerName",
-                    "counterpartName",
-                ],
-            )
-            if not other_player_name:
-                other_player_name = other_player_id or "对方"
-
-            transcript_task = asyncio.create_task(
-                self._host._http_client.get_conversation_transcript(
-                    world_id=str(self._host._world_id or "").strip(),
-                    conversation_id=ended_cid,
-                ),
-                name=f"astrtown_transcript_{ended_cid or event_id or 'unknown'}",
-            )
-            self._host._track_background_task(transcript_task)
-
-            transcript_data = None
-            try:
-                transcript_data = await transcript_task
-            except Exception as e:
-                logger.warning(
-                    f"[AstrTown] conversation transcript 获取异常，conversationId={ended_cid or '-'}: {e}"
-                )
-
-            transcript_messages: list[dict[str, str]] = []
-            if isinstance(transcript_data, dict):
-                raw_messages = transcript_data.get("messages")
-                if isinstance(raw_messages, list):
-                    transcript_messages = [m for m in raw_messages if isinstance(m, dict)]
-
-            # 关键约束：反思任务必须异步后台执行，不能阻塞事件主流程。
-            reflect_task = asyncio.create_task(
-                self._reflection_orch.async_reflect_on_conversation(
-                    conversation_id=ended_cid,
-                    other_player_name=other_player_name,
-                    other_player_id=other_player_id,
-                    messages=transcript_messages,
-                ),
-                name=f"astrtown_reflect_{ended_cid or event_id or 'unknown'}",
-            )
-            self._host._track_background_task(reflect_task)
-
-            logger.info(
-                f"[AstrTown] 对话结束事件已处理: conversationId={ended_cid or '-'}, agentId={self._host._agent_id}"
-            )
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
+        evt = self._parse_world_event(data)
+        if evt is None:
             return
 
-        if event_type == "conversation.started":
-            started_cid = str(payload.get("conversationId") or "").strip()
-            dedupe_window_ms = self._safe_int(
-                self._host.config.get("astrtown_started_dedupe_window_ms", 3000),
-                3000,
-                "astrtown_started_dedupe_window_ms",
-                "platform_config",
-            )
-            now_ms = int(time.time() * 1000)
-            if started_cid:
-                last_seen_ms = self._host._conversation_started_recent_ms.get(started_cid)
-                if (
-                    dedupe_window_ms > 0
-                    and isinstance(last_seen_ms, int)
-                    and now_ms - last_seen_ms < dedupe_window_ms
-                ):
-                    logger.info(
-                        "[AstrTown] 去重 conversation.started: "
-                        f"conversationId={started_cid}, elapsedMs={now_ms - last_seen_ms}"
-                    )
-                    try:
-                        await self._ack_sender.send_event_ack(event_id)
-                    except Exception as e:
-                        logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-                    return
-
-                self._host._conversation_started_recent_ms[started_cid] = now_ms
-                expire_before = now_ms - max(dedupe_window_ms * 4, 10_000)
-                for cid, ts in list(self._host._conversation_started_recent_ms.items()):
-                    if ts < expire_before:
-                        self._host._conversation_started_recent_ms.pop(cid, None)
-
-                self._host._active_conversation_id = started_cid
-
-            owner_id = str(self._host._player_id or "").strip()
-            partner_id = ""
-            other_ids = payload.get("otherParticipantIds")
-            if isinstance(other_ids, list):
-                for item in other_ids:
-                    candidate = str(item or "").strip()
-                    if candidate and candidate != owner_id:
-                        partner_id = candidate
-                        break
-
-            if not partner_id:
-                partner_id = SessionContextService.pick_first_non_empty_str(
-                    payload,
-                    [
-                        "otherPlayerId",
-                        "other_player_id",
-                        "otherParticipantId",
-                        "targetPlayerId",
-                        "counterpartId",
-                    ],
-                )
-
-            if partner_id and partner_id != owner_id:
-                self._host._conversation_partner_id = partner_id
-
-        if event_type == "conversation.timeout":
-            # 1) 状态清理
-            timeout_cid = str(payload.get("conversationId") or "").strip()
-            if timeout_cid and self._host._active_conversation_id == timeout_cid:
-                self._host._active_conversation_id = None
-                self._host._conversation_partner_id = None
-            elif not timeout_cid:
-                self._host._active_conversation_id = None
-                self._host._conversation_partner_id = None
-
-            # 2) 构造系统提示文本
-            reason = str(payload.get("reason") or "").strip()
-            if reason == "invite_timeout":
-                text = "【系统提示】对方发起的对话邀请因长时间未响应，已自动失效，你已恢复空闲状态。"
-            elif reason == "idle_timeout":
-                text = "【系统提示】由于双方长时间未发言，对话已因尴尬的沉默被系统自动结束。"
-            else:
-                text = "【系统提示】对话已超时结束。"
-
-            # 3) 复用现有 message event 构造路径，commit_event 唤醒 LLM 破除死锁
-            session_id = self._session_ctx.build_session_id(event_type, payload)
-
-            abm = AstrBotMessage()
-            abm.self_id = str(self._host._player_id or self._host.client_self_id)
-            abm.sender = MessageMember(
-                user_id="system",
-                nickname="AstrTown",
-            )
-            abm.type = MessageType.GROUP_MESSAGE
-            abm.session_id = session_id
-            abm.message_id = event_id or new_id("evt")
-            abm.message = [Plain(text=text)]
-            abm.message_str = text
-            abm.raw_message = data
-            abm.timestamp = int(time.time())
-
-            event = AstrTownMessageEvent(
-                message_str=text,
-                message_obj=abm,
-                platform_meta=self._host._metadata,
-                session_id=session_id,
-                adapter=self._host,
-                world_event=data,
-            )
-            event.set_extra("event_type", event_type)
-            event.set_extra("event_id", event_id)
-            if timeout_cid:
-                event.set_extra("conversation_id", timeout_cid)
-
-            event.is_wake = True
-            event.is_at_or_wake_command = True
-
-            try:
-                self._host.commit_event(event)
-            except Exception as e:
-                logger.error(
-                    f"[AstrTown] commit_event failed for eventId={event_id} type={event_type}: {e}",
-                    exc_info=True,
+        handler = self._registry.resolve(evt.type)
+        traits = handler.traits
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            # 在 lane 中排队期间过期的事件：不再格式化文本/更新状态，直接 ACK 跳过。
+            if self.is_expired(evt.expiresAt):
+                outcome = "expired"
+                await self.drop_expired(
+                    evt.type,
+                    evt.id,
+                    "dispatch",
+                    conversation_id=self._event_conversation_id(evt),
+                    acked=acked,
                 )
                 return
 
-            logger.info(
-                f"[AstrTown] 已接收世界事件: eventId={event_id}, eventType={event_type}, agentId={self._host._agent_id}"
-            )
-
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-            return
-
-        if event_type == "social.relationship_proposed":
-            proposer_id = str(payload.get("proposerId") or "").strip()
-            proposer_name = str(payload.get("proposerName") or proposer_id or "未知玩家").strip() or "未知玩家"
-            status = str(payload.get("status") or "").strip() or "未知关系"
-            text = (
-                f"【系统提示】玩家 {proposer_name} 刚向你申请确立 {status} 关系。"
-                "请结合你的潜意识好感度和人设，决定是否调用 respond_relationship 工具接受，并回复对方。"
-            )
+            if traits.dedupe_key is not None and self._is_duplicate_event(evt, traits):
+                outcome = "deduped"
+                await self._send_ack(evt.id, acked)
+                return
 
-            session_id = self._session_ctx.build_session_id(event_type, payload)
+            if traits.ack_policy == "before_handle":
+                await self._send_ack(evt.id, acked)
 
-            abm = AstrBotMessage()
-            abm.self_id = str(self._host._player_id or self._host.client_self_id)
-            abm.sender = MessageMember(
-                user_id="system",
-                nickname="AstrTown",
-            )
-            abm.type = MessageType.GROUP_MESSAGE
-            abm.session_id = session_id
-            abm.message_id = event_id or new_id("evt")
-            abm.message = [Plain(text=text)]
-            abm.message_str = text
-            abm.raw_message = data
-            abm.timestamp = int(time.time())
-
-            event = AstrTownMessageEvent(
-                message_str=text,
-                message_obj=abm,
-                platform_meta=self._host._metadata,
-                session_id=session_id,
-                adapter=self._host,
-                world_event=data,
-            )
-            event.set_extra("event_type", event_type)
-            event.set_extra("event_id", event_id)
-            if proposer_id:
-                event.set_extra("proposer_id", proposer_id)
-            event.set_extra("relationship_status", status)
-            event.set_extra("priority", "high")
-
-            # 高优先级系统事件：始终唤醒 LLM 决策。
-            event.is_wake = True
-            event.is_at_or_wake_command = True
-
-            try:
-                self._host.commit_event(event)
-            except Exception as e:
-                logger.error(
-                    f"[AstrTown] commit_event failed for eventId={event_id} type={event_type}: {e}",
-                    exc_info=True,
+            wake = await handler.func(evt, data)
+            if wake is not None and not traits.wakes_llm:
+                # 声明不唤醒 LLM 的处理器返回了唤醒请求：按声明处理，不提交、不计入唤醒积压。
+                logger.warning(
+                    f"[AstrTown] 处理器声明 wakes_llm=False 却返回了唤醒请求，已忽略: type={evt.type}, eventId={evt.id}"
                 )
+                wake = None
+            if wake is None:
+                outcome = "consumed"
+                if traits.ack_policy == "after_handle":
+                    await self._send_ack(evt.id, acked)
                 return
 
-            logger.info(
-                f"[AstrTown] 已接收世界事件: eventId={event_id}, eventType={event_type}, agentId={self._host._agent_id}"
-            )
-
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-            return
-
-        if event_type == "social.relationship_responded":
-            responder_id = str(payload.get("responderId") or "").strip() or "未知玩家"
-            status = str(payload.get("status") or "").strip() or "未知关系"
-            accept_raw = payload.get("accept")
-            accepted = bool(accept_raw) if isinstance(accept_raw, bool) else False
-            decision_text = "接受" if accepted else "拒绝"
-            text = (
-                f"【系统提示】[{responder_id}] 已{decision_text}了你提出的 [{status}] 关系申请。"
-                "请根据这个结果做出反应。"
-            )
-
-            session_id = self._session_ctx.build_session_id(event_type, payload)
-
-            abm = AstrBotMessage()
-            abm.self_id = str(self._host._player_id or self._host.client_self_id)
-            abm.sender = MessageMember(
-                user_id="system",
-                nickname="AstrTown",
-            )
-            abm.type = MessageType.GROUP_MESSAGE
-            abm.session_id = session_id
-            abm.message_id = event_id or new_id("evt")
-            abm.message = [Plain(text=text)]
-            abm.message_str = text
-            abm.raw_message = data
-            abm.timestamp = int(time.time())
-
-            event = AstrTownMessageEvent(
-                message_str=text,
-                message_obj=abm,
-                platform_meta=self._host._metadata,
-                session_id=session_id,
-                adapter=self._host,
-                world_event=data,
-            )
-            event.set_extra("event_type", event_type)
-            event.set_extra("event_id", event_id)
-            event.set_extra("responder_id", responder_id)
-            event.set_extra("relationship_status", status)
-            event.set_extra("relationship_accept", accepted)
-            event.set_extra("priority", "high")
-
-            # 高优先级系统事件：始终唤醒 LLM 决策。
-            event.is_wake = True
-            event.is_at_or_wake_command = True
-
-            try:
-                self._host.commit_event(event)
-            except Exception as e:
-                logger.error(
-                    f"[AstrTown] commit_event failed for eventId={event_id} type={event_type}: {e}",
-                    exc_info=True,
+            # 处理器可能较慢（如拉取对话转录），提交前再次检查，避免对过期上下文发起 LLM 调用。
+            if self.is_expired(evt.expiresAt):
+                outcome = "expired"
+                await self.drop_expired(
+                    evt.type,
+                    evt.id,
+                    "commit",
+                    conversation_id=self._event_conversation_id(evt),
+                    acked=acked or traits.ack_policy == "before_handle",
                 )
                 return
 
-            logger.info(
-                f"[AstrTown] 已接收世界事件: eventId={event_id}, eventType={event_type}, agentId={self._host._agent_id}"
-            )
-
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-            return
-
-        # 修复1：邀请策略（在最开始读取配置）
-        if event_type == "conversation.invited":
-            invite_mode = str(self._host.config.get("astrtown_invite_decision_mode", "auto_accept") or "auto_accept").strip()
-            conversation_id = str(payload.get("conversationId") or "").strip()
-            inviter_id = str(payload.get("inviterId") or "").strip()
-            inviter_name = str(payload.get("inviterName") or inviter_id or "").strip()
-            owner_id = str(self._host._player_id or "").strip()
-            if inviter_id and inviter_id != owner_id:
-                self._host._conversation_partner_id = inviter_id
-
-            logger.info(
-                f"[AstrTown] 收到邀请事件: decision_mode={invite_mode}, conversationId={conversation_id}, inviter={inviter_name}"
-            )
-
-            if invite_mode == "auto_accept":
-                # 不走 LLM：直接发 command.accept_invite（仅传 conversationId），不 commit_event。
-                if not conversation_id:
-                    logger.warning("[AstrTown] 自动接受邀请失败: conversationId 为空")
-                else:
-                    logger.info(
-                        f"[AstrTown] 自动接受邀请: conversationId={conversation_id}, inviter={inviter_name}"
-                    )
-                    try:
-                        await self._host.send_command(
-                            "command.accept_invite",
-                            {"conversationId": conversation_id},
-                        )
-                        # 方案C：自动接受邀请成功后，记录活跃对话。
-                        self._host._active_conversation_id = conversation_id
-                    except Exception as e:
-                        logger.error(f"[AstrTown] 自动接受邀请发送命令失败: {e}", exc_info=True)
-
-                # ACK 语义保持闭环：即使不走 LLM，也要 ACK。
-                try:
-                    await self._ack_sender.send_event_ack(event_id)
-                except Exception as e:
-                    logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
+            if not self._commit_wake(evt, data, wake):
+                outcome = "commit_failed"
                 return
 
-        # queue_refill 事件唤醒门控
-        if event_type == "agent.queue_refill_requested":
-            refill_enabled = bool(self._host.config.get("astrtown_refill_wake_enabled", True))
-            if not refill_enabled:
-                try:
-                    await self._ack_sender.send_event_ack(event_id)
-                except Exception as e:
-                    logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-                return
+            outcome = "woke"
+            # 仅在事件成功提交后再发送 ACK。
+            if traits.ack_policy == "after_handle":
+                await self._send_ack(evt.id, acked)
+        finally:
+            # 仅记录已 ACK 的结果；commit 失败/异常的事件需要允许 Gateway 重投后再次处理。
+            if outcome in ("consumed", "woke", "deduped", "expired"):
+                self.mark_processed(evt.id)
+            handler.record(outcome, started_at)
+
+    def is_processed(self, event_id: str) -> bool:
+        """事件 ID 是否已处理并 ACK（命中幂等缓存）。"""
+        if not event_id:
+            return False
+        return self._processed_event_ids.get(event_id) is not None
+
+    def mark_processed(self, event_id: str) -> None:
+        if event_id:
+            self._processed_event_ids.put(event_id, True)
+
+    def snapshot_event_id_cache_stats(self) -> dict[str, Any]:
+        return self._processed_event_ids.snapshot_stats()
+
+    def is_expired(self, expires_at: int, now_ms: int | None = None) -> bool:
+        """expiresAt（毫秒时间戳）已过期则返回 True；<=0 表示不过期。"""
+        if expires_at <= 0:
+            return False
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        return now_ms > expires_at + self._host._cfg.event_expiry_grace_ms
 
-            min_interval = self._safe_int(
-                self._host.config.get("astrtown_refill_min_wake_interval_sec", 10),
-                10,
-                "astrtown_refill_min_wake_interval_sec",
-                "platform_config",
+    async def drop_expired(
+        self,
+        event_type: str,
+        event_id: str,
+        stage: str,
+        *,
+        conversation_id: str = "",
+        acked: bool = False,
+        wait: bool = True,
+    ) -> None:
+        """记录并 ACK 一条过期事件（不处理、不唤醒 LLM）。
+
+        conversation_id 为事件所属会话；过期的对话消息只将该会话的转录标记为有缺口，
+        未知会话 ID 时才标记全部正在缓冲的会话。wait=False 时 ACK 只入队不等待写出（接收循环）。
+        """
+        self.mark_processed(event_id)
+        self._expired_by_type[event_type] = self._expired_by_type.get(event_type, 0) + 1
+        self._expired_by_stage[stage] = self._expired_by_stage.get(stage, 0) + 1
+        if event_type == "conversation.message" and stage != "commit":
+            # 消息未写入转录缓冲（commit 阶段过期时处理器已写入）。
+            self._transcripts.mark_gap(conversation_id or None)
+
+        # 断线恢复时可能一次性积压大量过期事件，日志按 10s 窗口采样。
+        now = time.time()
+        if (now - self._expired_last_log_ts) >= 10.0:
+            self._expired_last_log_ts = now
+            logger.info(
+                f"[AstrTown] 丢弃过期世界事件: type={event_type}, eventId={event_id}, stage={stage}, "
+                f"expiredTotal={sum(self._expired_by_type.values())}"
             )
+        await self._send_ack(event_id, acked, wait=wait)
 
-            now = time.time()
-            elapsed = now - float(self._host._last_refill_wake_ts or 0.0)
-
-            request_id = str(payload.get("requestId") or "").strip()
-            reason = str(payload.get("reason") or "").strip().lower()
-            is_new_request = bool(request_id) and request_id != self._last_refill_request_id
-            is_empty_reason = reason == "empty"
-            force_wake = elapsed >= float(min_interval) * 3.0
-
-            # 三条件门控（按优先级）：
-            # 1) 长时间未唤醒（>= 3 * min_interval）时强制唤醒一次。
-            # 2) 新 requestId + empty：也受 min_interval 约束，避免高频连续唤醒。
-            # 3) 其余情况按 min_interval 节流。
-            if force_wake:
-                should_wake = True
-                gate_reason = "force_after_long_idle"
-            elif is_new_request and is_empty_reason:
-                should_wake = elapsed >= float(min_interval)
-                gate_reason = "new_empty_request" if should_wake else "new_empty_request_throttled"
-            else:
-                should_wake = elapsed >= float(min_interval)
-                gate_reason = "interval"
-
-            # 方案B：当门控条件不满足时，不要每次都打印；
-            # - 状态变化时打印（True<->False 或首次进入门控）
-            # - 或节流：每 min_interval 秒最多打印一次，并附带累计跳过次数
-            if should_wake:
-                if self._host._queue_refill_gate_skip_count > 0 or gate_reason != "interval":
-                    logger.debug(
-                        f"[AstrTown] queue_refill 门控: elapsed={elapsed:.1f}s, min_interval={min_interval}s, wake=True,"
-                        f" gate={gate_reason}, requestId={request_id or '-'}, reason={reason or '-'}"
-                        f" (skipped={self._host._queue_refill_gate_skip_count})"
-                    )
-                    self._host._queue_refill_gate_skip_count = 0
-                self._host._queue_refill_gate_last_should_wake = True
-            else:
-                self._host._queue_refill_gate_skip_count += 1
-                last_state = self._host._queue_refill_gate_last_should_wake
-                state_changed_or_first = last_state is None or last_state is True
-                allow_throttle_log = (
-                    now - float(self._host._queue_refill_gate_last_log_ts or 0.0)
-                ) >= float(min_interval)
-                if state_changed_or_first or allow_throttle_log:
-                    logger.debug(
-                        f"[AstrTown] queue_refill 门控: elapsed={elapsed:.1f}s, min_interval={min_interval}s, wake=False,"
-                        f" gate={gate_reason}, requestId={request_id or '-'}, reason={reason or '-'}"
-                        f" (skipped={self._host._queue_refill_gate_skip_count})"
-                    )
-                    self._host._queue_refill_gate_last_log_ts = now
-                    self._host._queue_refill_gate_last_should_wake = False
-
-            if request_id:
-                self._last_refill_request_id = request_id
+    @staticmethod
+    def _event_conversation_id(evt: WorldEvent) -> str:
+        return str(evt.payload.get("conversationId") or "").strip()
+
+    async def drop_duplicate(self, event_type: str, event_id: str, *, wait: bool = True) -> None:
+        """ACK 一条已处理过的重投事件（不再处理）。"""
+        logger.debug(f"[AstrTown] 重复世界事件已忽略: type={event_type}, eventId={event_id}")
+        await self._send_ack(event_id, wait=wait)
+
+    def snapshot_expiry_stats(self) -> dict[str, Any]:
+        return {
+            "byType": dict(self._expired_by_type),
+            "byStage": dict(self._expired_by_stage),
+        }
 
-            if not should_wake:
-                try:
-                    await self._ack_sender.send_event_ack(event_id)
-                except Exception as e:
-                    logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-                return
+    async def _send_ack(self, event_id: str, acked: bool = False, *, wait: bool = True) -> None:
+        if acked:
+            return
+        try:
+            await self._ack_sender.send_event_ack(event_id, wait=wait)
+        except Exception as e:
+            logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
 
-            self._host._last_refill_wake_ts = now
+    def _is_duplicate_event(self, evt: WorldEvent, traits: WorldEventTraits) -> bool:
+        assert traits.dedupe_key is not None
+        key = traits.dedupe_key(evt)
+        if not key:
+            return False
 
-        # action.finished 仅用于状态记录，不应触发 LLM 唤醒。
-        if event_type == "action.finished":
-            result_raw = payload.get("result")
-            result = result_raw if isinstance(result_raw, dict) else {}
-            if payload.get("success") is False and result.get("reason") == "expired":
-                logger.warning(f"指令已过期被丢弃: {payload}")
-
-            try:
-                await self._ack_sender.send_event_ack(event_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
-            return
+        dedupe_window_ms = self._host._cfg.started_dedupe_window_ms
+        now_ms = int(time.time() * 1000)
+        recent = self._host._conversation_started_recent_ms
+        dedupe_key = f"{evt.type}:{key}"
+        last_seen_ms = recent.get(dedupe_key)
+        if dedupe_window_ms > 0 and isinstance(last_seen_ms, int) and now_ms - last_seen_ms < dedupe_window_ms:
+            logger.info(f"[AstrTown] 去重 {evt.type}: key={key}, elapsedMs={now_ms - last_seen_ms}")
+            return True
+
+        if dedupe_window_ms > 0:
+            recent.set(dedupe_key, now_ms, dedupe_window_ms / 1000.0)
+        return False
+
+    def _commit_wake(self, evt: WorldEvent, data: dict[str, Any], wake: WakeRequest) -> bool:
+        """构造 AstrBotMessage 并 commit_event 唤醒 LLM；返回是否提交成功。"""
+        event_id = evt.id
+        event_type = evt.type
+        payload = evt.payload
 
-        world_context: dict[str, Any] | None = None
-        if event_type == "agent.queue_refill_requested":
-            try:
-                world_context = self._build_queue_refill_world_context(payload)
-            except Exception as e:
-                # 世界状态注入失败时降级，仍保持 queue_refill 专用提示词分支。
-                logger.warning(f"[AstrTown] 构建 queue_refill 世界状态摘要失败: {e}")
-                world_context = None
-
-        text = self._text_formatter.format_event_to_text(event_type, payload, world_context)
         session_id = self._session_ctx.build_session_id(event_type, payload)
 
         # 方案C：adapter 侧兜底计数器
@@ -721,10 +513,7 @@ class WorldEventDispatcher:
         self._host._session_event_count[sid] = self._host._session_event_count.get(sid, 0) + 1
         count = self._host._session_event_count[sid]
 
-        try:
-            max_rounds = int(self._host.config.get("astrtown_max_context_rounds", 50) or 50)
-        except (TypeError, ValueError):
-            max_rounds = 50
+        max_rounds = self._host._cfg.max_context_rounds
 
         threshold = max_rounds * 2
         if threshold > 0 and count > threshold:
@@ -734,22 +523,12 @@ class WorldEventDispatcher:
             # 重置计数器，避免重复刷屏
             self._host._session_event_count[sid] = 0
 
+        text = wake.text
         abm = AstrBotMessage()
         abm.self_id = str(self._host._player_id or self._host.client_self_id)
-        msg_payload_raw = payload.get("message")
-        msg_payload = msg_payload_raw if isinstance(msg_payload_raw, dict) else {}
-        if event_type == "conversation.message":
-            speaker_id = msg_payload.get("speakerId")
-            speaker_name = speaker_id
-        elif event_type == "conversation.invited":
-            speaker_id = payload.get("inviterId")
-            speaker_name = payload.get("inviterName") or speaker_id
-        else:
-            speaker_id = None
-            speaker_name = None
         abm.sender = MessageMember(
-            user_id=str(speaker_id or "system"),
-            nickname=str(speaker_name or "AstrTown"),
+            user_id=str(wake.sender_id or "system"),
+            nickname=str(wake.sender_name or "AstrTown"),
         )
         abm.type = MessageType.GROUP_MESSAGE
         abm.session_id = session_id
@@ -773,14 +552,10 @@ class WorldEventDispatcher:
         conversation_id = str(payload.get("conversationId") or "")
         if conversation_id:
             event.set_extra("conversation_id", conversation_id)
+        for key, value in wake.extras.items():
+            event.set_extra(key, value)
 
-        # 修复1-B：llm_judge 模式下，显式注入 conversation_id，避免依赖 LLM 从上下文提取。
-        if event_type == "conversation.invited":
-            invite_mode = str(self._host.config.get("astrtown_invite_decision_mode", "auto_accept") or "auto_accept").strip()
-            if invite_mode == "llm_judge" and conversation_id:
-                event.set_extra("conversation_id", conversation_id)
-
-        # 这些事件本质是“外部世界推送”，默认触发 LLM；queue_refill 已在上方门控。
+        # 这些事件本质是“外部世界推送”，默认触发 LLM；是否唤醒已由各处理器决定。
         event.is_wake = True
         event.is_at_or_wake_command = True
 
@@ -788,12 +563,358 @@ class WorldEventDispatcher:
             self._host.commit_event(event)
         except Exception as e:
             logger.error(f"[AstrTown] commit_event failed for eventId={event_id} type={event_type}: {e}", exc_info=True)
-            return
+            return False
 
+        self._latency.note_wake()
+        self._flow.note_wake(event_id)
         logger.info(f"[AstrTown] 已接收世界事件: eventId={event_id}, eventType={event_type}, agentId={self._host._agent_id}")
+        return True
+
+    def _default_wake(
+        self,
+        evt: WorldEvent,
+        world_context: dict[str, Any] | None = None,
+        sender_id: Any = None,
+        sender_name: Any = None,
+    ) -> WakeRequest:
+        text = self._text_formatter.format_event_to_text(evt.type, evt.payload, world_context)
+        return WakeRequest(
+            text=text,
+            sender_id=str(sender_id or "system"),
+            sender_name=str(sender_name or "AstrTown"),
+        )
+
+    # ---- 内置事件处理器 ----
+
+    async def _on_default_event(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        return self._default_wake(evt)
+
+    async def _on_conversation_message(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: ConversationMessagePayload = evt.body
+        self._transcripts.append(body.conversationId, body.speakerId, body.content)
+
+        # 方案C：conversation.message 前置过滤
+        # 当消息不属于当前 NPC 的活跃对话时，仅 ACK，不 commit_event（不唤醒 LLM）。
+        incoming_cid = body.conversationId
+        active_cid = str(self._host._active_conversation_id or "").strip()
+        if active_cid and incoming_cid and incoming_cid != active_cid:
+            logger.info(
+                f"[AstrTown] 过滤 conversation.message: incoming={incoming_cid} active={active_cid} agentId={self._host._agent_id}"
+            )
+            return None
+
+        speaker_id = body.speakerId
+        owner_id = str(self._host._player_id or "").strip()
+        if speaker_id and speaker_id != owner_id:
+            self._host._conversation_partner_id = speaker_id
+
+        return self._default_wake(evt, sender_id=speaker_id, sender_name=speaker_id)
+
+    async def _on_agent_state_changed(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        # 维护最近一次 agent.state_changed 快照，供 queue_refill 提示词注入世界状态使用。
+        # 该事件仅用于状态同步，不应触发 LLM：更新快照后仅 ACK 并返回。
+        body: AgentStateChangedPayload = evt.body
+        self._host._latest_state_snapshot = {
+            "state": body.state,
+            "position": self._build_position_dict(body.position),
+            "nearbyPlayers": body.nearbyPlayers,
+            "inConversation": body.inConversation,
+            "currentActivity": body.currentActivity,
+            "updatedAt": int(time.time() * 1000),
+        }
+        logger.debug(
+            f"[AstrTown] state_changed 仅更新快照，不唤醒 LLM: eventId={evt.id}, agentId={self._host._agent_id}"
+        )
+        return None
+
+    async def _on_conversation_ended(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: ConversationEndedPayload = evt.body
+        event_id = evt.id
+
+        # 方案C：活跃对话状态更新（invited/started/ended/timeout）
+        ended_cid = body.conversationId
+        if ended_cid and self._host._active_conversation_id == ended_cid:
+            self._host._active_conversation_id = None
+            self._host._conversation_partner_id = None
+        elif not ended_cid:
+            # 没有 conversationId 时保守清空，避免残留。
+            self._host._active_conversation_id = None
+            self._host._conversation_partner_id = None
+
+        other_player_id = body.otherPlayerId
+        other_player_name = body.otherPlayerName or other_player_id or "对方"
+
+        # 本地转录缓冲完整时直接使用；存在缺口（重连、消息过期等）时回退到 Gateway 拉取。
+        local_messages = self._transcripts.take(ended_cid)
+        if local_messages is not None:
+            transcript_messages = local_messages
+        else:
+            transcript_messages = await self._fetch_transcript(ended_cid, event_id)
+
+        # 关键约束：反思任务必须异步后台执行，不能阻塞事件主流程。
+        reflect_task = asyncio.create_task(
+            self._reflection_orch.async_reflect_on_conversation(
+                conversation_id=ended_cid,
+                other_player_name=other_player_name,
+                other_player_id=other_player_id,
+                messages=transcript_messages,
+            ),
+            name=f"astrtown_reflect_{ended_cid or event_id or 'unknown'}",
+        )
+        self._host._track_background_task(reflect_task)
+
+        logger.info(
+            f"[AstrTown] 对话结束事件已处理: conversationId={ended_cid or '-'}, agentId={self._host._agent_id}"
+        )
+        return None
+
+    async def _fetch_transcript(self, conversation_id: str, event_id: str) -> list[dict[str, str]]:
+        transcript_task = asyncio.create_task(
+            self._host._http_client.get_conversation_transcript(
+                world_id=str(self._host._world_id or "").strip(),
+                conversation_id=conversation_id,
+            ),
+            name=f"astrtown_transcript_{conversation_id or event_id or 'unknown'}",
+        )
+        self._host._track_background_task(transcript_task)
 
-        # 仅在事件成功提交后再发送 ACK。
+        transcript_data = None
         try:
-            await self._ack_sender.send_event_ack(event_id)
+            transcript_data = await transcript_task
         except Exception as e:
-            logger.warning(f"[AstrTown] send event ack failed for eventId={event_id}: {e}")
+            logger.warning(
+                f"[AstrTown] conversation transcript 获取异常，conversationId={conversation_id or '-'}: {e}"
+            )
+
+        if isinstance(transcript_data, dict):
+            raw_messages = transcript_data.get("messages")
+            if isinstance(raw_messages, list):
+                return [m for m in raw_messages if isinstance(m, dict)]
+        return []
+
+    async def _on_conversation_started(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: ConversationStartedPayload = evt.body
+        started_cid = body.conversationId
+        if started_cid:
+            self._host._active_conversation_id = started_cid
+            self._transcripts.on_started(started_cid)
+
+        owner_id = str(self._host._player_id or "").strip()
+        partner_id = next((pid for pid in body.otherParticipantIds if pid != owner_id), "")
+        if not partner_id:
+            partner_id = body.otherPlayerId
+
+        if partner_id and partner_id != owner_id:
+            self._host._conversation_partner_id = partner_id
+
+        return self._default_wake(evt)
+
+    async def _on_conversation_timeout(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: ConversationTimeoutPayload = evt.body
+
+        # 1) 状态清理
+        timeout_cid = body.conversationId
+        if timeout_cid and self._host._active_conversation_id == timeout_cid:
+            self._host._active_conversation_id = None
+            self._host._conversation_partner_id = None
+        elif not timeout_cid:
+            self._host._active_conversation_id = None
+            self._host._conversation_partner_id = None
+
+        # 2) 构造系统提示文本，commit_event 唤醒 LLM 破除死锁
+        reason = body.reason
+        if reason == "invite_timeout":
+            text = "【系统提示】对方发起的对话邀请因长时间未响应，已自动失效，你已恢复空闲状态。"
+        elif reason == "idle_timeout":
+            text = "【系统提示】由于双方长时间未发言，对话已因尴尬的沉默被系统自动结束。"
+        else:
+            text = "【系统提示】对话已超时结束。"
+        return WakeRequest(text=text)
+
+    async def _on_relationship_proposed(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: SocialRelationshipProposedPayload = evt.body
+        proposer_id = body.proposerId
+        proposer_name = body.proposerName or proposer_id or "未知玩家"
+        status = body.status or "未知关系"
+        if proposer_id:
+            self._social_cache.invalidate(str(self._host._player_id or ""), proposer_id)
+        text = (
+            f"【系统提示】玩家 {proposer_name} 刚向你申请确立 {status} 关系。"
+            "请结合你的潜意识好感度和人设，决定是否调用 respond_relationship 工具接受，并回复对方。"
+        )
+
+        # 高优先级系统事件：始终唤醒 LLM 决策。
+        wake = WakeRequest(text=text)
+        if proposer_id:
+            wake.extras["proposer_id"] = proposer_id
+        wake.extras["relationship_status"] = status
+        wake.extras["priority"] = "high"
+        return wake
+
+    async def _on_relationship_responded(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: SocialRelationshipRespondedPayload = evt.body
+        responder_id = body.responderId or "未知玩家"
+        status = body.status or "未知关系"
+        accepted = body.accept
+        if body.responderId:
+            self._social_cache.invalidate(str(self._host._player_id or ""), body.responderId)
+        decision_text = "接受" if accepted else "拒绝"
+        text = (
+            f"【系统提示】[{responder_id}] 已{decision_text}了你提出的 [{status}] 关系申请。"
+            "请根据这个结果做出反应。"
+        )
+
+        # 高优先级系统事件：始终唤醒 LLM 决策。
+        return WakeRequest(
+            text=text,
+            extras={
+                "responder_id": responder_id,
+                "relationship_status": status,
+                "relationship_accept": accepted,
+                "priority": "high",
+            },
+        )
+
+    async def _on_command_rejected(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: CommandRejectedPayload = evt.body
+        command_name = body.commandType.removeprefix("command.") or "未知"
+        reason = body.reason or "未说明"
+        text = f"【系统提示】你之前发出的 {command_name} 命令被拒绝（原因：{reason}），该动作没有生效。"
+        if body.conversationId:
+            text += f"\n对话ID：{body.conversationId}"
+        text += "\n请结合当前情况决定是否调整计划或改用其他动作。"
+        return WakeRequest(
+            text=text,
+            extras={
+                "command_id": body.commandId,
+                "command_type": body.commandType,
+                "reject_reason": reason,
+            },
+        )
+
+    async def _on_conversation_invited(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: ConversationInvitedPayload = evt.body
+
+        # 修复1：邀请策略（在最开始读取配置）
+        invite_mode = self._host._cfg.invite_decision_mode
+        conversation_id = body.conversationId
+        inviter_id = body.inviterId
+        inviter_name = body.inviterName or inviter_id
+        owner_id = str(self._host._player_id or "").strip()
+        if inviter_id and inviter_id != owner_id:
+            self._host._conversation_partner_id = inviter_id
+
+        logger.info(
+            f"[AstrTown] 收到邀请事件: decision_mode={invite_mode}, conversationId={conversation_id}, inviter={inviter_name}"
+        )
+
+        if invite_mode == "auto_accept":
+            # 不走 LLM：直接发 command.accept_invite（仅传 conversationId），不 commit_event。
+            if not conversation_id:
+                logger.warning("[AstrTown] 自动接受邀请失败: conversationId 为空")
+            else:
+                logger.info(
+                    f"[AstrTown] 自动接受邀请: conversationId={conversation_id}, inviter={inviter_name}"
+                )
+                try:
+                    await self._host.send_command(
+                        "command.accept_invite",
+                        {"conversationId": conversation_id},
+                    )
+                    # 方案C：自动接受邀请成功后，记录活跃对话。
+                    self._host._active_conversation_id = conversation_id
+                except Exception as e:
+                    logger.error(f"[AstrTown] 自动接受邀请发送命令失败: {e}", exc_info=True)
+
+            # ACK 语义保持闭环：即使不走 LLM，也要 ACK。
+            return None
+
+        # 修复1-B：llm_judge 模式下，conversation_id 由 _commit_wake 显式注入，避免依赖 LLM 从上下文提取。
+        return self._default_wake(evt, sender_id=inviter_id, sender_name=inviter_name)
+
+    async def _on_queue_refill_requested(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        body: AgentQueueRefillRequestedPayload = evt.body
+
+        # queue_refill 事件唤醒门控
+        cfg = self._host._cfg
+        if not cfg.refill_wake_enabled:
+            return None
+
+        min_interval = cfg.refill_min_wake_interval_sec
+
+        now = time.time()
+        elapsed = now - float(self._host._last_refill_wake_ts or 0.0)
+
+        request_id = body.requestId
+        reason = body.reason
+        is_new_request = bool(request_id) and request_id != self._last_refill_request_id
+        is_empty_reason = reason == "empty"
+        force_wake = elapsed >= float(min_interval) * 3.0
+
+        # 三条件门控（按优先级）：
+        # 1) 长时间未唤醒（>= 3 * min_interval）时强制唤醒一次。
+        # 2) 新 requestId + empty：也受 min_interval 约束，避免高频连续唤醒。
+        # 3) 其余情况按 min_interval 节流。
+        if force_wake:
+            should_wake = True
+            gate_reason = "force_after_long_idle"
+        elif is_new_request and is_empty_reason:
+            should_wake = elapsed >= float(min_interval)
+            gate_reason = "new_empty_request" if should_wake else "new_empty_request_throttled"
+        else:
+            should_wake = elapsed >= float(min_interval)
+            gate_reason = "interval"
+
+        # 方案B：当门控条件不满足时，不要每次都打印；
+        # - 状态变化时打印（True<->False 或首次进入门控）
+        # - 或节流：每 min_interval 秒最多打印一次，并附带累计跳过次数
+        if should_wake:
+            if self._host._queue_refill_gate_skip_count > 0 or gate_reason != "interval":
+                logger.debug(
+                    f"[AstrTown] queue_refill 门控: elapsed={elapsed:.1f}s, min_interval={min_interval}s, wake=True,"
+                    f" gate={gate_reason}, requestId={request_id or '-'}, reason={reason or '-'}"
+                    f" (skipped={self._host._queue_refill_gate_skip_count})"
+                )
+                self._host._queue_refill_gate_skip_count = 0
+            self._host._queue_refill_gate_last_should_wake = True
+        else:
+            self._host._queue_refill_gate_skip_count += 1
+            last_state = self._host._queue_refill_gate_last_should_wake
+            state_changed_or_first = last_state is None or last_state is True
+            allow_throttle_log = (
+                now - float(self._host._queue_refill_gate_last_log_ts or 0.0)
+            ) >= float(min_interval)
+            if state_changed_or_first or allow_throttle_log:
+                logger.debug(
+                    f"[AstrTown] queue_refill 门控: elapsed={elapsed:.1f}s, min_interval={min_interval}s, wake=False,"
+                    f" gate={gate_reason}, requestId={request_id or '-'}, reason={reason or '-'}"
+                    f" (skipped={self._host._queue_refill_gate_skip_count})"
+                )
+                self._host._queue_refill_gate_last_log_ts = now
+                self._host._queue_refill_gate_last_should_wake = False
+
+        if request_id:
+            self._last_refill_request_id = request_id
+
+        if not should_wake:
+            return None
+
+        self._host._last_refill_wake_ts = now
+
+        world_context: dict[str, Any] | None = None
+        try:
+            world_context = self._build_queue_refill_world_context(body)
+        except Exception as e:
+            # 世界状态注入失败时降级，仍保持 queue_refill 专用提示词分支。
+            logger.warning(f"[AstrTown] 构建 queue_refill 世界状态摘要失败: {e}")
+            world_context = None
+
+        return self._default_wake(evt, world_context=world_context)
+
+    async def _on_action_finished(self, evt: WorldEvent, data: dict[str, Any]) -> WakeRequest | None:
+        # action.finished 仅用于状态记录，不应触发 LLM 唤醒。
+        body: ActionFinishedPayload = evt.body
+        self._latency.record_finished(body.actionType, body.result)
+        if body.success is False and body.result.get("reason") == "expired":
+            logger.warning(f"指令已过期被丢弃: {evt.payload}")
+        return None
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+from ..protocol import WorldEvent
+
+# 事件优先级分级：数值越小越优先。
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# ACK 策略：
+# - after_handle：处理完成后 ACK；若需要唤醒 LLM，仅在 commit_event 成功后 ACK。
+# - before_handle：收到即 ACK，随后再执行（可能较慢的）处理逻辑，避免占用 Gateway 投递窗口。
+AckPolicy = Literal["after_handle", "before_handle"]
+
+
+@dataclass(frozen=True)
+class WorldEventTraits:
+    """事件处理器声明的特性。"""
+
+    # False：该事件只做状态更新，处理器返回的唤醒请求会被分发器忽略（不提交 LLM、不计入唤醒积压）。
+    wakes_llm: bool = True
+    ack_policy: AckPolicy = "after_handle"
+    priority: int = PRIORITY_NORMAL
+    # 返回去重键；返回空字符串表示该事件不参与去重。
+    dedupe_key: Callable[[WorldEvent], str] | None = None
+
+
+@dataclass
+class WakeRequest:
+    """处理器要求唤醒 LLM 时返回的提交描述。"""
+
+    text: str
+    sender_id: str = "system"
+    sender_name: str = "AstrTown"
+    extras: dict[str, Any] = field(default_factory=dict)
+
+
+WorldEventHandlerFunc = Callable[[WorldEvent, dict[str, Any]], Awaitable[WakeRequest | None]]
+
+
+@dataclass
+class WorldEventHandlerStats:
+    calls: int = 0
+    woke: int = 0
+    consumed: int = 0
+    deduped: int = 0
+    expired: int = 0
+    commit_failed: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "woke": self.woke,
+            "consumed": self.consumed,
+            "deduped": self.deduped,
+            "expired": self.expired,
+            "commitFailed": self.commit_failed,
+            "errors": self.errors,
+            "avgMs": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "maxMs": round(self.max_ms, 3),
+        }
+
+
+class WorldEventHandler:
+    """单个事件类型的处理器及其运行统计。"""
+
+    __slots__ = ("event_type", "func", "traits", "stats")
+
+    def __init__(self, event_type: str, func: WorldEventHandlerFunc, traits: WorldEventTraits) -> None:
+        self.event_type = event_type
+        self.func = func
+        self.traits = traits
+        self.stats = WorldEventHandlerStats()
+
+    def record(self, outcome: str, started_at: float) -> None:
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        stats = self.stats
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        if elapsed_ms > stats.max_ms:
+            stats.max_ms = elapsed_ms
+        if outcome == "woke":
+            stats.woke += 1
+        elif outcome == "consumed":
+            stats.consumed += 1
+        elif outcome == "deduped":
+            stats.deduped += 1
+        elif outcome == "expired":
+            stats.expired += 1
+        elif outcome == "commit_failed":
+            stats.commit_failed += 1
+        elif outcome == "error":
+            stats.errors += 1
+
+
+class WorldEventHandlerRegistry:
+    """事件类型 -> 处理器 的查表注册中心（O(1) 分发）。
+
+    未注册的事件类型交给 fallback 处理器（默认唤醒 LLM）。
+    """
+
+    def __init__(self, fallback: WorldEventHandler) -> None:
+        self._handlers: dict[str, WorldEventHandler] = {}
+        self._fallback = fallback
+
+    def register(
+        self,
+        event_type: str,
+        func: WorldEventHandlerFunc,
+        traits: WorldEventTraits | None = None,
+    ) -> WorldEventHandler:
+        """注册（或覆盖）某事件类型的处理器。"""
+        handler = WorldEventHandler(event_type, func, traits or WorldEventTraits())
+        self._handlers[event_type] = handler
+        return handler
+
+    def resolve(self, event_type: str) -> WorldEventHandler:
+        return self._handlers.get(event_type) or self._fallback
+
+    def registered_types(self) -> list[str]:
+        return list(self._handlers)
+
+    def snapshot_stats(self) -> dict[str, dict[str, Any]]:
+        result = {event_type: h.stats.snapshot() for event_type, h in self._handlers.items()}
+        result["*"] = self._fallback.stats.snapshot()
+        return result
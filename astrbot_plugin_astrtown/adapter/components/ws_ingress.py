@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from astrbot import logger
+
+from .contracts import AdapterHostProtocol
+from .event_ack_sender import EventAckSender
+from .flow_credit import FlowCreditController
+from .session_context import SessionContextService
+from .state_coalescer import STATE_CHANGED_EVENT_TYPE, StateChangeCoalescer
+from .world_event_dispatcher import WorldEventDispatcher
+from .world_event_registry import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+_PRIORITY_CLASS_NAMES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+
+
+class WsIngressQueue:
+    """世界事件入站队列。
+
+    ws 接收循环只负责解码与入队，世界事件由固定数量的分发 worker 消费，
+    避免慢处理（如对话转录 HTTP 拉取）阻塞 command.ack / ping 等控制帧。
+    lane 中的事件达到 astrtown_ingress_queue_size 后，新事件按到达顺序暂存到溢出列表，
+    worker 每处理完一条再从中补入 lane。积压期间 FlowCreditController 的目标额度随本地未处理事件数下降，
+    不再向 Gateway 授予额度（协议 v4），由 Gateway 侧排队。
+    溢出列表最多 astrtown_ingress_overflow_max 条（不依赖流控，v1-v3 或未启用额度时同样生效）：
+    达到上限时丢弃最早的一条未 ACK 低优先级事件（不 ACK，由 Gateway 超时重投）；
+    没有可丢弃的事件时 submit 挂起，接收循环暂停读取，直到 worker 腾出空位。
+
+    事件按 SessionContextService 计算的会话 ID 分片到独立 lane：
+    同一会话内严格按到达顺序串行处理，不同会话（世界级事件、其他对话）并行处理。
+    agent.state_changed 先经过 StateChangeCoalescer 合并，只有窗口内最新的一条进入 lane。
+
+    就绪 lane 按队首事件的优先级分级调度（处理器声明的 priority；属于当前活跃对话的事件提升为 high），
+    高优先级先出队；低优先级 lane 等待超过 astrtown_ingress_starvation_ms 时优先出队，避免饿死。
+
+    每条 Gateway 事件在被丢弃（重复/过期/合并）或分发完成时通知 FlowCreditController 归还额度。
+    submit 在接收循环中执行，丢弃事件的 ACK 只交给写者排队、不等待写出，接收循环不会排在命令帧之后；
+    等待写出的 ACK 只发生在 worker 侧。
+    """
+
+    def __init__(
+        self,
+        host: AdapterHostProtocol,
+        event_dispatcher: WorldEventDispatcher,
+        session_ctx: SessionContextService,
+        ack_sender: EventAckSender,
+        flow: FlowCreditController,
+    ) -> None:
+        self._host: Any = host
+        self._event_dispatcher = event_dispatcher
+        self._flow = flow
+        self._session_ctx = session_ctx
+        self._state_coalescer = StateChangeCoalescer(host, ack_sender, self._enqueue_acked)
+
+        # session_id -> 待处理事件 (入队时间, 原始消息, 是否已 ACK, 优先级)
+        self._lanes: dict[str, deque[tuple[float, dict[str, Any], bool, int]]] = {}
+        # 已有待处理事件且当前没有 worker 持有的 lane，按优先级分级：(就绪时间, session_id)。
+        self._ready: list[deque[tuple[float, str]]] | None = None
+        # 就绪 lane 计数信号，worker 在此等待。
+        self._ready_signal: asyncio.Semaphore | None = None
+        # 正在被 worker 处理的 lane；同一 lane 同时最多一个 worker。
+        self._active_lanes: set[str] = set()
+        # 已入 lane 尚未处理完的事件 ID；重连后 Gateway 重投的同一事件无需重复入队。
+        self._queued_event_ids: set[str] = set()
+        # lane 容量已满时暂存的事件 (原始消息, 是否已 ACK, 优先级)，保持到达顺序。
+        self._overflow: deque[tuple[dict[str, Any], bool, int]] = deque()
+        # 溢出列表未满时置位；满且无可丢弃事件时入队方在此等待（接收循环随之暂停读取）。
+        self._overflow_space = asyncio.Event()
+        self._overflow_space.set()
+        self._capacity_size = 0
+        self._overflow_max = 0
+        self._depth = 0
+        self._workers: list[asyncio.Task[Any]] = []
+
+        self._enqueued_total = 0
+        self._processed_total = 0
+        self._failed_total = 0
+        self._duplicate_total = 0
+        self._queued_duplicate_total = 0
+        self._overflowed_total = 0
+        self._max_overflow = 0
+        self._overflow_shed_total = 0
+        self._overflow_paused_total = 0
+        self._max_depth = 0
+        self._max_lanes = 0
+        self._full_last_log_ts = 0.0
+        self._starvation_promoted_total = 0
+        # 上一次出队是否为防饿死提升；提升与正常优先级交替进行，避免积压的低优先级反过来压住高优先级。
+        self._last_pick_promoted = False
+        # 优先级 -> [出队数, 累计排队毫秒, 最大排队毫秒]
+        self._class_delay: dict[int, list[float]] = {p: [0, 0.0, 0.0] for p in _PRIORITY_CLASS_NAMES}
+
+    @staticmethod
+    def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"[AstrTown] invalid {field} for {msg_type}: {value!r}, using {default}")
+            return default
+
+    def _resolve_queue_size(self) -> int:
+        size = self._safe_int(
+            self._host.config.get("astrtown_ingress_queue_size", 256),
+            256,
+            "astrtown_ingress_queue_size",
+            "platform_config",
+        )
+        return max(1, size)
+
+    def _resolve_overflow_max(self) -> int:
+        size = self._safe_int(
+            self._host.config.get("astrtown_ingress_overflow_max", 1024),
+            1024,
+            "astrtown_ingress_overflow_max",
+            "platform_config",
+        )
+        return max(1, size)
+
+    def _resolve_worker_count(self) -> int:
+        count = self._safe_int(
+            self._host.config.get("astrtown_ingress_workers", 4),
+            4,
+            "astrtown_ingress_workers",
+            "platform_config",
+        )
+        return max(1, min(count, 64))
+
+    def _lane_key(self, event_type: str, payload: dict[str, Any]) -> str:
+        try:
+            return self._session_ctx.resolve_session_id(event_type, payload)
+        except Exception:
+            return ""
+
+    def _priority_class(self, event_type: str, payload: dict[str, Any]) -> int:
+        """由事件类型（处理器声明）与对话归属推导优先级。"""
+        conversation_id = payload.get("conversationId")
+        active_conversation_id = self._host._active_conversation_id
+        if conversation_id and active_conversation_id and str(conversation_id) == active_conversation_id:
+            return PRIORITY_HIGH
+        priority = self._event_dispatcher.registry.resolve(event_type).traits.priority
+        return max(PRIORITY_HIGH, min(priority, PRIORITY_LOW))
+
+    def _push_ready(self, lane_key: str, lane: deque[tuple[float, dict[str, Any], bool, int]]) -> None:
+        ready = self._ready
+        signal = self._ready_signal
+        assert ready is not None and signal is not None
+        priority = lane[0][3]
+        ready[priority].append((time.monotonic(), lane_key))
+        signal.release()
+
+    def _pop_ready(self) -> str:
+        """取出下一个就绪 lane：默认高优先级优先；低优先级等待过久时先出队。"""
+        ready = self._ready
+        assert ready is not None
+        now = time.monotonic()
+        starvation_s = self._host._cfg.ingress_starvation_ms / 1000.0
+        if starvation_s > 0 and not self._last_pick_promoted:
+            starving: deque[tuple[float, str]] | None = None
+            for bucket in ready[PRIORITY_NORMAL:]:
+                if bucket and now - bucket[0][0] >= starvation_s:
+                    if starving is None or bucket[0][0] < starving[0][0]:
+                        starving = bucket
+            if starving is not None:
+                self._starvation_promoted_total += 1
+                self._last_pick_promoted = True
+                return starving.popleft()[1]
+        self._last_pick_promoted = False
+        for bucket in ready:
+            if bucket:
+                return bucket.popleft()[1]
+        raise RuntimeError("ingress ready signal without ready lane")
+
+    def ensure_started(self) -> None:
+        """按需启动 worker；worker 跨重连存活，直到 stop() 或适配器 terminate。"""
+        if self._ready is None:
+            self._ready = [deque() for _ in _PRIORITY_CLASS_NAMES]
+            self._ready_signal = asyncio.Semaphore(0)
+            self._capacity_size = self._resolve_queue_size()
+            self._overflow_max = self._resolve_overflow_max()
+
+        self._workers = [t for t in self._workers if not t.done()]
+        missing = self._resolve_worker_count() - len(self._workers)
+        for _ in range(max(0, missing)):
+            index = len(self._workers)
+            task = asyncio.create_task(self._worker_loop(index), name=f"astrtown_ingress_worker_{index}")
+            self._workers.append(task)
+            self._host._track_background_task(task)
+
+    async def submit(self, data: dict[str, Any]) -> None:
+        """将世界事件放入所属会话 lane（lane 已满时暂存到溢出列表）；溢出列表满且无可丢弃事件时挂起。"""
+        self.ensure_started()
+        self._flow.on_event_received()
+        event_type = str(data.get("type") or "")
+        event_id = str(data.get("id") or "")
+        dispatcher = self._event_dispatcher
+        if event_id in self._queued_event_ids:
+            # 原事件仍在 lane 中，其 ACK 会覆盖同一 eventId，这里直接丢弃重投副本。
+            self._queued_duplicate_total += 1
+            self._flow.release()
+            return
+        if dispatcher.is_processed(event_id):
+            self._duplicate_total += 1
+            self._flow.release()
+            await dispatcher.drop_duplicate(event_type, event_id, wait=False)
+            return
+
+        expires_at = self._safe_int(data.get("expiresAt", 0), 0, "expiresAt", "world_event")
+        if dispatcher.is_expired(expires_at):
+            self._flow.release()
+            payload = data.get("payload")
+            conversation_id = payload.get("conversationId") if isinstance(payload, dict) else None
+            await dispatcher.drop_expired(
+                event_type,
+                event_id,
+                "ingress",
+                conversation_id=str(conversation_id or "").strip(),
+                wait=False,
+            )
+            return
+
+        coalescer = self._state_coalescer
+        if event_type == STATE_CHANGED_EVENT_TYPE and coalescer.enabled():
+            # 合并后的快照以本地事件入队，原事件在此归还额度。
+            self._flow.release()
+            await coalescer.offer(data)
+            dispatcher.mark_processed(event_id)
+            return
+        # 其他事件先冲刷待应用的状态快照，保证 lane 内顺序与到达顺序一致。
+        await coalescer.flush()
+        if event_id:
+            self._queued_event_ids.add(event_id)
+        await self._enqueue(data, acked=False)
+
+    async def submit_local(self, data: dict[str, Any]) -> None:
+        """提交适配器本地合成的事件（不来自 Gateway：不做去重/过期检查，也不发送 event.ack）。"""
+        await self._enqueue(data, acked=True)
+
+    async def _enqueue_acked(self, data: dict[str, Any]) -> None:
+        await self._enqueue(data, acked=True)
+
+    async def _enqueue(self, data: dict[str, Any], *, acked: bool) -> None:
+        self.ensure_started()
+
+        # 已有溢出事件时新事件也必须排在其后，保证同一会话内的到达顺序。
+        if self._overflow or self._depth >= self._capacity_size:
+            priority = self._priority_class(str(data.get("type") or ""), self._payload_of(data))
+            while len(self._overflow) >= self._overflow_max:
+                if self._shed_overflow():
+                    continue
+                if not acked and priority == PRIORITY_LOW:
+                    # 新事件本身是可丢弃的低优先级事件：不入队也不 ACK，由 Gateway 重投。
+                    self._overflow_shed_total += 1
+                    self._queued_event_ids.discard(str(data.get("id") or ""))
+                    self._flow.release()
+                    self._log_overflow("入站溢出列表已满，丢弃低优先级事件（未 ACK，等待 Gateway 重投）")
+                    return
+                self._overflow_paused_total += 1
+                self._log_overflow("入站溢出列表已满，暂停读取 WebSocket 直到 worker 腾出空位")
+                self._overflow_space.clear()
+                await self._overflow_space.wait()
+                if self._ready is None:
+                    # 等待期间入站队列已停止（断线/terminate），事件随之丢弃。
+                    return
+            if not self._overflow and self._depth < self._capacity_size:
+                self._place(data, acked)
+                return
+            self._overflow.append((data, acked, priority))
+            self._overflowed_total += 1
+            if len(self._overflow) > self._max_overflow:
+                self._max_overflow = len(self._overflow)
+            self._log_overflow("入站队列已满，事件暂存到溢出列表")
+            return
+
+        self._place(data, acked)
+
+    def _shed_overflow(self) -> bool:
+        """丢弃溢出列表中最早的一条未 ACK 低优先级事件（不发送 ACK，Gateway 超时后重投）。"""
+        for index, (data, acked, priority) in enumerate(self._overflow):
+            if acked or priority != PRIORITY_LOW:
+                continue
+            del self._overflow[index]
+            self._overflow_shed_total += 1
+            self._queued_event_ids.discard(str(data.get("id") or ""))
+            self._flow.release()
+            self._log_overflow("入站溢出列表已满，丢弃最早的低优先级事件（未 ACK，等待 Gateway 重投）")
+            return True
+        return False
+
+    def _log_overflow(self, message: str) -> None:
+        now = time.time()
+        if (now - self._full_last_log_ts) >= 10.0:
+            self._full_last_log_ts = now
+            logger.warning(
+                f"[AstrTown] {message}: depth={self._depth}, overflow={len(self._overflow)}, "
+                f"shed={self._overflow_shed_total}, agentId={self._host._agent_id}"
+            )
+
+    @staticmethod
+    def _payload_of(data: dict[str, Any]) -> dict[str, Any]:
+        payload = data.get("payload")
+        return payload if isinstance(payload, dict) else {}
+
+    def _place(self, data: dict[str, Any], acked: bool) -> None:
+        event_type = str(data.get("type") or "")
+        payload = self._payload_of(data)
+        lane_key = self._lane_key(event_type, payload)
+        lane = self._lanes.get(lane_key)
+        if lane is None:
+            lane = deque()
+            self._lanes[lane_key] = lane
+            if len(self._lanes) > self._max_lanes:
+                self._max_lanes = len(self._lanes)
+        lane.append((time.monotonic(), data, acked, self._priority_class(event_type, payload)))
+
+        # lane 首个待处理事件且无 worker 持有时才进入就绪队列，保证同一 lane 串行。
+        if len(lane) == 1 and lane_key not in self._active_lanes:
+            self._push_ready(lane_key, lane)
+
+        self._enqueued_total += 1
+        self._depth += 1
+        if self._depth > self._max_depth:
+            self._max_depth = self._depth
+
+    def _drain_overflow(self) -> None:
+        """lane 有空位时按到达顺序补入溢出事件。"""
+        overflow = self._overflow
+        while overflow and self._depth < self._capacity_size:
+            data, acked, _ = overflow.popleft()
+            self._place(data, acked)
+        if len(overflow) < self._overflow_max:
+            self._overflow_space.set()
+
+    async def stop(self) -> None:
+        self._state_coalescer.reset()
+        workers = [t for t in self._workers if not t.done()]
+        for t in workers:
+            t.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._lanes.clear()
+        self._active_lanes.clear()
+        self._queued_event_ids.clear()
+        self._overflow.clear()
+        self._ready = None
+        self._ready_signal = None
+        self._depth = 0
+        # 唤醒因溢出列表已满而挂起的入队方，使其放弃入队。
+        self._overflow_space.set()
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "depth": self._depth,
+            "capacity": self._capacity_size or self._resolve_queue_size(),
+            "workers": sum(1 for t in self._workers if not t.done()),
+            "lanes": len(self._lanes),
+            "activeLanes": len(self._active_lanes),
+            "maxLanes": self._max_lanes,
+            "enqueued": self._enqueued_total,
+            "processed": self._processed_total,
+            "failed": self._failed_total,
+            "duplicates": self._duplicate_total,
+            "queuedDuplicates": self._queued_duplicate_total,
+            "overflow": len(self._overflow),
+            "overflowed": self._overflowed_total,
+            "maxOverflow": self._max_overflow,
+            "overflowMax": self._overflow_max or self._resolve_overflow_max(),
+            "overflowShed": self._overflow_shed_total,
+            "overflowPaused": self._overflow_paused_total,
+            "maxDepth": self._max_depth,
+            "starvationPromoted": self._starvation_promoted_total,
+            "queueDelayByClass": {
+                _PRIORITY_CLASS_NAMES[p]: {
+                    "count": int(count),
+                    "avgMs": round(total_ms / count, 3) if count else 0.0,
+                    "maxMs": round(max_ms, 3),
+                }
+                for p, (count, total_ms, max_ms) in self._class_delay.items()
+            },
+            "stateCoalescer": self._state_coalescer.snapshot_stats(),
+        }
+
+    async def _worker_loop(self, index: int) -> None:
+        signal = self._ready_signal
+        assert signal is not None
+        while not self._host._stop_event.is_set():
+            await signal.acquire()
+            lane_key = self._pop_ready()
+            lane = self._lanes.get(lane_key)
+            if not lane:
+                continue
+
+            self._active_lanes.add(lane_key)
+            enqueued_at, data, acked, priority = lane.popleft()
+            self._record_queue_delay(priority, enqueued_at)
+            try:
+                await self._event_dispatcher.handle_world_event(data, acked=acked)
+                self._processed_total += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed_total += 1
+                logger.error(
+                    f"[AstrTown] 入站 worker 处理世界事件异常: worker={index}, lane={lane_key}, "
+                    f"type={data.get('type')!r}, eventId={data.get('id')!r}, "
+                    f"waitedMs={int((time.monotonic() - enqueued_at) * 1000)}: {e}",
+                    exc_info=True,
+                )
+            finally:
+                if not acked:
+                    self._queued_event_ids.discard(str(data.get("id") or ""))
+                    self._flow.release()
+                self._active_lanes.discard(lane_key)
+                self._depth -= 1
+                # 每处理一条就让出 lane，重新排到就绪队列尾部，避免单个繁忙会话饿死其他会话。
+                if lane:
+                    self._push_ready(lane_key, lane)
+                elif self._lanes.get(lane_key) is lane:
+                    self._lanes.pop(lane_key, None)
+                # lane 归位后再补入溢出事件，避免同一 lane 重复进入就绪队列。
+                self._drain_overflow()
+
+    def _record_queue_delay(self, priority: int, enqueued_at: float) -> None:
+        waited_ms = (time.monotonic() - enqueued_at) * 1000.0
+        stats = self._class_delay[priority]
+        stats[0] += 1
+        stats[1] += waited_ms
+        if waited_ms > stats[2]:
+            stats[2] = waited_ms
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import random
 import time
 from typing import Any
@@ -17,16 +16,22 @@ except Exception as e:  # pragma: no cover
 
 from astrbot import logger
 
+from .. import json_codec
 from .contracts import AdapterHostProtocol
 from .ws_message_router import WsMessageRouter
+from .ws_writer import WsFrameWriter
+
+# 连接期间检查配置变化的最小间隔（秒）；断线重连前总会检查一次。
+_CONFIG_REFRESH_INTERVAL_SEC = 2.0
 
 
 class WsLifecycleService:
     """WebSocket 生命周期服务。"""
 
-    def __init__(self, host: AdapterHostProtocol, message_router: WsMessageRouter) -> None:
+    def __init__(self, host: AdapterHostProtocol, message_router: WsMessageRouter, writer: WsFrameWriter) -> None:
         self._host: Any = host
         self._message_router = message_router
+        self._writer = writer
 
     def build_ws_connect_url(self) -> str:
         ws_base = self._host.gateway_url
@@ -90,6 +95,8 @@ class WsLifecycleService:
     async def ws_loop(self) -> None:
         delay = float(self._host.reconnect_min_delay)
         while not self._host._stop_event.is_set():
+            self._host._refresh_config_snapshot()
+
             # 每轮连接前刷新 token：支持用户在运行时更新配置后自动恢复。
             latest_token = str(self._host.config.get("astrtown_token", "") or "").strip()
             if latest_token != self._host.token:
@@ -169,25 +176,22 @@ class WsLifecycleService:
                 max_queue=256,
             ) as websocket:
                 self._host._ws = websocket
+                self._writer.start(websocket)
                 logger.info("[AstrTown] ws connected")
 
                 async for raw in websocket:
                     if self._host._stop_event.is_set():
                         break
 
-                    if not isinstance(raw, str):
-                        if isinstance(raw, (bytes, bytearray, memoryview)):
-                            try:
-                                raw = bytes(raw).decode("utf-8")
-                            except Exception as e:
-                                logger.debug(f"[AstrTown] ws recv non-utf8 binary frame ignored: {e}")
-                                continue
-                        else:
-                            logger.debug(f"[AstrTown] ws recv unknown frame type ignored: {type(raw)!r}")
-                            continue
+                    if time.monotonic() - self._host._cfg_last_check_ts >= _CONFIG_REFRESH_INTERVAL_SEC:
+                        self._host._refresh_config_snapshot()
+
+                    if not isinstance(raw, (str, bytes, bytearray, memoryview)):
+                        logger.debug(f"[AstrTown] ws recv unknown frame type ignored: {type(raw)!r}")
+                        continue
 
                     try:
-                        data = json.loads(raw)
+                        data = json_codec.loads(raw)
                     except Exception as e:
                         logger.debug(f"[AstrTown] ws recv invalid json ignored: {e}")
                         continue
@@ -199,6 +203,7 @@ class WsLifecycleService:
                     await self._message_router.handle_ws_message(data)
         finally:
             # 确保重连时不保留过期的 ws 引用或绑定信息。
+            self._writer.stop()
             self._host._ws = None
             self._host._negotiated_version = None
             self._host._agent_id = None
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import time
 from typing import Any
 
@@ -23,8 +23,12 @@ from ..protocol import (
     ConnectedPayload,
 )
 from .contracts import AdapterHostProtocol
+from .flow_credit import FlowCreditController
 from .gateway_http_client import GatewayHttpClient
+from .transcript_buffer import ConversationTranscriptBuffer
 from .world_event_dispatcher import WorldEventDispatcher
+from .ws_ingress import WsIngressQueue
+from .ws_writer import LANE_CONTROL, WsFrameWriter
 
 
 class WsMessageRouter:
@@ -35,10 +39,18 @@ class WsMessageRouter:
         host: AdapterHostProtocol,
         http_client: GatewayHttpClient,
         event_dispatcher: WorldEventDispatcher,
+        ingress: WsIngressQueue,
+        writer: WsFrameWriter,
+        flow: FlowCreditController,
+        transcripts: ConversationTranscriptBuffer,
     ) -> None:
         self._host = host
         self._http_client = http_client
         self._event_dispatcher = event_dispatcher
+        self._ingress = ingress
+        self._writer = writer
+        self._flow = flow
+        self._transcripts = transcripts
 
     @staticmethod
     def _safe_int(value: Any, default: int, field: str, msg_type: str) -> int:
@@ -49,6 +61,11 @@ class WsMessageRouter:
             return default
 
     async def handle_ws_message(self, data: dict[str, Any]) -> None:
+        """路由单条入站消息。
+
+        控制帧（ping/connected/auth_error/command.ack）在接收循环内联处理，作为快速通道；
+        世界事件只入队到 WsIngressQueue，由分发 worker 异步消费。
+        """
         if self._host._stop_event.is_set():
             return
 
@@ -96,11 +113,25 @@ class WsMessageRouter:
                 f"[AstrTown] authenticated agentId={self._host._agent_id} playerId={self._host._player_id} worldId={self._host._world_id} v={self._host._negotiated_version}"
             )
 
-            try:
-                await self._http_client.sync_persona_to_gateway(player_id=self._host._player_id)
-            except Exception as e:
-                logger.warning(f"[AstrTown] sync persona failed: {e}")
+            # 协议 v4：授予初始事件额度（未启用流控时为空操作）。
+            self._flow.on_connected()
+
+            # 断线期间的对话消息可能丢失，进行中会话的转录缓冲在结束时改为从 Gateway 拉取。
+            self._transcripts.mark_gap()
+
+            # 人设同步走 HTTP，放到后台执行，避免占用控制帧快速通道。
+            sync_task = asyncio.create_task(
+                self._sync_persona_best_effort(self._host._player_id),
+                name=f"astrtown_sync_persona_{self._host._player_id or 'unknown'}",
+            )
+            self._host._track_background_task(sync_task)
 
+            # 重放断线前未确认的命令（命令日志未开启时为空操作）。
+            replay_task = asyncio.create_task(
+                self._host._replay_command_journal(),
+                name="astrtown_command_journal_replay",
+            )
+            self._host._track_background_task(replay_task)
             return
 
         if msg_type == "auth_error":
@@ -174,18 +205,13 @@ class WsMessageRouter:
 
             fut = self._host._pending_commands.pop(command_id, None)
             if fut is None:
-                now_ts = time.time()
-                tombstone_expire_at = self._host._recent_timed_out_commands.get(command_id)
-                if isinstance(tombstone_expire_at, float) and tombstone_expire_at >= now_ts:
+                # tombstone 过期清理由时间轮负责，这里只做 O(1) 查询。
+                if command_id in self._host._recent_timed_out_commands:
                     logger.debug(f"[AstrTown] late command.ack matched timeout tombstone: commandId={command_id}")
                     self._host._recent_timed_out_commands.pop(command_id, None)
+                    self._host._on_late_command_ack(ack.payload)
                     return
 
-                # 顺带清理过期 tombstone，避免增长。
-                for cid, expire_at in list(self._host._recent_timed_out_commands.items()):
-                    if expire_at < now_ts:
-                        self._host._recent_timed_out_commands.pop(cid, None)
-
                 logger.debug(f"[AstrTown] command.ack for unknown commandId={command_id}")
                 return
             if not fut.done():
@@ -198,11 +224,17 @@ class WsMessageRouter:
             or msg_type.startswith("action.")
             or msg_type.startswith("social.")
         ):
-            await self._event_dispatcher.handle_world_event(data)
+            await self._ingress.submit(data)
             return
 
         logger.debug(f"[AstrTown] ws recv unknown message type ignored: {msg_type!r}")
 
+    async def _sync_persona_best_effort(self, player_id: str | None) -> None:
+        try:
+            await self._http_client.sync_persona_to_gateway(player_id=player_id)
+        except Exception as e:
+            logger.warning(f"[AstrTown] sync persona failed: {e}")
+
     async def handle_ping(self, data: dict[str, Any]) -> None:
         ws = self._host._ws
         if ws is None:
@@ -214,7 +246,7 @@ class WsMessageRouter:
             "payload": {},
         }
         try:
-            await ws.send(json.dumps(pong, ensure_ascii=False))
+            await self._writer.send(ws, pong, LANE_CONTROL)
         except ConnectionClosed:
             return
         except Exception:
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from astrbot import logger
+
+from .. import json_codec
+from .contracts import AdapterHostProtocol
+
+# 出站帧优先级（数值越小越先写出）。
+LANE_CONTROL = 0
+LANE_COMMAND = 1
+LANE_ACK = 2
+
+_LANE_NAMES = ("control", "command", "ack")
+
+# 与 EventAckSender 一致：协议 v2 起 event.ack 支持 payload.eventIds。
+_ACK_COALESCE_MIN_PROTOCOL_VERSION = 2
+_ACK_COALESCE_MAX_IDS = 64
+
+
+class WsFrameWriter:
+    """单连接单写者：所有出站帧经优先级 lane 排队，由一个写任务按 control > command > ack 顺序写出。
+
+    调用方 await send() 直到帧真正写出（或失败），因此发送失败仍在调用方处理；
+    接收循环等不能等待写出的调用方使用 post()，只入队并返回代表写出结果的 future。
+    ACK lane 中排队的多个 event.ack 在写出时合并为一帧（协议 v2+），减少被命令阻塞期间积压的小帧。
+    写任务未运行（或帧属于已失效的连接）时直接在调用方协程中写出。
+    """
+
+    def __init__(self, host: AdapterHostProtocol) -> None:
+        self._host: Any = host
+        self._ws: Any = None
+        self._task: asyncio.Task[Any] | None = None
+        self._lanes: tuple[deque[tuple[float, dict[str, Any], asyncio.Future[None]]], ...] = (
+            deque(),
+            deque(),
+            deque(),
+        )
+        self._wakeup = asyncio.Event()
+
+        self._frames_written = [0, 0, 0]
+        self._write_latency_total_ms = [0.0, 0.0, 0.0]
+        self._write_latency_max_ms = [0.0, 0.0, 0.0]
+        self._max_depth = [0, 0, 0]
+        self._coalesced_frames = 0
+        self._write_errors = 0
+
+    def start(self, ws: Any) -> None:
+        """为新连接启动写任务。"""
+        self.stop()
+        self._ws = ws
+        self._task = asyncio.create_task(self._run(ws), name="astrtown_ws_writer")
+        self._host._track_background_task(self._task)
+
+    def stop(self) -> None:
+        """停止写任务，并让尚未写出的帧以连接断开失败。"""
+        task = self._task
+        self._task = None
+        self._ws = None
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+        err = ConnectionError("WebSocket disconnected")
+        for lane in self._lanes:
+            while lane:
+                _, _, fut = lane.popleft()
+                if not fut.done():
+                    fut.set_exception(err)
+
+    async def send(self, ws: Any, frame: dict[str, Any], lane: int) -> None:
+        """按 lane 优先级写出一帧；写出失败时抛出与 ws.send 相同的异常。"""
+        if self._task is None or self._task.done() or ws is not self._ws:
+            await ws.send(json_codec.dumps(frame))
+            return
+        await self._put(frame, lane)
+
+    def post(self, ws: Any, frame: dict[str, Any], lane: int) -> asyncio.Future[None]:
+        """入队一帧后立即返回（不等待写出）；返回的 future 在写出完成或失败时结束。
+
+        写任务未运行时在后台任务中直接写出。
+        """
+        if self._task is None or self._task.done() or ws is not self._ws:
+            task = asyncio.create_task(ws.send(json_codec.dumps(frame)), name="astrtown_ws_post")
+            self._host._track_background_task(task)
+            return task
+        return self._put(frame, lane)
+
+    def _put(self, frame: dict[str, Any], lane: int) -> asyncio.Future[None]:
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        queue = self._lanes[lane]
+        queue.append((time.monotonic(), frame, fut))
+        if len(queue) > self._max_depth[lane]:
+            self._max_depth[lane] = len(queue)
+        self._wakeup.set()
+        return fut
+
+    def _pop(self) -> tuple[int, list[tuple[float, dict[str, Any], asyncio.Future[None]]]] | None:
+        for lane_idx, queue in enumerate(self._lanes):
+            if not queue:
+                continue
+            first = queue.popleft()
+            items = [first]
+            if lane_idx == LANE_ACK and self._ack_coalesce_supported() and first[1].get("type") == "event.ack":
+                # 排队的 ACK 帧可能已由 EventAckSender 批量化，合并上限按 eventId 总数计算。
+                id_count = self._ack_id_count(first[1])
+                while queue and queue[0][1].get("type") == "event.ack":
+                    next_count = self._ack_id_count(queue[0][1])
+                    if id_count + next_count > _ACK_COALESCE_MAX_IDS:
+                        break
+                    items.append(queue.popleft())
+                    id_count += next_count
+            return lane_idx, items
+        return None
+
+    def _ack_coalesce_supported(self) -> bool:
+        return int(self._host._negotiated_version or 1) >= _ACK_COALESCE_MIN_PROTOCOL_VERSION
+
+    @staticmethod
+    def _ack_id_count(frame: dict[str, Any]) -> int:
+        payload = frame.get("payload") or {}
+        ids = payload.get("eventIds")
+        if isinstance(ids, list):
+            return len(ids)
+        return 1 if payload.get("eventId") else 0
+
+    @staticmethod
+    def _merge_acks(items: list[tuple[float, dict[str, Any], asyncio.Future[None]]]) -> dict[str, Any]:
+        first = items[0][1]
+        event_ids: list[str] = []
+        for _, frame, _ in items:
+            payload = frame.get("payload") or {}
+            ids = payload.get("eventIds")
+            if isinstance(ids, list):
+                event_ids.extend(str(eid) for eid in ids)
+            elif payload.get("eventId"):
+                event_ids.append(str(payload["eventId"]))
+        return {**first, "payload": {"eventIds": event_ids}}
+
+    async def _run(self, ws: Any) -> None:
+        while True:
+            popped = self._pop()
+            if popped is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            lane_idx, items = popped
+            if len(items) > 1:
+                frame = self._merge_acks(items)
+                self._coalesced_frames += len(items) - 1
+            else:
+                frame = items[0][1]
+            try:
+                await ws.send(json_codec.dumps(frame))
+            except asyncio.CancelledError:
+                for _, _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(ConnectionError("WebSocket disconnected"))
+                raise
+            except Exception as e:
+                self._write_errors += 1
+                for _, _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            now = time.monotonic()
+            for enqueued_at, _, fut in items:
+                latency_ms = (now - enqueued_at) * 1000.0
+                self._write_latency_total_ms[lane_idx] += latency_ms
+                if latency_ms > self._write_latency_max_ms[lane_idx]:
+                    self._write_latency_max_ms[lane_idx] = latency_ms
+                if not fut.done():
+                    fut.set_result(None)
+            self._frames_written[lane_idx] += len(items)
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        lanes: dict[str, Any] = {}
+        for idx, name in enumerate(_LANE_NAMES):
+            written = self._frames_written[idx]
+            lanes[name] = {
+                "depth": len(self._lanes[idx]),
+                "maxDepth": self._max_depth[idx],
+                "written": written,
+                "avgWriteMs": round(self._write_latency_total_ms[idx] / written, 3) if written else 0.0,
+                "maxWriteMs": round(self._write_latency_max_ms[idx], 3),
+            }
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "lanes": lanes,
+            "coalescedFrames": self._coalesced_frames,
+            "writeErrors": self._write_errors,
+        }
@@ -0,0 +1,137 @@
+"""适配器配置快照。
+
+热路径（每条事件/命令）需要的配置项在这里一次性解析、校验并冻结为普通属性；
+配置变化时整体构建新快照并替换宿主上的引用（单次赋值即原子切换），
+读取方拿到的始终是一份自洽的配置。
+
+仅在组件构造时读取一次的配置（如 ingress 队列容量、worker 数、在途窗口大小）不在此列。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from astrbot import logger
+
+# 快照覆盖的配置键；用于检测配置是否变化。
+SNAPSHOT_KEYS: tuple[str, ...] = (
+    "astrtown_command_ack_timeout_sec",
+    "astrtown_command_ack_timeout_adaptive",
+    "astrtown_command_ack_timeout_min_sec",
+    "astrtown_command_ack_timeout_max_sec",
+    "astrtown_late_ack_tombstone_ttl_sec",
+    "astrtown_command_async_ack",
+    "astrtown_command_backpressure",
+    "astrtown_command_batch_window_ms",
+    "astrtown_command_batch_max",
+    "astrtown_command_journal_enabled",
+    "astrtown_command_journal_ttl_sec",
+    "astrtown_say_debounce_window_ms",
+    "astrtown_say_duplicate_window_ms",
+    "astrtown_event_ack_flush_ms",
+    "astrtown_event_ack_batch_max",
+    "astrtown_event_expiry_grace_ms",
+    "astrtown_started_dedupe_window_ms",
+    "astrtown_max_context_rounds",
+    "astrtown_invite_decision_mode",
+    "astrtown_refill_wake_enabled",
+    "astrtown_refill_min_wake_interval_sec",
+    "astrtown_state_coalesce_window_ms",
+    "astrtown_ingress_starvation_ms",
+    "astrtown_flow_credit_window",
+)
+
+
+def _int(config: Mapping[str, Any], key: str, default: int, *, empty_as_default: bool = False) -> int:
+    value = config.get(key, default)
+    if empty_as_default and not value:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        logger.warning(f"[AstrTown] invalid {key} for platform_config: {value!r}, using {default}")
+        return default
+
+
+def _float(config: Mapping[str, Any], key: str, default: float) -> float:
+    value = config.get(key, default) or default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        logger.warning(f"[AstrTown] invalid {key} for platform_config: {value!r}, using {default}")
+        return default
+
+
+def _str(config: Mapping[str, Any], key: str, default: str) -> str:
+    return str(config.get(key, default) or default).strip()
+
+
+def config_fingerprint(config: Mapping[str, Any]) -> tuple[Any, ...]:
+    return tuple(config.get(key) for key in SNAPSHOT_KEYS)
+
+
+@dataclass(frozen=True)
+class AdapterConfigSnapshot:
+    """已校验的热路径配置（只读）。"""
+
+    # 命令通道
+    command_ack_timeout_sec: float = 10.0
+    command_ack_timeout_adaptive: bool = True
+    command_ack_timeout_min_sec: float = 2.0
+    command_ack_timeout_max_sec: float = 30.0
+    late_ack_tombstone_ttl_sec: float = 120.0
+    command_async_ack: bool = False
+    command_backpressure: str = "wait"
+    command_batch_window_ms: int = 0
+    command_batch_max: int = 8
+    command_journal_enabled: bool = False
+    command_journal_ttl_ms: int = 30_000
+    say_debounce_window_ms: int = 1200
+    say_duplicate_window_ms: int = 3000
+
+    # 入站事件
+    event_ack_flush_ms: int = 5
+    event_ack_batch_max: int = 32
+    event_expiry_grace_ms: int = 0
+    started_dedupe_window_ms: int = 3000
+    max_context_rounds: int = 50
+    invite_decision_mode: str = "auto_accept"
+    refill_wake_enabled: bool = True
+    refill_min_wake_interval_sec: int = 10
+    state_coalesce_window_ms: int = 200
+    ingress_starvation_ms: int = 1000
+    flow_credit_window: int = 32
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> AdapterConfigSnapshot:
+        ack_timeout_min_sec = max(0.1, _float(config, "astrtown_command_ack_timeout_min_sec", 2.0))
+        return cls(
+            command_ack_timeout_sec=max(0.1, _float(config, "astrtown_command_ack_timeout_sec", 10.0)),
+            command_ack_timeout_adaptive=bool(config.get("astrtown_command_ack_timeout_adaptive", True)),
+            command_ack_timeout_min_sec=ack_timeout_min_sec,
+            command_ack_timeout_max_sec=max(
+                ack_timeout_min_sec, _float(config, "astrtown_command_ack_timeout_max_sec", 30.0)
+            ),
+            late_ack_tombstone_ttl_sec=max(1.0, _float(config, "astrtown_late_ack_tombstone_ttl_sec", 120.0)),
+            command_async_ack=bool(config.get("astrtown_command_async_ack", False)),
+            command_backpressure=_str(config, "astrtown_command_backpressure", "wait").lower(),
+            command_batch_window_ms=_int(config, "astrtown_command_batch_window_ms", 0),
+            command_batch_max=max(1, _int(config, "astrtown_command_batch_max", 8)),
+            command_journal_enabled=bool(config.get("astrtown_command_journal_enabled", False)),
+            command_journal_ttl_ms=max(1, _int(config, "astrtown_command_journal_ttl_sec", 30)) * 1000,
+            say_debounce_window_ms=_int(config, "astrtown_say_debounce_window_ms", 1200, empty_as_default=True),
+            say_duplicate_window_ms=_int(config, "astrtown_say_duplicate_window_ms", 3000, empty_as_default=True),
+            event_ack_flush_ms=_int(config, "astrtown_event_ack_flush_ms", 5),
+            event_ack_batch_max=max(1, _int(config, "astrtown_event_ack_batch_max", 32)),
+            event_expiry_grace_ms=max(0, _int(config, "astrtown_event_expiry_grace_ms", 0)),
+            started_dedupe_window_ms=_int(config, "astrtown_started_dedupe_window_ms", 3000),
+            max_context_rounds=_int(config, "astrtown_max_context_rounds", 50, empty_as_default=True),
+            invite_decision_mode=_str(config, "astrtown_invite_decision_mode", "auto_accept"),
+            refill_wake_enabled=bool(config.get("astrtown_refill_wake_enabled", True)),
+            refill_min_wake_interval_sec=_int(config, "astrtown_refill_min_wake_interval_sec", 10),
+            state_coalesce_window_ms=_int(config, "astrtown_state_coalesce_window_ms", 200),
+            ingress_starvation_ms=_int(config, "astrtown_ingress_starvation_ms", 1000),
+            flow_credit_window=max(0, _int(config, "astrtown_flow_credit_window", 32)),
+        )
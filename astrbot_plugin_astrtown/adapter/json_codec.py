@@ -0,0 +1,58 @@
+"""WS 热路径 JSON 编解码。
+
+优先使用 orjson，其次 msgspec，二者均不可用时回退标准库 json。
+编码结果统一为 str（保持 ws 文本帧语义，等价于 json.dumps(..., ensure_ascii=False)）。
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except Exception:  # pragma: no cover
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = "orjson"
+    _fast_dumps = orjson.dumps
+    _fast_loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _fast_dumps = msgspec.json.Encoder().encode
+    _fast_loads = msgspec.json.Decoder().decode
+else:
+    BACKEND = "json"
+    _fast_dumps = None
+    _fast_loads = None
+
+
+def dumps(obj: Any) -> str:
+    """编码为 JSON 文本；快速后端不支持的对象（如非 str 键）回退标准库。"""
+    if _fast_dumps is not None:
+        try:
+            return _fast_dumps(obj).decode("utf-8")
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def loads(raw: str | bytes | bytearray | memoryview) -> Any:
+    """解码 JSON 文本或 UTF-8 字节；非法输入抛出 ValueError。"""
+    if isinstance(raw, memoryview):
+        raw = raw.tobytes()
+    if _fast_loads is not None:
+        try:
+            return _fast_loads(raw)
+        except Exception as e:
+            raise ValueError(f"invalid json: {e}") from e
+    if isinstance(raw, (bytes, bytearray)):
+        raw = bytes(raw).decode("utf-8")
+    return json.loads(raw)
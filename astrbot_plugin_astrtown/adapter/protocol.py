@@ -73,6 +73,8 @@ class CommandAckPayload:
     ackSemantics: Literal["queued"] | None = None
     reason: str | None = None
     inputId: str | None = None
+    # 重放的命令此前已被 Gateway 受理，本次未重复执行
+    duplicate: bool | None = None
 
 
 @dataclass(frozen=True)
@@ -83,39 +85,252 @@ class CommandAck:
     payload: CommandAckPayload
 
 
-@dataclass(frozen=True)
+def _str(payload: dict[str, Any], key: str) -> str:
+    value = payload.get(key)
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def _first_str(payload: dict[str, Any], keys: tuple[str, ...]) -> str:
+    for key in keys:
+        text = _str(payload, key)
+        if text:
+            return text
+    return ""
+
+
+def _dict(value: Any) -> dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+_OTHER_PLAYER_ID_KEYS = ("otherPlayerId", "other_player_id", "otherParticipantId", "targetPlayerId", "counterpartId")
+_OTHER_PLAYER_NAME_KEYS = (
+    "otherPlayerName",
+    "other_player_name",
+    "otherParticipantName",
+    "targetPlayerName",
+    "counterpartName",
+)
+
+
+# ---- 世界事件 payload 结构体 ----
+# 每个已知事件类型对应一个 slots 数据类，from_payload 单次遍历完成校验与规范化（不抛异常）。
+
+
+@dataclass(frozen=True, slots=True)
 class ActionFinishedPayload:
     actionType: str
-    success: bool
-    result: Any
+    success: bool | None
+    result: dict[str, Any]
 
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ActionFinishedPayload:
+        success = payload.get("success")
+        return cls(
+            actionType=_str(payload, "actionType"),
+            success=success if isinstance(success, bool) else None,
+            result=_dict(payload.get("result")),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ConversationMessagePayload:
     conversationId: str
-    message: dict[str, Any]
+    speakerId: str
+    content: str
 
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ConversationMessagePayload:
+        message = _dict(payload.get("message"))
+        content = message.get("content")
+        return cls(
+            conversationId=_str(payload, "conversationId"),
+            speakerId=_str(message, "speakerId"),
+            content="" if content is None else str(content),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ConversationStartedPayload:
     conversationId: str
-    otherParticipantIds: list[str]
+    otherParticipantIds: tuple[str, ...]
+    otherPlayerId: str
 
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ConversationStartedPayload:
+        other_ids = payload.get("otherParticipantIds")
+        ids: tuple[str, ...] = ()
+        if isinstance(other_ids, list):
+            ids = tuple(text for text in (str(item or "").strip() for item in other_ids) if text)
+        return cls(
+            conversationId=_str(payload, "conversationId"),
+            otherParticipantIds=ids,
+            otherPlayerId=_first_str(payload, _OTHER_PLAYER_ID_KEYS),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
+class ConversationInvitedPayload:
+    conversationId: str
+    inviterId: str
+    inviterName: str
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ConversationInvitedPayload:
+        return cls(
+            conversationId=_str(payload, "conversationId"),
+            inviterId=_str(payload, "inviterId"),
+            inviterName=_str(payload, "inviterName"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class ConversationEndedPayload:
+    conversationId: str
+    otherPlayerId: str
+    otherPlayerName: str
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ConversationEndedPayload:
+        return cls(
+            conversationId=_str(payload, "conversationId"),
+            otherPlayerId=_first_str(payload, _OTHER_PLAYER_ID_KEYS),
+            otherPlayerName=_first_str(payload, _OTHER_PLAYER_NAME_KEYS),
+        )
+
+
+@dataclass(frozen=True, slots=True)
 class ConversationTimeoutPayload:
     conversationId: str
-    reason: Literal["invite_timeout", "idle_timeout"]
+    # invite_timeout / idle_timeout；未知值原样保留
+    reason: str
 
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> ConversationTimeoutPayload:
+        return cls(conversationId=_str(payload, "conversationId"), reason=_str(payload, "reason"))
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class AgentStateChangedPayload:
-    state: str
-    position: Any
-    nearbyPlayers: Any
+    state: Any
+    position: dict[str, Any]
+    nearbyPlayers: list[Any]
+    inConversation: Any
+    currentActivity: Any
 
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> AgentStateChangedPayload:
+        nearby = payload.get("nearbyPlayers")
+        return cls(
+            state=payload.get("state"),
+            position=_dict(payload.get("position")),
+            nearbyPlayers=nearby if isinstance(nearby, list) else [],
+            inConversation=payload.get("inConversation"),
+            currentActivity=payload.get("currentActivity"),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
+class AgentQueueRefillRequestedPayload:
+    requestId: str
+    # empty / low_watermark，统一小写
+    reason: str
+    remaining: Any
+    lastDequeuedAt: int | float | None
+    position: dict[str, Any]
+    nearbyPlayers: list[Any] | None
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> AgentQueueRefillRequestedPayload:
+        last_dequeued = payload.get("lastDequeuedAt")
+        nearby = payload.get("nearbyPlayers")
+        return cls(
+            requestId=_str(payload, "requestId"),
+            reason=_str(payload, "reason").lower(),
+            remaining=payload.get("remaining"),
+            lastDequeuedAt=(
+                last_dequeued
+                if isinstance(last_dequeued, (int, float)) and not isinstance(last_dequeued, bool)
+                else None
+            ),
+            position=_dict(payload.get("position")),
+            nearbyPlayers=nearby if isinstance(nearby, list) else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SocialRelationshipProposedPayload:
+    proposerId: str
+    proposerName: str
+    status: str
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> SocialRelationshipProposedPayload:
+        return cls(
+            proposerId=_str(payload, "proposerId"),
+            proposerName=_str(payload, "proposerName"),
+            status=_str(payload, "status"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class SocialRelationshipRespondedPayload:
+    responderId: str
+    status: str
+    accept: bool
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> SocialRelationshipRespondedPayload:
+        accept = payload.get("accept")
+        return cls(
+            responderId=_str(payload, "responderId"),
+            status=_str(payload, "status"),
+            accept=accept if isinstance(accept, bool) else False,
+        )
+
+
+# 适配器本地合成事件：异步模式下命令被 Gateway 拒绝（不来自 Gateway，不发送 event.ack）。
+COMMAND_REJECTED_EVENT_TYPE = "command.rejected"
+
+
+@dataclass(frozen=True, slots=True)
+class CommandRejectedPayload:
+    commandId: str
+    commandType: str
+    reason: str
+    conversationId: str
+    # 拒绝来源：ack（正常 ACK）/ late_ack（超时后到达的 ACK）
+    source: str
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> CommandRejectedPayload:
+        return cls(
+            commandId=_str(payload, "commandId"),
+            commandType=_str(payload, "commandType"),
+            reason=_str(payload, "reason"),
+            conversationId=_str(payload, "conversationId"),
+            source=_str(payload, "source"),
+        )
+
+
+# 事件类型 -> payload 结构体；未登记的类型 body 为 None，仅保留原始 payload。
+WORLD_EVENT_PAYLOAD_TYPES: dict[str, Any] = {
+    "action.finished": ActionFinishedPayload,
+    COMMAND_REJECTED_EVENT_TYPE: CommandRejectedPayload,
+    "agent.queue_refill_requested": AgentQueueRefillRequestedPayload,
+    "agent.state_changed": AgentStateChangedPayload,
+    "conversation.ended": ConversationEndedPayload,
+    "conversation.invited": ConversationInvitedPayload,
+    "conversation.message": ConversationMessagePayload,
+    "conversation.started": ConversationStartedPayload,
+    "conversation.timeout": ConversationTimeoutPayload,
+    "social.relationship_proposed": SocialRelationshipProposedPayload,
+    "social.relationship_responded": SocialRelationshipRespondedPayload,
+}
+
+
+@dataclass(frozen=True, slots=True)
 class WorldEvent:
     type: str
     id: str
@@ -124,3 +339,12 @@ class WorldEvent:
     expiresAt: int
     payload: dict[str, Any]
     metadata: dict[str, Any] | None = None
+    # 已知事件类型的强类型 payload；未知类型为 None（回退使用 payload 原始字典）。
+    body: Any = None
+
+
+def decode_world_event_body(event_type: str, payload: dict[str, Any]) -> Any:
+    payload_type = WORLD_EVENT_PAYLOAD_TYPES.get(event_type)
+    if payload_type is None:
+        return None
+    return payload_type.from_payload(payload)
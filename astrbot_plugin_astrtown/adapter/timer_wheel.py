@@ -0,0 +1,134 @@
+"""哈希时间轮驱动的到期字典。
+
+替代“每次写入/查询都全量扫描 dict 清理过期项”的做法：
+- 写入：O(1)，按到期 tick 放入对应槽位；
+- 过期：随时间推进逐槽处理，每个条目只在其到期所在轮次被检查，均摊 O(1)；
+- 覆盖写入的旧槽位记录在处理时按到期时间比对后丢弃，不影响正确性；
+- 可选容量上限，超出时淘汰最早写入的条目，保证内存有界。
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class ExpiringDict(Generic[K, V]):
+    """条目各自带 TTL 的字典；get/contains 只返回未过期条目。"""
+
+    def __init__(
+        self,
+        tick_sec: float = 1.0,
+        wheel_size: int = 512,
+        max_size: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._tick_sec = max(0.001, float(tick_sec))
+        self._wheel_size = max(1, int(wheel_size))
+        self._max_size = max_size if max_size is None else max(1, int(max_size))
+        self._clock = clock
+        # key -> (到期时间, 值)；dict 保持写入顺序，用于容量淘汰。
+        self._data: dict[K, tuple[float, V]] = {}
+        # 槽位 -> [(key, 到期时间)]
+        self._wheel: list[list[tuple[K, float]]] = [[] for _ in range(self._wheel_size)]
+        self._cursor = self._tick_of(clock())
+
+        self.expired = 0
+        self.evictions = 0
+
+    def _tick_of(self, ts: float) -> int:
+        return int(ts // self._tick_sec)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None  # type: ignore[arg-type]
+
+    def set(self, key: K, value: V, ttl_sec: float) -> None:
+        now = self._clock()
+        self.advance(now)
+        deadline = now + max(0.0, float(ttl_sec))
+        data = self._data
+        if key in data:
+            # 重新写入视为最新条目（容量淘汰按写入顺序）。
+            del data[key]
+        data[key] = (deadline, value)
+        # 放在到期 tick 的下一个槽位：处理该槽时其中条目必然已到期（同轮内）。
+        tick = self._tick_of(deadline) + 1
+        self._wheel[tick % self._wheel_size].append((key, deadline))
+        if self._max_size is not None:
+            while len(data) > self._max_size:
+                data.pop(next(iter(data)))
+                self.evictions += 1
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        deadline, value = item
+        if deadline <= self._clock():
+            del self._data[key]
+            self.expired += 1
+            return default
+        return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        return item[1]
+
+    def items(self) -> Iterator[tuple[K, V]]:
+        now = self._clock()
+        for key, (deadline, value) in list(self._data.items()):
+            if deadline > now:
+                yield key, value
+
+    def clear(self) -> None:
+        self._data.clear()
+        for bucket in self._wheel:
+            bucket.clear()
+
+    def advance(self, now: float | None = None) -> int:
+        """推进时间轮到 now，清理到期条目；返回本次清理数量。"""
+        if now is None:
+            now = self._clock()
+        target = self._tick_of(now)
+        if target <= self._cursor:
+            return 0
+        # 长时间未推进时最多处理一整圈即可覆盖全部槽位。
+        start = max(self._cursor + 1, target - self._wheel_size + 1)
+        self._cursor = target
+        data = self._data
+        removed = 0
+        for tick in range(start, target + 1):
+            slot = tick % self._wheel_size
+            bucket = self._wheel[slot]
+            if not bucket:
+                continue
+            keep: list[tuple[K, float]] = []
+            for key, deadline in bucket:
+                if deadline > now:
+                    # 尚未到期（属于更远的轮次）。
+                    keep.append((key, deadline))
+                    continue
+                item = data.get(key)
+                if item is not None and item[0] == deadline:
+                    del data[key]
+                    removed += 1
+            self._wheel[slot] = keep
+        self.expired += removed
+        return removed
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "wheelEntries": sum(len(b) for b in self._wheel),
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,101 @@
+"""有界 LRU + TTL 缓存。
+
+基于 OrderedDict：插入/命中/淘汰均为 O(1)；过期项在访问时从队首惰性清理（均摊 O(1)），
+无需全量扫描。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class TtlLruCache(Generic[K, V]):
+    """容量上限 + 固定 TTL 的 LRU 缓存；ttl_sec <= 0 表示不过期。"""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_sec: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max(1, int(max_size))
+        self._ttl_sec = float(ttl_sec)
+        self._clock = clock
+        # key -> (过期时间, 值)；顺序即 LRU 顺序（队首最久未使用）。
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _deadline(self, now: float) -> float:
+        return now + self._ttl_sec if self._ttl_sec > 0 else float("inf")
+
+    def _prune_head(self, now: float) -> None:
+        data = self._data
+        while data:
+            expires_at, _ = next(iter(data.values()))
+            if expires_at > now:
+                return
+            data.popitem(last=False)
+            self.expirations += 1
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        now = self._clock()
+        self._prune_head(now)
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= now:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        now = self._clock()
+        self._prune_head(now)
+        data = self._data
+        if key in data:
+            data.move_to_end(key)
+        data[key] = (self._deadline(now), value)
+        while len(data) > self._max_size:
+            data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        return item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def snapshot_stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxSize": self._max_size,
+            "ttlSec": self._ttl_sec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,8 @@
+"""AstrTown 适配器性能基准。
+
+在仓库根目录以模块方式运行（需要已安装 AstrBot 运行环境），例如：
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_ingress
+
+结果打印到标准输出，并追加到仓库根目录的 bench_output.txt。
+"""
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+from ..adapter import json_codec
+from ..adapter.astrtown_adapter import AstrTownAdapter
+
+# 仓库根目录的 bench_output.txt（已在 .gitignore 中忽略）。
+BENCH_OUTPUT = Path(__file__).resolve().parents[2] / "bench_output.txt"
+# 按 Gateway 协议整理的典型 WS 帧，与测试共用。
+WS_FRAMES_FIXTURE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "ws_frames.jsonl"
+
+
+class FrameSink:
+    """代替 WebSocket 连接：记录适配器写出的帧，不做网络 I/O。"""
+
+    def __init__(self) -> None:
+        self.frames: list[dict[str, Any]] = []
+
+    async def send(self, raw: str) -> None:
+        self.frames.append(json_codec.loads(raw))
+
+    async def close(self) -> None:
+        return None
+
+
+def make_adapter(config: dict[str, Any] | None = None) -> AstrTownAdapter:
+    """构造一个已“鉴权”的适配器实例（不建立真实连接）。"""
+    adapter = AstrTownAdapter({"astrtown_token": "bench", **(config or {})}, {}, asyncio.Queue())
+    adapter._ws = FrameSink()
+    adapter._agent_id = "agent:bench"
+    adapter._player_id = "player:bench"
+    adapter._world_id = "world:bench"
+    adapter._negotiated_version = 1
+    return adapter
+
+
+def load_ws_frames() -> list[dict[str, Any]]:
+    lines = WS_FRAMES_FIXTURE.read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def world_event(event_type: str, event_id: str, **payload: Any) -> dict[str, Any]:
+    now_ms = int(time.time() * 1000)
+    return {
+        "type": event_type,
+        "id": event_id,
+        "version": 1,
+        "timestamp": now_ms,
+        "expiresAt": now_ms + 60_000,
+        "payload": payload,
+    }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def median(samples: list[float]) -> float:
+    return statistics.median(samples) if samples else 0.0
+
+
+def report(title: str, lines: list[str]) -> None:
+    """打印结果并追加到 bench_output.txt。"""
+    block = [f"== {title} ({time.strftime('%Y-%m-%d %H:%M:%S')})", *lines, ""]
+    text = "\n".join(block)
+    print(text)
+    with BENCH_OUTPUT.open("a", encoding="utf-8") as f:
+        f.write(text + "\n")
@@ -0,0 +1,87 @@
+"""Gateway HTTP 调用延迟：每次调用新建 aiohttp 会话（改造前）与共享连接池会话的 p50/p99 对比。
+
+在本机启动一个 aiohttp 替身服务实现 /api/bot/memory/search，顺序发起 --calls 次世界记忆检索。
+共享会话一路直接走 GatewayHttpClient.search_world_memory；同时输出连接新建/复用计数，核对连接确实被复用。
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_http_session [--calls 500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+import aiohttp
+from aiohttp import web
+
+from ._common import make_adapter, percentile, report
+
+
+async def _memory_search(request: web.Request) -> web.Response:
+    body = await request.json()
+    memories = [{"description": f"记忆 {i}: {body.get('queryText', '')}", "importance": 5} for i in range(3)]
+    return web.json_response({"memories": memories})
+
+
+async def _per_call_session(url: str, token: str) -> list[dict[str, Any]]:
+    """改造前的调用方式：每次请求新建并关闭会话。"""
+    timeout = aiohttp.ClientTimeout(total=3.0)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with session.post(url, json={"queryText": "小镇", "limit": 3}, headers=headers) as resp:
+            data = await resp.json()
+            return data.get("memories") or []
+
+
+async def _main(calls: int) -> None:
+    app = web.Application()
+    app.router.add_post("/api/bot/memory/search", _memory_search)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    base = f"http://127.0.0.1:{port}"
+
+    adapter = make_adapter({"astrtown_gateway_url": base})
+    client = adapter._http_client
+    try:
+        per_call: list[float] = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            memories = await _per_call_session(base + "/api/bot/memory/search", adapter.token)
+            per_call.append((time.perf_counter() - started) * 1000.0)
+            assert len(memories) == 3
+
+        pooled: list[float] = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            memories = await client.search_world_memory("小镇", 3)
+            pooled.append((time.perf_counter() - started) * 1000.0)
+            assert len(memories) == 3
+        stats = client.snapshot_stats()
+    finally:
+        await adapter.terminate()
+        await runner.cleanup()
+
+    lines = [
+        f"calls={calls} sequential, local aiohttp stand-in on 127.0.0.1",
+        f"per-call session  p50={percentile(per_call, 50):.3f}ms  p99={percentile(per_call, 99):.3f}ms",
+        f"pooled session    p50={percentile(pooled, 50):.3f}ms  p99={percentile(pooled, 99):.3f}ms",
+        f"pooled: sessionsCreated={stats['sessionsCreated']}, connectionsCreated={stats['connectionsCreated']}, "
+        f"connectionReuses={stats['connectionReuses']}",
+    ]
+    report("gateway http session latency", lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(_main(args.calls))
+
+
+if __name__ == "__main__":
+    main()
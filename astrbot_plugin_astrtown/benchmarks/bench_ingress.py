@@ -0,0 +1,73 @@
+"""入站分发吞吐基准：按会话分片的 lane 在 1/4/16 个并发会话下的 events/s。
+
+每条事件由一个模拟 I/O 的处理器处理（asyncio.sleep，默认 10ms，近似一次 Gateway HTTP 往返）；
+同一会话的事件必须按到达顺序完成，基准同时校验这一点。workers=1 即改造前的串行分发。
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_ingress [--events 400] [--handler-ms 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from ..adapter.components.world_event_registry import WorldEventTraits
+from ._common import make_adapter, report, world_event
+
+_EVENT_TYPE = "conversation.bench"
+
+
+async def _run_once(sessions: int, workers: int, events: int, handler_ms: float) -> tuple[float, bool]:
+    adapter = make_adapter({"astrtown_ingress_workers": workers, "astrtown_ingress_queue_size": events})
+    done = asyncio.Event()
+    seen: dict[str, list[int]] = {}
+    handled = 0
+
+    async def handler(evt: Any, data: dict[str, Any]) -> None:
+        nonlocal handled
+        await asyncio.sleep(handler_ms / 1000.0)
+        payload = data["payload"]
+        seen.setdefault(payload["conversationId"], []).append(payload["seq"])
+        handled += 1
+        if handled >= events:
+            done.set()
+        return None
+
+    adapter._event_dispatcher.register_handler(_EVENT_TYPE, handler, WorldEventTraits(wakes_llm=False))
+    started = time.perf_counter()
+    for seq in range(events):
+        conversation_id = f"bench-{seq % sessions}"
+        await adapter._ingress.submit(world_event(_EVENT_TYPE, f"evt-{seq}", conversationId=conversation_id, seq=seq))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await adapter.terminate()
+
+    ordered = all(values == sorted(values) for values in seen.values())
+    return events / elapsed, ordered
+
+
+async def _main(events: int, handler_ms: float) -> None:
+    lines = [f"events={events}, handler={handler_ms}ms", "sessions  workers=1(serial)  workers=4  workers=16  ordered"]
+    for sessions in (1, 4, 16):
+        row: list[str] = []
+        all_ordered = True
+        for workers in (1, 4, 16):
+            rate, ordered = await _run_once(sessions, workers, events, handler_ms)
+            all_ordered = all_ordered and ordered
+            row.append(f"{rate:10.1f}/s")
+        lines.append(f"{sessions:8d}  {row[0]:>16}  {row[1]:>9}  {row[2]:>10}  {all_ordered}")
+    report("ingress lanes events/s", lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--handler-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(_main(args.events, args.handler_ms))
+
+
+if __name__ == "__main__":
+    main()
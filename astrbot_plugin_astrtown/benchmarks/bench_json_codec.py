@@ -0,0 +1,56 @@
+"""WS 帧 JSON 编解码基准：标准库 json 与 json_codec 快速后端（orjson/msgspec）的单帧耗时对比。
+
+样本为 tests/fixtures/ws_frames.jsonl 中按 Gateway 协议整理的典型帧（含中文与 emoji 文本）。
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_json_codec [--rounds 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from ..adapter import json_codec
+from ._common import load_ws_frames, report
+
+
+def _ns_per_op(fn: Callable[[Any], Any], samples: list[Any], rounds: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(rounds):
+        for sample in samples:
+            fn(sample)
+    return (time.perf_counter_ns() - started) / (rounds * len(samples))
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    frames = load_ws_frames()
+    texts = [_stdlib_dumps(frame) for frame in frames]
+    avg_bytes = sum(len(t.encode("utf-8")) for t in texts) / len(texts)
+
+    std_enc = _ns_per_op(_stdlib_dumps, frames, args.rounds)
+    std_dec = _ns_per_op(json.loads, texts, args.rounds)
+    fast_enc = _ns_per_op(json_codec.dumps, frames, args.rounds)
+    fast_dec = _ns_per_op(json_codec.loads, texts, args.rounds)
+
+    lines = [
+        f"frames={len(frames)} (avg {avg_bytes:.0f} B), rounds={args.rounds}, backend={json_codec.BACKEND}",
+        "codec              encode ns/frame  decode ns/frame",
+        f"json (stdlib)      {std_enc:15.0f}  {std_dec:15.0f}",
+        f"json_codec         {fast_enc:15.0f}  {fast_dec:15.0f}",
+        f"speedup            {std_enc / fast_enc:14.2f}x  {std_dec / fast_dec:14.2f}x",
+    ]
+    report("ws frame json codec", lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""ExpiringDict（哈希时间轮）与改造前“每次写入全量扫描 dict 清理过期项”的单次操作耗时对比。
+
+使用模拟时钟：TTL 固定，写入速率按存活条目数 live 推算（live / TTL 条/秒），先预热到稳态再计时。
+每次操作为一次 set + 一次 get。时间轮在每个 live 规模下计时 --entries 次操作；
+旧做法单次操作为 O(live)，计时次数按预算缩减（稳态下单次耗时与次数无关）。
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_timer_wheel [--entries 100000] [--ttl-sec 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from ..adapter.timer_wheel import ExpiringDict
+from ._common import report
+
+# 旧做法计时的“操作次数 x 存活条目数”上限，控制单次运行时长。
+_BASELINE_SCAN_BUDGET = 20_000_000
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _ScanPruneDict:
+    """改造前的做法：dict 记录到期时间，每次写入后全量扫描清理（tombstone/防抖/去重状态同此模式）。"""
+
+    def __init__(self, clock: _Clock) -> None:
+        self._clock = clock
+        self._data: dict[str, tuple[float, Any]] = {}
+
+    def set(self, key: str, value: Any, ttl_sec: float) -> None:
+        now = self._clock()
+        self._data[key] = (now + ttl_sec, value)
+        for k, (expire_at, _) in list(self._data.items()):
+            if expire_at < now:
+                self._data.pop(k, None)
+
+    def prefill(self, key: str, value: Any, ttl_sec: float) -> None:
+        # 预热专用：直接写入，不做清理扫描（稳态下扫描不会删掉这些未过期条目）。
+        self._data[key] = (self._clock() + ttl_sec, value)
+
+    def get(self, key: str) -> Any:
+        item = self._data.get(key)
+        if item is None or item[0] < self._clock():
+            return None
+        return item[1]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _run(store: Any, clock: _Clock, live: int, ops: int, ttl_sec: float) -> tuple[float, int]:
+    step = ttl_sec / live
+    # 预热：写满一个 TTL 周期，达到存活条目数稳态。
+    warm = getattr(store, "prefill", store.set)
+    for i in range(live):
+        clock.now += step
+        warm(f"warm-{i}", i, ttl_sec)
+    started = time.perf_counter_ns()
+    for i in range(ops):
+        clock.now += step
+        key = f"k-{i}"
+        store.set(key, i, ttl_sec)
+        store.get(key)
+    elapsed_ns = time.perf_counter_ns() - started
+    return elapsed_ns / ops / 1000.0, len(store)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--ttl-sec", type=float, default=10.0)
+    args = parser.parse_args()
+
+    lines = [
+        f"ops={args.entries} (timer wheel), ttl={args.ttl_sec}s, set+get per op",
+        "live entries   wheel us/op  wheel size   scan us/op  scan ops  scan size  speedup",
+    ]
+    for live in (1_000, 10_000, args.entries):
+        clock = _Clock()
+        wheel_us, wheel_size = _run(ExpiringDict(clock=clock), clock, live, args.entries, args.ttl_sec)
+        clock = _Clock()
+        scan_ops = max(100, min(args.entries, _BASELINE_SCAN_BUDGET // live))
+        scan_us, scan_size = _run(_ScanPruneDict(clock), clock, live, scan_ops, args.ttl_sec)
+        lines.append(
+            f"{live:12d}  {wheel_us:11.2f}  {wheel_size:10d}  {scan_us:11.2f}  {scan_ops:8d}  {scan_size:9d}"
+            f"  {scan_us / wheel_us:6.0f}x"
+        )
+    report("expiring state: timer wheel vs scan prune", lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""世界事件解码 + 处理器解析耗时，以及每事件 payload 结构体的内存占用（slots 数据类 vs 字典）。
+
+样本为 tests/fixtures/ws_frames.jsonl 中的世界事件帧。耗时分两列：
+decode 为 decode_world_event_body 单独耗时；parse+resolve 为分发器解析整条事件（含 decode）并查找处理器的耗时。
+内存列为构造 N 个 payload 对象的净分配（tracemalloc）：slots 数据类（现实现）、同字段普通数据类、同字段字典。
+
+    python -m astrbot_plugin_astrtown.benchmarks.bench_world_event_decode [--rounds 20000] [--objects 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from ..adapter.protocol import WORLD_EVENT_PAYLOAD_TYPES, decode_world_event_body
+from ._common import load_ws_frames, make_adapter, report
+
+
+def _ns_per_op(fn: Callable[[], Any], rounds: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter_ns() - started) / rounds
+
+
+def _bytes_per_object(build: Callable[[], Any], objects: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build() for _ in range(objects)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # 扣除 kept 列表本身的指针数组。
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename")) - objects * 8
+    del kept
+    return total / objects
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--objects", type=int, default=10000)
+    args = parser.parse_args()
+
+    adapter = make_adapter()
+    dispatcher = adapter._event_dispatcher
+    frames = [f for f in load_ws_frames() if f.get("type") in WORLD_EVENT_PAYLOAD_TYPES]
+
+    lines = [
+        f"rounds={args.rounds}, objects={args.objects}",
+        "event type                     decode ns  parse+resolve ns  slots B  dataclass B   dict B",
+    ]
+    for frame in frames:
+        event_type = frame["type"]
+        payload = frame["payload"]
+        payload_type = WORLD_EVENT_PAYLOAD_TYPES[event_type]
+        names = [f.name for f in dataclasses.fields(payload_type)]
+        plain_type = dataclasses.make_dataclass(f"Plain{payload_type.__name__}", names, frozen=True)
+
+        def parse_and_resolve(frame: dict[str, Any] = frame) -> Any:
+            evt = dispatcher._parse_world_event(frame)
+            return dispatcher._registry.resolve(evt.type)
+
+        decode_ns = _ns_per_op(lambda: decode_world_event_body(event_type, payload), args.rounds)
+        dispatch_ns = _ns_per_op(parse_and_resolve, args.rounds)
+
+        body = decode_world_event_body(event_type, payload)
+        values = {name: getattr(body, name) for name in names}
+        slots_b = _bytes_per_object(lambda: payload_type(**values), args.objects)
+        plain_b = _bytes_per_object(lambda: plain_type(**values), args.objects)
+        dict_b = _bytes_per_object(lambda: dict(values), args.objects)
+        lines.append(
+            f"{event_type:<30} {decode_ns:9.0f}  {dispatch_ns:16.0f}  {slots_b:7.0f}  {plain_b:11.0f}  {dict_b:7.0f}"
+        )
+    report("world event decode + dispatch", lines)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from pathlib import Path
 from typing import Any
-from urllib.parse import urlencode, urlparse
 
 from astrbot.api.event import AstrMessageEvent, MessageEventResult, filter
 from astrbot.api.star import Context, Star, register
@@ -18,11 +18,6 @@ from .adapter.components.memory_injector import MemoryInjector
 from .adapter.components.player_binding import PlayerBindingManager
 from .adapter.components.user_command_handler import UserCommandHandler
 
-try:
-    import aiohttp
-except Exception:  # pragma: no cover
-    aiohttp = None
-
 
 @register("astrbot-plugin-astrtown", "AstrTown", "AstrTown 平台适配插件，通过 Gateway 让 AstrBot 控制 NPC 并接收事件", "0.1.0", "https://github.com/your-org/astrbot_plugin_astrtown")
 class AstrTownPlugin(Star):
@@ -41,6 +36,12 @@ class AstrTownPlugin(Star):
         )
         is_astrtown = is_astrtown_event or is_astrtown_adapter
 
+        # 入站流控：该唤醒已进入 LLM 处理，不再计入 LLM 积压。
+        if is_astrtown_event and adapter is not None:
+            note_llm_request = getattr(adapter, "_note_llm_request", None)
+            if callable(note_llm_request):
+                note_llm_request(str(event.get_extra("event_id") or ""))
+
         # P0：AstrTown 事件禁止使用 AstrBot Cron 工具，避免行动规划泄露到 future task。
         if is_astrtown:
             func_tool = getattr(request, "func_tool", None)
@@ -84,9 +85,8 @@ class AstrTownPlugin(Star):
         non_system_msgs = [m for m in contexts if _msg_role(m) != "system"]
         kept_non_system = non_system_msgs[-max_messages:]
 
-        injected_memory_context: Context | None = None
-        injected_bound_memory_context: dict[str, str] | None = None
-        injected_social_context: Context | None = None
+        # 上下文补充来源并发执行、共享同一截止时间；超时的来源被放弃，其余结果照常注入。
+        enrichment_sources: dict[str, Any] = {}
 
         if is_astrtown and adapter is not None and kept_non_system:
             # 提取用户最新发言作为 Query
@@ -101,143 +101,19 @@ class AstrTownPlugin(Star):
 
             # 限制查询长度，防止无意义单个字触发无效检索
             if last_user_msg and len(last_user_msg.strip()) > 2:
-                try:
-                    # 熔断保护：2秒查不到就放弃
-                    memories = await asyncio.wait_for(
-                        adapter.search_world_memory(last_user_msg, limit=3),
-                        timeout=2.0,
-                    )
-                    if memories:
-                        mem_str = "\n".join(
-                            [f"- {m['description']} (重要度:{m['importance']})" for m in memories]
-                        )
-                        injection_text = (
-                            "\n\n[💡 潜意识背景信息：以下是你脑海中浮现的近期世界记忆片段]\n"
-                            f"{mem_str}\n"
-                            "(内部心理活动指令：如果上述记忆与当前对话切实相关，请自然地在回复中表现出你记得；"
-                            "如果毫无关联，请完全忽略。绝对不要提及'系统提示'或'我刚想起'！)"
-                        )
-                        injected_memory_context = Context(role="system", content=injection_text)
-                except asyncio.TimeoutError:
-                    logger.warning("AstrTown: 记忆检索超时(>2s)，已降级为无记忆普通回复。")
-                except Exception as e:
-                    logger.error(f"AstrTown: 注入记忆异常: {e}")
+                enrichment_sources["memory"] = self._astrtown_build_memory_context(adapter, last_user_msg)
 
         if (not is_astrtown) and kept_non_system:
-            try:
-                bound_memory_text = await self.memory_injector.build_memory_prompt(event, kept_non_system)
-                if bound_memory_text:
-                    injected_bound_memory_context = {
-                        "role": "system",
-                        "content": bound_memory_text,
-                    }
-            except Exception as e:
-                logger.warning(f"[astrtown] 普通对话记忆注入失败，已跳过: {e}")
+            enrichment_sources["bound_memory"] = self._build_bound_memory_context(event, kept_non_system)
 
-        # 3.4 动态张力 Prompt 注入（失败静默跳过）
+        # 3.4 动态张力 Prompt 注入
         if is_astrtown and adapter is not None:
-            try:
-                active_conversation_id = str(getattr(adapter, "_active_conversation_id", "") or "").strip()
-                owner_id = str(getattr(adapter, "_player_id", "") or "").strip()
-                world_id = str(getattr(adapter, "_world_id", "") or "").strip()
-
-                world_event = getattr(event, "world_event", None)
-                payload = world_event.get("payload") if isinstance(world_event, dict) else None
-                if isinstance(payload, dict) and not world_id:
-                    world_id = str(payload.get("worldId") or "").strip()
-
-                target_id = str(getattr(adapter, "_conversation_partner_id", "") or "").strip()
-
-                if not target_id and isinstance(payload, dict):
-                    message = payload.get("message")
-                    if isinstance(message, dict):
-                        speaker_id = str(message.get("speakerId") or "").strip()
-                        if speaker_id and speaker_id != owner_id:
-                            target_id = speaker_id
-
-                    if not target_id:
-                        other_ids = payload.get("otherParticipantIds")
-                        if isinstance(other_ids, list):
-                            for item in other_ids:
-                                participant_id = str(item or "").strip()
-                                if participant_id and participant_id != owner_id:
-                                    target_id = participant_id
-                                    break
-
-                if active_conversation_id and owner_id and target_id and aiohttp is not None:
-                    aiohttp_client = aiohttp
-                    base_url = ""
-                    build_http_base_url = getattr(adapter, "_build_http_base_url", None)
-                    if callable(build_http_base_url):
-                        try:
-                            base_url = str(build_http_base_url() or "").strip().rstrip("/")
-                        except Exception:
-                            base_url = ""
-
-                    if not base_url:
-                        raw_gateway = str(getattr(adapter, "gateway_url", "") or "").strip().rstrip("/")
-                        if raw_gateway:
-                            try:
-                                parsed = urlparse(raw_gateway)
-                                if parsed.scheme == "ws":
-                                    parsed = parsed._replace(scheme="http")
-                                elif parsed.scheme == "wss":
-                                    parsed = parsed._replace(scheme="https")
-                                base_url = parsed.geturl().rstrip("/")
-                            except Exception:
-                                base_url = raw_gateway
-
-                    token = str(getattr(adapter, "token", "") or "").strip()
-                    if base_url and token:
-                        query = urlencode(
-                            {
-                                "worldId": world_id,
-                                "ownerId": owner_id,
-                                "targetId": target_id,
-                            }
-                        )
-                        url = f"{base_url}/api/bot/social/state?{query}"
-                        headers = {"Authorization": f"Bearer {token}"}
-
-                        async def _fetch_social_state() -> dict[str, Any] | None:
-                            timeout = aiohttp_client.ClientTimeout(total=2.0)
-                            async with aiohttp_client.ClientSession(timeout=timeout) as session:
-                                async with session.get(url, headers=headers) as resp:
-                                    if resp.status < 200 or resp.status >= 300:
-                                        return None
-                                    data = await resp.json()
-                                    return data if isinstance(data, dict) else None
-
-                        social_data = await asyncio.wait_for(_fetch_social_state(), timeout=2.0)
-                        if social_data:
-                            relationship = social_data.get("relationship")
-                            affinity = social_data.get("affinity")
-
-                            relationship_status = "stranger"
-                            if isinstance(relationship, dict):
-                                relationship_status = str(relationship.get("status") or "stranger").strip() or "stranger"
-
-                            affinity_score = 0
-                            affinity_label = "感觉一般"
-                            if isinstance(affinity, dict):
-                                try:
-                                    affinity_score = int(float(affinity.get("score", 0)))
-                                except (TypeError, ValueError):
-                                    affinity_score = 0
-                                affinity_label = str(affinity.get("label") or "感觉一般").strip() or "感觉一般"
-
-                            tension_text = (
-                                "【社交认知设定】你们对外界公开的客观关系是："
-                                f"[{relationship_status}]。"
-                                f"但在你的潜意识里，你对 TA 的好感度为 {affinity_score}/100，"
-                                f"你私下觉得 TA [{affinity_label}]。"
-                                "请严格遵循这一表里不一/表里如一的设定进行交互，可逢场作戏，"
-                                "但绝对不要像机器人一样读出这些数值。若好感度达标，"
-                                "可主动调用 propose_relationship 工具推进关系。"
-                            )
-                            injected_social_context = Context(role="system", content=tension_text)
-            except Exception:
-                pass
+            enrichment_sources["social"] = self._astrtown_build_social_context(adapter, event)
+
+        enrichment = await self._run_context_enrichment(adapter, enrichment_sources)
+        injected_memory_context: Context | None = enrichment.get("memory")
+        injected_bound_memory_context: dict[str, str] | None = enrichment.get("bound_memory")
+        injected_social_context: Context | None = enrichment.get("social")
 
         # 安全拼接
         new_contexts: list[Any] = []
@@ -275,6 +151,151 @@ class AstrTownPlugin(Star):
 
         request.contexts = repaired_contexts
 
+    async def _astrtown_build_memory_context(self, adapter: Any, query_text: str) -> Context | None:
+        memories = await adapter.search_world_memory(query_text, limit=3)
+        if not memories:
+            return None
+        mem_str = "\n".join([f"- {m['description']} (重要度:{m['importance']})" for m in memories])
+        injection_text = (
+            "\n\n[💡 潜意识背景信息：以下是你脑海中浮现的近期世界记忆片段]\n"
+            f"{mem_str}\n"
+            "(内部心理活动指令：如果上述记忆与当前对话切实相关，请自然地在回复中表现出你记得；"
+            "如果毫无关联，请完全忽略。绝对不要提及'系统提示'或'我刚想起'！)"
+        )
+        return Context(role="system", content=injection_text)
+
+    async def _build_bound_memory_context(self, event: AstrMessageEvent, messages: list[Any]) -> dict[str, str] | None:
+        bound_memory_text = await self.memory_injector.build_memory_prompt(event, messages)
+        if not bound_memory_text:
+            return None
+        return {
+            "role": "system",
+            "content": bound_memory_text,
+        }
+
+    async def _astrtown_build_social_context(self, adapter: Any, event: AstrMessageEvent) -> Context | None:
+        active_conversation_id = str(getattr(adapter, "_active_conversation_id", "") or "").strip()
+        owner_id = str(getattr(adapter, "_player_id", "") or "").strip()
+        world_id = str(getattr(adapter, "_world_id", "") or "").strip()
+
+        world_event = getattr(event, "world_event", None)
+        payload = world_event.get("payload") if isinstance(world_event, dict) else None
+        if isinstance(payload, dict) and not world_id:
+            world_id = str(payload.get("worldId") or "").strip()
+
+        target_id = str(getattr(adapter, "_conversation_partner_id", "") or "").strip()
+
+        if not target_id and isinstance(payload, dict):
+            message = payload.get("message")
+            if isinstance(message, dict):
+                speaker_id = str(message.get("speakerId") or "").strip()
+                if speaker_id and speaker_id != owner_id:
+                    target_id = speaker_id
+
+            if not target_id:
+                other_ids = payload.get("otherParticipantIds")
+                if isinstance(other_ids, list):
+                    for item in other_ids:
+                        participant_id = str(item or "").strip()
+                        if participant_id and participant_id != owner_id:
+                            target_id = participant_id
+                            break
+
+        get_social_state = getattr(adapter, "get_social_state", None)
+        if not (active_conversation_id and owner_id and target_id and callable(get_social_state)):
+            return None
+        # 社交状态由适配器按 (owner, target) 缓存，社交事件与好感度回写时失效/更新，
+        # 多数对话轮次无需 HTTP 请求。
+        social_data = await get_social_state(owner_id, target_id, world_id)
+        if not social_data:
+            return None
+        relationship = social_data.get("relationship")
+        affinity = social_data.get("affinity")
+
+        relationship_status = "stranger"
+        if isinstance(relationship, dict):
+            relationship_status = str(relationship.get("status") or "stranger").strip() or "stranger"
+
+        affinity_score = 0
+        affinity_label = "感觉一般"
+        if isinstance(affinity, dict):
+            try:
+                affinity_score = int(float(affinity.get("score", 0)))
+            except (TypeError, ValueError):
+                affinity_score = 0
+            affinity_label = str(affinity.get("label") or "感觉一般").strip() or "感觉一般"
+
+        tension_text = (
+            "【社交认知设定】你们对外界公开的客观关系是："
+            f"[{relationship_status}]。"
+            f"但在你的潜意识里，你对 TA 的好感度为 {affinity_score}/100，"
+            f"你私下觉得 TA [{affinity_label}]。"
+            "请严格遵循这一表里不一/表里如一的设定进行交互，可逢场作戏，"
+            "但绝对不要像机器人一样读出这些数值。若好感度达标，"
+            "可主动调用 propose_relationship 工具推进关系。"
+        )
+        return Context(role="system", content=tension_text)
+
+    async def _run_context_enrichment(self, adapter: Any, sources: dict[str, Any]) -> dict[str, Any]:
+        """并发执行各上下文补充来源，统一受 astrtown_context_enrichment_timeout_ms 约束。
+
+        返回在截止时间前成功完成的来源结果；超时的来源被取消，失败的来源记录日志后跳过。
+        各来源耗时（ok/empty/timeout/error）记录到适配器运行时统计。
+        """
+        if not sources:
+            return {}
+
+        try:
+            timeout_ms = int(self.config.get("astrtown_context_enrichment_timeout_ms", 2000) or 2000)
+        except (TypeError, ValueError):
+            timeout_ms = 2000
+        timeout_ms = max(1, timeout_ms)
+
+        timings: dict[str, tuple[float, str]] = {}
+
+        async def _timed(name: str, coro: Any) -> Any:
+            started = time.monotonic()
+            try:
+                result = await coro
+            except asyncio.CancelledError:
+                timings[name] = ((time.monotonic() - started) * 1000.0, "timeout")
+                raise
+            except Exception as e:
+                timings[name] = ((time.monotonic() - started) * 1000.0, "error")
+                logger.warning(f"[AstrTown] 上下文补充失败，已跳过: source={name}, error={e}")
+                return None
+            timings[name] = ((time.monotonic() - started) * 1000.0, "ok" if result else "empty")
+            return result
+
+        tasks = {
+            name: asyncio.create_task(_timed(name, coro), name=f"astrtown_enrich_{name}")
+            for name, coro in sources.items()
+        }
+        started = time.monotonic()
+        try:
+            done, pending = await asyncio.wait(tasks.values(), timeout=timeout_ms / 1000.0)
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            timed_out = [name for name, task in tasks.items() if task in pending]
+            logger.warning(
+                f"[AstrTown] 上下文补充超时(>{timeout_ms}ms)，已跳过: {','.join(timed_out)}，其余来源照常注入。"
+            )
+        total_ms = (time.monotonic() - started) * 1000.0
+
+        logger.debug(
+            f"[AstrTown] 上下文补充耗时: total={total_ms:.1f}ms, "
+            + ", ".join(f"{name}={ms:.1f}ms/{outcome}" for name, (ms, outcome) in timings.items())
+        )
+        record = getattr(adapter, "_record_context_enrichment", None)
+        if callable(record):
+            record(timings, total_ms, bool(pending))
+
+        return {name: task.result() for name, task in tasks.items() if task in done}
+
     _astrtown_items = {
         "astrtown_gateway_url": {
             "description": "Gateway 地址",
@@ -307,6 +328,10 @@ class AstrTownPlugin(Star):
         data_path = Path(data_dir) / "player_bindings.json"
         self.player_binding = PlayerBindingManager(str(data_path))
 
+        from .adapter.astrtown_adapter import set_command_journal_dir
+
+        set_command_journal_dir(str(data_dir))
+
         platform_manager = getattr(self.context, "platform_manager", None)
         platform_insts = getattr(platform_manager, "platform_insts", None)
         adapter_list = platform_insts if isinstance(platform_insts, list) else []
@@ -456,10 +481,10 @@ class AstrTownPlugin(Star):
             target_player_id(string): 要移动靠近的目标玩家ID
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.move_to",
             {"targetPlayerId": target_player_id},
         )
@@ -480,10 +505,10 @@ class AstrTownPlugin(Star):
             leave_after(boolean): 发送后离开对话，默认为false
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.say",
             {"conversationId": conversation_id, "text": text, "leaveAfter": bool(leave_after)},
         )
@@ -498,7 +523,7 @@ class AstrTownPlugin(Star):
             duration(number): 持续时间（毫秒）
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
         duration_ms = 30000
@@ -507,7 +532,7 @@ class AstrTownPlugin(Star):
         except (TypeError, ValueError):
             logger.warning(f"[astrtown] set_activity 无效的持续时间: {duration!r}，使用默认值 {duration_ms}")
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.set_activity",
             {"description": description, "emoji": emoji, "duration": duration_ms},
         )
@@ -520,10 +545,10 @@ class AstrTownPlugin(Star):
             conversation_id(string): 要加入的对话ID
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.accept_invite",
             {"conversationId": conversation_id},
         )
@@ -536,10 +561,10 @@ class AstrTownPlugin(Star):
             target_player_id(string): 要邀请的目标玩家ID
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.invite",
             {"targetPlayerId": target_player_id},
         )
@@ -552,10 +577,10 @@ class AstrTownPlugin(Star):
             conversation_id(string): 要离开的对话ID
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.leave_conversation",
             {"conversationId": conversation_id},
         )
@@ -564,10 +589,10 @@ class AstrTownPlugin(Star):
     async def propose_relationship(self, event: AstrMessageEvent, target_player_id: str, status: str):
         """向目标玩家提议建立社会关系。status 可选值：friend, lover, enemy"""
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.propose_relationship",
             {"targetPlayerId": target_player_id, "status": status},
         )
@@ -576,10 +601,10 @@ class AstrTownPlugin(Star):
     async def respond_relationship(self, event: AstrMessageEvent, proposer_id: str, accept: bool):
         """回应其他玩家的关系提议。accept=True 表示接受"""
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
-        return await adapter.send_command(
+        return await adapter.send_turn_command(
             "command.respond_relationship",
             {"proposerId": proposer_id, "accept": bool(accept)},
         )
@@ -595,11 +620,11 @@ class AstrTownPlugin(Star):
             args(object): 动作参数对象
         """
         adapter = getattr(event, "adapter", None)
-        if adapter is None or not hasattr(adapter, "send_command"):
+        if adapter is None or not hasattr(adapter, "send_turn_command"):
             return "当前事件上AstrTown适配器不可用"
 
         payload = {"actionType": action_type, "args": args or {}}
-        return await adapter.send_command("command.do_something", payload)
+        return await adapter.send_turn_command("command.do_something", payload)
 
     @filter.command("astrtown")
     async def astrtown_user_command(self, event: AstrMessageEvent):
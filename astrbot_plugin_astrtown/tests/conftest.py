@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# 以包名 astrbot_plugin_astrtown 导入被测模块（插件包以仓库根目录为父目录）。
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+# 导入插件包会导入 AstrBot（插件入口 main.py）；未安装 AstrBot 的环境跳过整个测试目录。
+if importlib.util.find_spec("astrbot") is None:
+    collect_ignore_glob = ["test_*.py"]
+
+
+def load_ws_frames() -> list[dict[str, Any]]:
+    """按 Gateway 协议整理的典型 WS 帧（fixtures/ws_frames.jsonl，每行一帧）。"""
+    lines = (FIXTURES_DIR / "ws_frames.jsonl").read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+@pytest.fixture
+def ws_frames() -> list[dict[str, Any]]:
+    return load_ws_frames()
+
+
+class FakeWs:
+    """代替 WebSocket 连接的 Gateway 替身：记录适配器写出的帧。
+
+    event.ack 按 gateway/src/wsHandler.ts 的方式解析（payload.eventId 与 v2 的 payload.eventIds），
+    确认的 eventId 依次记入 acked_event_ids。gate 清除时 send 挂起，用于模拟写出阻塞。
+    """
+
+    def __init__(self) -> None:
+        self.frames: list[dict[str, Any]] = []
+        self.acked_event_ids: list[str] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send(self, raw: str) -> None:
+        await self.gate.wait()
+        frame = json.loads(raw)
+        self.frames.append(frame)
+        if frame.get("type") == "event.ack":
+            payload = frame.get("payload") or {}
+            if payload.get("eventId"):
+                self.acked_event_ids.append(str(payload["eventId"]))
+            if isinstance(payload.get("eventIds"), list):
+                self.acked_event_ids.extend(str(eid) for eid in payload["eventIds"] if eid)
+
+    def frames_of(self, frame_type: str) -> list[dict[str, Any]]:
+        return [frame for frame in self.frames if frame.get("type") == frame_type]
+
+    async def close(self) -> None:
+        return None
+
+
+def world_event(event_type: str, event_id: str, *, ttl_ms: int = 60_000, **payload: Any) -> dict[str, Any]:
+    now_ms = int(time.time() * 1000)
+    return {
+        "type": event_type,
+        "id": event_id,
+        "version": 1,
+        "timestamp": now_ms,
+        "expiresAt": now_ms + ttl_ms,
+        "payload": payload,
+    }
+
+
+@pytest.fixture
+def make_adapter() -> Callable[..., Any]:
+    """构造已“鉴权”的适配器（FakeWs，不建立真实连接）；需在事件循环内调用。"""
+    from astrbot_plugin_astrtown.adapter.astrtown_adapter import AstrTownAdapter
+
+    def build(config: dict[str, Any] | None = None, *, negotiated_version: int = 1) -> Any:
+        adapter = AstrTownAdapter({"astrtown_token": "test", **(config or {})}, {}, asyncio.Queue())
+        adapter._ws = FakeWs()
+        adapter._agent_id = "agent:test"
+        adapter._player_id = "player:self"
+        adapter._world_id = "world:test"
+        adapter._negotiated_version = negotiated_version
+        return adapter
+
+    return build
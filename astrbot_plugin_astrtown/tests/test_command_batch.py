@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+_TURN = [
+    ("command.say", {"conversationId": "c1", "text": "你好"}),
+    ("command.set_activity", {"description": "散步", "emoji": "🚶", "duration": 60000}),
+    ("command.move_to", {"targetPlayerId": "player:2"}),
+]
+
+
+def _batching_adapter(make_adapter: Callable[..., Any]) -> Any:
+    return make_adapter(
+        {"astrtown_command_batch_window_ms": 20, "astrtown_command_batch_max": 8},
+        negotiated_version=3,
+    )
+
+
+async def _ack(adapter: Any, command_id: str, status: str, reason: str | None = None) -> None:
+    payload: dict[str, Any] = {"commandId": command_id, "status": status}
+    if reason is not None:
+        payload["reason"] = reason
+    await adapter._msg_router.handle_ws_message({"type": "command.ack", "id": f"ack-{command_id}", "payload": payload})
+
+
+def test_turn_commands_go_out_in_one_batch(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[Any, list[dict[str, Any]], list[dict[str, Any]], dict[str, Any]]:
+        adapter = _batching_adapter(make_adapter)
+        rejections: list[dict[str, Any]] = []
+
+        async def on_rejected(info: dict[str, Any]) -> None:
+            rejections.append(info)
+
+        adapter._cmd_channel.set_rejection_listener(on_rejected)
+        results = [await adapter.send_turn_command(msg_type, payload) for msg_type, payload in _TURN]
+        await asyncio.sleep(0.05)
+
+        # Gateway 替身：逐条 ACK 后再回复批次 ACK（与 commandRouter.ts 成功路径一致）。
+        batch = adapter._ws.frames_of("command.batch")[0]
+        for item in batch["payload"]["commands"]:
+            await _ack(adapter, item["id"], "accepted")
+        await _ack(adapter, batch["id"], "accepted")
+        await asyncio.sleep(0)
+        stats = adapter._cmd_channel.snapshot_stats()
+        await adapter.terminate()
+        return adapter._ws, results, rejections, stats
+
+    gateway, results, rejections, stats = asyncio.run(scenario())
+    assert [r["status"] for r in results] == ["submitted"] * 3
+    batches = gateway.frames_of("command.batch")
+    assert len(batches) == 1
+    commands = batches[0]["payload"]["commands"]
+    assert [(c["type"], c["payload"]) for c in commands] == _TURN
+    assert [c["id"] for c in commands] == [r["commandId"] for r in results]
+    # 同一轮的命令不再单独成帧。
+    assert not [f for f in gateway.frames if f["type"] in {msg_type for msg_type, _ in _TURN}]
+    assert rejections == []
+    assert stats["inflight"] == 0
+
+
+def test_batch_level_reject_fails_every_item(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[str]]:
+        adapter = _batching_adapter(make_adapter)
+        rejections: list[dict[str, Any]] = []
+
+        async def on_rejected(info: dict[str, Any]) -> None:
+            rejections.append(info)
+
+        adapter._cmd_channel.set_rejection_listener(on_rejected)
+        handles = [
+            await adapter._cmd_channel.submit_command(msg_type, payload, batch=True) for msg_type, payload in _TURN[:2]
+        ]
+        turn = [await adapter.send_turn_command(msg_type, payload) for msg_type, payload in _TURN[2:]]
+        await asyncio.sleep(0.05)
+
+        # 批次校验失败：Gateway 只回复批次 ID 的拒绝 ACK，不回复逐条 ACK。
+        batch = adapter._ws.frames_of("command.batch")[0]
+        await _ack(adapter, batch["id"], "rejected", "invalid command.batch item")
+        results = [await handle.result() for handle in handles]
+        await asyncio.sleep(0)
+        await adapter.terminate()
+        return results, rejections, [r["commandId"] for r in turn]
+
+    results, rejections, turn_ids = asyncio.run(scenario())
+    assert all(r == {"ok": False, "commandId": r["commandId"], "reason": "invalid command.batch item"} for r in results)
+    # 经 send_turn_command 异步提交的命令通过拒绝监听器补发。
+    assert [r["commandId"] for r in rejections] == turn_ids
+    assert rejections[0]["reason"] == "invalid command.batch item"
+    assert rejections[0]["source"] == "ack"
+
+
+def test_ack_timer_starts_when_the_batch_is_written(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        adapter = make_adapter(
+            {
+                "astrtown_command_batch_window_ms": 150,
+                "astrtown_command_ack_timeout_sec": 0.2,
+                "astrtown_command_ack_timeout_adaptive": False,
+            },
+            negotiated_version=3,
+        )
+        channel = adapter._cmd_channel
+        handles = [await channel.submit_command(msg_type, payload, batch=True) for msg_type, payload in _TURN[:2]]
+        # 聚合窗口（150ms）+ 写出后 100ms：若计时从入批开始，此时 0.2s 超时早已触发。
+        await asyncio.sleep(0.25)
+        batch = adapter._ws.frames_of("command.batch")[0]
+        for item in batch["payload"]["commands"]:
+            await _ack(adapter, item["id"], "accepted")
+        await _ack(adapter, batch["id"], "accepted")
+        results = [await handle.result() for handle in handles]
+        await asyncio.sleep(0)
+        stats = channel.snapshot_stats()
+        await adapter.terminate()
+        return results, stats
+
+    results, stats = asyncio.run(scenario())
+    assert [r["ok"] for r in results] == [True, True]
+    assert stats["timeouts"] == 0
+    # RTT 样本只包含写出之后的时间（约 100ms），不含 150ms 聚合窗口。
+    assert stats["ackRtt"]["count"] == 2
+    assert stats["ackRtt"]["maxMs"] < 200
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from astrbot_plugin_astrtown.adapter.components.command_journal import CommandJournal
+
+_CONFIG = {"astrtown_command_journal_enabled": True, "astrtown_command_journal_ttl_sec": 60}
+
+
+def _journal(adapter: Any, journal_dir: Path) -> CommandJournal:
+    return CommandJournal(adapter, lambda: str(journal_dir))
+
+
+def _journal_file(journal_dir: Path) -> Path:
+    files = list(journal_dir.glob("command_journal_*.jsonl"))
+    assert len(files) == 1
+    return files[0]
+
+
+def _put(command_id: str, deadline_ms: int) -> str:
+    rec = {
+        "op": "put",
+        "id": command_id,
+        "type": "command.say",
+        "payload": {"conversationId": "c1", "text": command_id},
+        "createdAt": deadline_ms - 60_000,
+        "deadline": deadline_ms,
+    }
+    return json.dumps(rec) + "\n"
+
+
+def test_reload_keeps_only_unacknowledged_commands(make_adapter: Callable[..., Any], tmp_path: Path) -> None:
+    async def scenario() -> list[str]:
+        adapter = make_adapter(_CONFIG)
+        journal = _journal(adapter, tmp_path)
+        for command_id in ("cmd-1", "cmd-2", "cmd-3"):
+            assert await journal.record(command_id, "command.say", {"text": command_id})
+        journal.complete("cmd-2", "accepted")
+        await journal.flush()
+
+        # 模拟进程重启：新实例从同一文件载入。
+        reloaded = _journal(adapter, tmp_path)
+        return [rec["id"] for rec in await reloaded.take_replayable()]
+
+    assert asyncio.run(scenario()) == ["cmd-1", "cmd-3"]
+
+
+def test_replay_resends_live_commands_and_drops_expired(make_adapter: Callable[..., Any], tmp_path: Path) -> None:
+    now_ms = int(time.time() * 1000)
+
+    async def scenario() -> tuple[Any, dict[str, Any], list[str]]:
+        adapter = make_adapter(_CONFIG)
+        journal = adapter._cmd_journal
+        journal._dir_resolver = lambda: str(tmp_path)
+        path = journal._resolve_path()
+        assert path is not None
+        path.write_text(_put("cmd-expired", now_ms - 1) + _put("cmd-live", now_ms + 60_000), encoding="utf-8")
+
+        await adapter._cmd_channel.replay_journal()
+        await journal.flush()
+        stats = journal.snapshot_stats()
+        remaining = [rec["id"] for rec in await _journal(adapter, tmp_path).take_replayable()]
+        await adapter.terminate()
+        return adapter._ws, stats, remaining
+
+    gateway, stats, remaining = asyncio.run(scenario())
+    # 按原 commandId 重放，Gateway 据此去重；过期命令不再发送。
+    assert [(f["type"], f["id"]) for f in gateway.frames] == [("command.say", "cmd-live")]
+    assert stats["expired"] == 1
+    assert stats["replayed"] == 1
+    # 过期命令已记为完成；重放的命令在 ACK 前仍保留在日志中。
+    assert remaining == ["cmd-live"]
+
+
+def test_put_is_durable_before_the_command_is_sent(make_adapter: Callable[..., Any], tmp_path: Path) -> None:
+    async def scenario() -> tuple[str, list[str]]:
+        adapter = make_adapter({**_CONFIG, "astrtown_command_async_ack": True})
+        adapter._cmd_journal._dir_resolver = lambda: str(tmp_path)
+        gateway = adapter._ws
+        seen_on_disk: list[str] = []
+        send = gateway.send
+
+        async def send_after_checking_disk(raw: str) -> None:
+            seen_on_disk.append(_journal_file(tmp_path).read_text(encoding="utf-8"))
+            await send(raw)
+
+        gateway.send = send_after_checking_disk
+        result = await adapter._cmd_channel.send_turn_command("command.say", {"conversationId": "c1", "text": "hi"})
+        await adapter.terminate()
+        return result["commandId"], seen_on_disk
+
+    command_id, seen_on_disk = asyncio.run(scenario())
+    assert len(seen_on_disk) == 1
+    assert f'"id":"{command_id}"' in seen_on_disk[0].replace(" ", "")
+
+
+def test_compaction_rewrites_only_pending_commands(make_adapter: Callable[..., Any], tmp_path: Path) -> None:
+    async def scenario() -> tuple[int, list[str], dict[str, Any]]:
+        adapter = make_adapter(_CONFIG)
+        journal = _journal(adapter, tmp_path)
+        ids = [f"cmd-{i}" for i in range(200)]
+        for command_id in ids:
+            assert await journal.record(command_id, "command.say", {"text": command_id})
+        for command_id in ids[:-1]:
+            journal.complete(command_id, "accepted")
+        await journal.flush()
+        lines = len(_journal_file(tmp_path).read_text(encoding="utf-8").splitlines())
+        remaining = [rec["id"] for rec in await _journal(adapter, tmp_path).take_replayable()]
+        return lines, remaining, journal.snapshot_stats()
+
+    lines, remaining, stats = asyncio.run(scenario())
+    # 200 条 put + 199 条 done 超过压缩阈值（256 行）后重写，只保留未完成命令与其后追加的 done。
+    assert lines < 200
+    assert remaining == ["cmd-199"]
+    assert stats["pending"] == 1
+    assert stats["writeErrors"] == 0
+
+
+def test_truncated_trailing_line_is_tolerated(make_adapter: Callable[..., Any], tmp_path: Path) -> None:
+    now_ms = int(time.time() * 1000)
+
+    async def scenario() -> tuple[list[str], list[str]]:
+        adapter = make_adapter(_CONFIG)
+        journal = _journal(adapter, tmp_path)
+        path = journal._resolve_path()
+        assert path is not None
+        # 进程在写入第二条 put 时退出，留下没有换行的半行。
+        path.write_text(_put("cmd-1", now_ms + 60_000) + _put("cmd-2", now_ms + 60_000)[:40], encoding="utf-8")
+
+        first = [rec["id"] for rec in await journal.take_replayable()]
+        assert await journal.record("cmd-3", "command.say", {"text": "cmd-3"})
+        second = [rec["id"] for rec in await _journal(adapter, tmp_path).take_replayable()]
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ["cmd-1"]
+    # 残行之后追加的新记录不会与其拼接成一行而丢失。
+    assert second == ["cmd-1", "cmd-3"]
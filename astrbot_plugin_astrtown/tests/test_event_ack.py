@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+from astrbot_plugin_astrtown.adapter.components.ws_writer import LANE_COMMAND
+
+
+def _ids(prefix: str, count: int) -> list[str]:
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+def test_batched_acks_on_v2(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        adapter = make_adapter(
+            {"astrtown_event_ack_flush_ms": 20, "astrtown_event_ack_batch_max": 4},
+            negotiated_version=2,
+        )
+        for event_id in _ids("evt", 10):
+            await adapter._ack_sender.send_event_ack(event_id)
+        await asyncio.sleep(0.1)
+        await adapter.terminate()
+        return adapter._ws
+
+    gateway = asyncio.run(scenario())
+    acks = gateway.frames_of("event.ack")
+    assert gateway.acked_event_ids == _ids("evt", 10)
+    # 空闲后的首个 ACK 立即单独发出，其余按窗口与批量上限合并。
+    assert acks[0]["payload"] == {"eventId": "evt-0"}
+    assert len(acks) < 10
+    assert all(len(frame["payload"].get("eventIds", [None])) <= 4 for frame in acks)
+
+
+def test_v1_falls_back_to_one_ack_per_event(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        adapter = make_adapter({"astrtown_event_ack_flush_ms": 20}, negotiated_version=1)
+        gateway = adapter._ws
+        adapter._ws_writer.start(gateway)
+        await adapter._ack_sender.send_event_acks(_ids("merged", 3))
+        # 写任务被阻塞期间排队的 ACK 帧在 v1 下也不能合并。
+        gateway.gate.clear()
+        command = asyncio.create_task(adapter._ws_writer.send(gateway, {"type": "command.say"}, LANE_COMMAND))
+        await asyncio.sleep(0)
+        acks = [asyncio.create_task(adapter._ack_sender.send_event_ack(eid)) for eid in _ids("evt", 3)]
+        await asyncio.sleep(0.01)
+        gateway.gate.set()
+        await asyncio.gather(command, *acks)
+        await adapter.terminate()
+        return gateway
+
+    gateway = asyncio.run(scenario())
+    acks = gateway.frames_of("event.ack")
+    assert gateway.acked_event_ids == _ids("merged", 3) + _ids("evt", 3)
+    assert len(acks) == 6
+    assert all("eventIds" not in frame["payload"] for frame in acks)
+
+
+def test_writer_coalescing_respects_id_cap_for_batched_frames(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        adapter = make_adapter({"astrtown_event_ack_batch_max": 32}, negotiated_version=2)
+        gateway = adapter._ws
+        adapter._ws_writer.start(gateway)
+        # 写任务卡在一条命令帧上，期间多个来源各自发出已批量化的 ACK 帧。
+        gateway.gate.clear()
+        command = asyncio.create_task(adapter._ws_writer.send(gateway, {"type": "command.say"}, LANE_COMMAND))
+        await asyncio.sleep(0)
+        senders = [
+            asyncio.create_task(adapter._ack_sender.send_event_acks(_ids(f"src{n}", 40)))
+            for n in range(4)
+        ]
+        await asyncio.sleep(0.01)
+        gateway.gate.set()
+        await asyncio.gather(command, *senders)
+        stats = adapter._ws_writer.snapshot_stats()
+        await adapter.terminate()
+        return gateway, stats
+
+    gateway, stats = asyncio.run(scenario())
+    expected = [eid for n in range(4) for eid in _ids(f"src{n}", 40)]
+    # 每个 eventId 恰好确认一次且保持顺序。
+    assert gateway.acked_event_ids == expected
+    acks = gateway.frames_of("event.ack")
+    assert all(len(frame["payload"]["eventIds"]) <= 64 for frame in acks)
+    # 已批量化的帧在写出时仍被二次合并。
+    assert stats["coalescedFrames"] > 0
+    assert len(acks) < 160 // 32
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+
+def test_grant_declares_client_window(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        adapter = make_adapter({"astrtown_flow_credit_window": 8}, negotiated_version=4)
+        adapter._flow_credit.on_connected()
+        await asyncio.sleep(0.01)
+        await adapter.terminate()
+        return adapter._ws
+
+    gateway = asyncio.run(scenario())
+    grants = gateway.frames_of("flow.credit")
+    assert [frame["payload"] for frame in grants] == [{"credits": 8, "window": 8}]
+
+
+def test_no_grant_below_v4(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        adapter = make_adapter({"astrtown_flow_credit_window": 8}, negotiated_version=3)
+        adapter._flow_credit.on_connected()
+        await asyncio.sleep(0.01)
+        await adapter.terminate()
+        return adapter._ws
+
+    assert asyncio.run(scenario()).frames_of("flow.credit") == []
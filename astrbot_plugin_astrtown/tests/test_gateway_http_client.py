@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+import pytest
+from aiohttp import web
+
+
+async def _start_stand_in() -> tuple[web.AppRunner, str]:
+    async def memory_search(request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response({"memories": [{"description": body["queryText"], "importance": 5}]})
+
+    app = web.Application()
+    app.router.add_post("/api/bot/memory/search", memory_search)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def test_connection_reuse_counts_pooled_connections(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> dict[str, Any]:
+        runner, base = await _start_stand_in()
+        adapter = make_adapter({"astrtown_gateway_url": base})
+        client = adapter._http_client
+        try:
+            # 仅取会话不发请求，不计为复用。
+            client.session()
+            client.session()
+            for _ in range(3):
+                assert await client.search_world_memory("小镇", 1) == [{"description": "小镇", "importance": 5}]
+            return client.snapshot_stats()
+        finally:
+            await adapter.terminate()
+            await runner.cleanup()
+
+    stats = asyncio.run(scenario())
+    assert stats["sessionsCreated"] == 1
+    assert stats["connectionsCreated"] == 1
+    assert stats["connectionReuses"] == 2
+
+
+def test_session_refused_after_close(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> None:
+        adapter = make_adapter()
+        client = adapter._http_client
+        session = client.session()
+        await adapter.terminate()
+
+        assert session.closed
+        with pytest.raises(RuntimeError):
+            client.session()
+        # 调用方按网络异常处理，不会悄悄重建会话。
+        assert await client.search_world_memory("小镇") == []
+        stats = client.snapshot_stats()
+        assert stats["closed"] and not stats["open"]
+        assert stats["sessionsCreated"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_loop_change_closes_stale_session(make_adapter: Callable[..., Any]) -> None:
+    async def first() -> Any:
+        return make_adapter()
+
+    adapter = asyncio.run(first())
+    client = adapter._http_client
+
+    async def open_session() -> Any:
+        return client.session()
+
+    stale = asyncio.run(open_session())
+    assert not stale.closed
+
+    async def reopen() -> Any:
+        session = client.session()
+        await asyncio.sleep(0)
+        return session
+
+    fresh = asyncio.run(reopen())
+    assert fresh is not stale
+    assert stale.closed
+    assert client.snapshot_stats()["staleSessionsClosed"] == 1
+    assert client.snapshot_stats()["sessionsCreated"] == 2
+
+    asyncio.run(client.close())
+    assert fresh.closed
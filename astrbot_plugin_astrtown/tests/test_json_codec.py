@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from astrbot_plugin_astrtown.adapter import json_codec
+
+_NON_ASCII = {"text": "你好，林小满 👋", "name": "Zoë", "escape": "tab\there \"quoted\" \\  "}
+
+
+@pytest.fixture
+def stdlib_codec(monkeypatch: pytest.MonkeyPatch) -> None:
+    """强制走标准库回退路径（与未安装 orjson/msgspec 的环境一致）。"""
+    monkeypatch.setattr(json_codec, "_fast_dumps", None)
+    monkeypatch.setattr(json_codec, "_fast_loads", None)
+
+
+def test_fallback_dumps_identical_to_stdlib(stdlib_codec: None, ws_frames: list[dict]) -> None:
+    for frame in [*ws_frames, _NON_ASCII]:
+        assert json_codec.dumps(frame) == json.dumps(frame, ensure_ascii=False)
+
+
+def test_fallback_keeps_non_ascii_literal(stdlib_codec: None) -> None:
+    text = json_codec.dumps(_NON_ASCII)
+    assert "你好，林小满 👋" in text
+    assert "\\u4f60" not in text
+    # 与 ensure_ascii=True 的输出语义等价，仅转义形式不同。
+    assert json.loads(text) == json.loads(json.dumps(_NON_ASCII, ensure_ascii=True))
+
+
+def test_fallback_loads_identical_to_stdlib(stdlib_codec: None, ws_frames: list[dict]) -> None:
+    for frame in [*ws_frames, _NON_ASCII]:
+        for ensure_ascii in (True, False):
+            raw = json.dumps(frame, ensure_ascii=ensure_ascii)
+            expected = json.loads(raw)
+            assert json_codec.loads(raw) == expected
+            assert json_codec.loads(raw.encode("utf-8")) == expected
+            assert json_codec.loads(bytearray(raw.encode("utf-8"))) == expected
+            assert json_codec.loads(memoryview(raw.encode("utf-8"))) == expected
+
+
+def test_fallback_loads_rejects_invalid_json(stdlib_codec: None) -> None:
+    with pytest.raises(ValueError):
+        json_codec.loads('{"type": "ping",')
+
+
+def test_fast_path_round_trips_like_stdlib(ws_frames: list[dict]) -> None:
+    for frame in [*ws_frames, _NON_ASCII]:
+        text = json_codec.dumps(frame)
+        assert isinstance(text, str)
+        assert json.loads(text) == frame
+        assert json_codec.loads(json.dumps(frame, ensure_ascii=True)) == frame
+    assert "\\u4f60" not in json_codec.dumps(_NON_ASCII)
+
+
+def test_fast_path_falls_back_for_non_str_keys() -> None:
+    obj = {1: "a", "b": [1, 2]}
+    assert json_codec.dumps(obj) == json.dumps(obj, ensure_ascii=False)
+
+
+def test_fast_path_loads_rejects_invalid_json() -> None:
+    with pytest.raises(ValueError):
+        json_codec.loads(b"{not json}")
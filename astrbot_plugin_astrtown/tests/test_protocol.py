@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+from astrbot_plugin_astrtown.adapter.protocol import (
+    WORLD_EVENT_PAYLOAD_TYPES,
+    ConversationMessagePayload,
+    ConversationStartedPayload,
+    SocialRelationshipRespondedPayload,
+    decode_world_event_body,
+)
+
+_ILL_TYPED_VALUES = [None, 0, 1.5, True, "", "  text  ", [], ["a", None, 3], {}, {"nested": 1}, object()]
+
+# 各结构体读取的全部原始键（含别名与嵌套对象键）。
+_RAW_KEYS = {
+    "message",
+    "success",
+    "result",
+    "otherPlayerId",
+    "other_player_id",
+    "otherParticipantId",
+    "targetPlayerId",
+    "counterpartId",
+    "otherPlayerName",
+    "other_player_name",
+    "otherParticipantName",
+    "targetPlayerName",
+    "counterpartName",
+}
+
+
+def _keys_for(payload_type: type) -> set[str]:
+    return {f.name for f in dataclasses.fields(payload_type)} | _RAW_KEYS
+
+
+@pytest.mark.parametrize("event_type", sorted(WORLD_EVENT_PAYLOAD_TYPES))
+def test_from_payload_accepts_empty_payload(event_type: str) -> None:
+    body = decode_world_event_body(event_type, {})
+    assert isinstance(body, WORLD_EVENT_PAYLOAD_TYPES[event_type])
+
+
+@pytest.mark.parametrize("event_type", sorted(WORLD_EVENT_PAYLOAD_TYPES))
+@pytest.mark.parametrize("value", _ILL_TYPED_VALUES, ids=lambda v: type(v).__name__)
+def test_from_payload_tolerates_ill_typed_fields(event_type: str, value: object) -> None:
+    payload_type = WORLD_EVENT_PAYLOAD_TYPES[event_type]
+    body = decode_world_event_body(event_type, {key: value for key in _keys_for(payload_type)})
+    assert isinstance(body, payload_type)
+    for field in dataclasses.fields(payload_type):
+        if field.type == "str":
+            assert isinstance(getattr(body, field.name), str)
+
+
+def test_ill_typed_values_are_normalized() -> None:
+    message = ConversationMessagePayload.from_payload({"conversationId": 42, "message": ["not", "a", "dict"]})
+    assert message == ConversationMessagePayload(conversationId="42", speakerId="", content="")
+
+    started = ConversationStartedPayload.from_payload(
+        {"conversationId": " c1 ", "otherParticipantIds": ["p:2", None, "  ", 7], "counterpartId": "p:2"}
+    )
+    assert started.conversationId == "c1"
+    assert started.otherParticipantIds == ("p:2", "7")
+    assert started.otherPlayerId == "p:2"
+
+    responded = SocialRelationshipRespondedPayload.from_payload({"accept": "yes"})
+    assert responded.accept is False
+
+
+def test_unknown_event_type_has_no_body() -> None:
+    assert decode_world_event_body("conversation.unknown", {"conversationId": "c1"}) is None
+
+
+def test_fixture_world_events_decode(ws_frames: list[dict]) -> None:
+    decoded = [
+        decode_world_event_body(frame["type"], frame["payload"])
+        for frame in ws_frames
+        if frame["type"] in WORLD_EVENT_PAYLOAD_TYPES
+    ]
+    assert decoded
+    message = next(body for body in decoded if isinstance(body, ConversationMessagePayload))
+    assert message.conversationId and message.speakerId and message.content
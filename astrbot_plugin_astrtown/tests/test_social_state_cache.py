@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+_PROPOSER = "player:2"
+
+
+class _SocialGateway:
+    """/api/bot/social/state 的替身：返回当前“服务端”关系并记录查询次数。"""
+
+    def __init__(self) -> None:
+        self.status = "none"
+        self.fetches = 0
+
+    async def get_social_state(self, world_id: str, owner_id: str, target_id: str, timeout_sec: float = 2.0) -> Any:
+        self.fetches += 1
+        return {"relationship": {"status": self.status}, "affinity": {"score": 10, "label": "neutral"}}
+
+
+async def _ack(adapter: Any, command_id: str, status: str) -> None:
+    payload = {"commandId": command_id, "status": status}
+    await adapter._msg_router.handle_ws_message({"type": "command.ack", "id": f"ack-{command_id}", "payload": payload})
+
+
+async def _relationship(adapter: Any) -> str:
+    state = await adapter.get_social_state(adapter._player_id, _PROPOSER)
+    return state["relationship"]["status"]
+
+
+def _adapter(make_adapter: Callable[..., Any], config: dict[str, Any]) -> tuple[Any, _SocialGateway]:
+    adapter = make_adapter({"astrtown_command_async_ack": True, **config})
+    gateway = _SocialGateway()
+    adapter._http_client.get_social_state = gateway.get_social_state
+    return adapter, gateway
+
+
+def test_read_between_submit_and_ack_does_not_pin_stale_relationship(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[str, str, int]:
+        adapter, gateway = _adapter(make_adapter, {})
+        result = await adapter.send_turn_command(
+            "command.respond_relationship", {"proposerId": _PROPOSER, "accept": True}
+        )
+        assert result["status"] == "submitted"
+        # 异步 ACK：工具已返回，Gateway 尚未写入关系；此时的查询（如下一次 LLM 钩子）读到旧关系。
+        before_ack = await _relationship(adapter)
+
+        gateway.status = "friend"
+        await _ack(adapter, result["commandId"], "accepted")
+        await asyncio.sleep(0)
+        after_ack = await _relationship(adapter)
+        await adapter.terminate()
+        return before_ack, after_ack, gateway.fetches
+
+    before_ack, after_ack, fetches = asyncio.run(scenario())
+    assert before_ack == "none"
+    # 最终 ACK 时缓存失效，之后的查询重新拉取新关系。
+    assert after_ack == "friend"
+    assert fetches == 2
+
+
+def test_late_ack_after_timeout_invalidates_again(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[str, str]:
+        adapter, gateway = _adapter(
+            make_adapter,
+            {"astrtown_command_ack_timeout_sec": 0.1, "astrtown_command_ack_timeout_adaptive": False},
+        )
+        result = await adapter.send_turn_command(
+            "command.respond_relationship", {"proposerId": _PROPOSER, "accept": True}
+        )
+        await asyncio.sleep(0.15)
+        # ACK 超时后缓存已失效，但 Gateway 随后才写入关系：超时后的查询仍缓存旧关系。
+        after_timeout = await _relationship(adapter)
+
+        gateway.status = "friend"
+        await _ack(adapter, result["commandId"], "accepted")
+        after_late_ack = await _relationship(adapter)
+        await adapter.terminate()
+        return after_timeout, after_late_ack
+
+    after_timeout, after_late_ack = asyncio.run(scenario())
+    assert after_timeout == "none"
+    assert after_late_ack == "friend"
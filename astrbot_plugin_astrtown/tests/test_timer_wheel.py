@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from astrbot_plugin_astrtown.adapter.timer_wheel import ExpiringDict
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_set_with_ttl_then_expiry() -> None:
+    clock = _Clock()
+    store: ExpiringDict[str, int] = ExpiringDict(tick_sec=1.0, wheel_size=8, clock=clock)
+    store.set("a", 1, ttl_sec=3.0)
+    store.set("b", 2, ttl_sec=10.0)
+
+    clock.now += 2.9
+    assert store.get("a") == 1
+    assert "a" in store
+
+    # 到期后 get 不再返回，即使时间轮尚未推进到该槽位。
+    clock.now += 0.2
+    assert store.get("a") is None
+    assert "a" not in store
+    assert store.get("b") == 2
+
+    # TTL 跨越整圈（10s > 8 槽 x 1s）的条目在到期前不被时间轮清理。
+    clock.now += 5.0
+    store.advance()
+    assert store.get("b") == 2
+
+    clock.now += 3.0
+    assert store.advance() == 1
+    assert len(store) == 0
+    assert store.snapshot_stats()["expired"] == 2
+
+
+def test_advance_reclaims_without_reads() -> None:
+    clock = _Clock()
+    store: ExpiringDict[int, int] = ExpiringDict(tick_sec=1.0, wheel_size=16, clock=clock)
+    for i in range(100):
+        store.set(i, i, ttl_sec=1.0 + (i % 5))
+    clock.now += 10.0
+    assert store.advance() == 100
+    assert len(store) == 0
+
+
+def test_overwrite_extends_deadline() -> None:
+    clock = _Clock()
+    store: ExpiringDict[str, str] = ExpiringDict(tick_sec=1.0, wheel_size=8, clock=clock)
+    store.set("k", "old", ttl_sec=2.0)
+    clock.now += 1.5
+    store.set("k", "new", ttl_sec=5.0)
+
+    # 旧槽位记录到期时与当前到期时间不符，不会误删新值。
+    clock.now += 2.0
+    store.advance()
+    assert store.get("k") == "new"
+
+    clock.now += 3.5
+    assert store.get("k") is None
+
+
+def test_max_size_evicts_oldest_written() -> None:
+    clock = _Clock()
+    store: ExpiringDict[str, int] = ExpiringDict(max_size=3, clock=clock)
+    for key in ("a", "b", "c"):
+        store.set(key, 0, ttl_sec=60.0)
+    # 重新写入 a 使其成为最新条目。
+    store.set("a", 1, ttl_sec=60.0)
+    store.set("d", 0, ttl_sec=60.0)
+    store.set("e", 0, ttl_sec=60.0)
+
+    assert len(store) == 3
+    assert sorted(key for key, _ in store.items()) == ["a", "d", "e"]
+    assert store.get("a") == 1
+    assert store.evictions == 2
+
+    # 被淘汰条目残留的时间轮记录到期时不影响计数。
+    clock.now += 61.0
+    assert store.advance() == 3
+    assert store.snapshot_stats()["expired"] == 3
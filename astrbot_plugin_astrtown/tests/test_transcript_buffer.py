@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+from conftest import world_event
+
+
+def _message(event_id: str, conversation_id: str, content: str, *, ttl_ms: int = 60_000) -> dict[str, Any]:
+    return world_event(
+        "conversation.message",
+        event_id,
+        ttl_ms=ttl_ms,
+        conversationId=conversation_id,
+        message={"speakerId": "player:other", "content": content},
+    )
+
+
+def test_expired_message_marks_only_its_conversation(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> None:
+        adapter = make_adapter()
+        transcripts = adapter._transcripts
+        transcripts.on_started("c1")
+        transcripts.on_started("c2")
+        transcripts.append("c1", "player:other", "你好")
+        transcripts.append("c2", "player:other", "hi")
+
+        await adapter._ingress.submit(_message("evt-expired", "c1", "过期", ttl_ms=-1000))
+
+        assert transcripts.take("c1") is None
+        assert transcripts.take("c2") == [{"speakerId": "player:other", "content": "hi"}]
+        await adapter.terminate()
+
+    asyncio.run(scenario())
+
+
+def test_expired_message_without_conversation_marks_all(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> None:
+        adapter = make_adapter()
+        transcripts = adapter._transcripts
+        transcripts.on_started("c1")
+        transcripts.on_started("c2")
+
+        await adapter._event_dispatcher.drop_expired("conversation.message", "evt-x", "dispatch")
+
+        assert transcripts.take("c1") is None
+        assert transcripts.take("c2") is None
+        await adapter.terminate()
+
+    asyncio.run(scenario())
+
+
+def test_complete_transcript_served_locally(make_adapter: Callable[..., Any]) -> None:
+    adapter = make_adapter()
+    transcripts = adapter._transcripts
+    transcripts.append("c0", "player:other", "中途加入")
+    transcripts.on_started("c1")
+    transcripts.append("c1", "player:other", "你好")
+    transcripts.record_own_say({"conversationId": "c1", "text": "你好呀"})
+
+    assert transcripts.take("c0") is None
+    assert transcripts.take("c1") == [
+        {"speakerId": "player:other", "content": "你好"},
+        {"speakerId": "player:self", "content": "你好呀"},
+    ]
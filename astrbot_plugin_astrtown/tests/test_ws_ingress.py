@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+from astrbot_plugin_astrtown.adapter.components.world_event_registry import (
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    WorldEventTraits,
+)
+from astrbot_plugin_astrtown.adapter.components.ws_writer import LANE_COMMAND
+from conftest import world_event
+
+_CONFIG = {
+    "astrtown_ingress_queue_size": 1,
+    "astrtown_ingress_workers": 1,
+    "astrtown_ingress_overflow_max": 3,
+}
+
+
+def _blocking_handler(adapter: Any, event_type: str, priority: int) -> tuple[asyncio.Event, list[str]]:
+    release = asyncio.Event()
+    handled: list[str] = []
+
+    async def handler(evt: Any, data: dict[str, Any]) -> None:
+        await release.wait()
+        handled.append(str(data["id"]))
+        return None
+
+    adapter._event_dispatcher.register_handler(event_type, handler, WorldEventTraits(wakes_llm=False, priority=priority))
+    return release, handled
+
+
+def test_overflow_sheds_oldest_low_priority_without_ack(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> Any:
+        # 协议 v1 没有 flow.credit，溢出上限是唯一的内存边界。
+        adapter = make_adapter(_CONFIG, negotiated_version=1)
+        release, handled = _blocking_handler(adapter, "bench.low", PRIORITY_LOW)
+        ingress = adapter._ingress
+        for i in range(10):
+            await ingress.submit(world_event("bench.low", f"low-{i}"))
+            assert ingress.snapshot_stats()["overflow"] <= 3
+        stats = ingress.snapshot_stats()
+        release.set()
+        for _ in range(50):
+            if len(handled) == 4:
+                break
+            await asyncio.sleep(0.01)
+        await adapter.terminate()
+        return adapter._ws, handled, stats
+
+    gateway, handled, stats = asyncio.run(scenario())
+    assert stats["overflow"] == 3
+    assert stats["overflowShed"] == 6
+    assert handled == ["low-0", "low-7", "low-8", "low-9"]
+    # 被丢弃的事件不 ACK，由 Gateway 超时重投。
+    assert gateway.acked_event_ids == handled
+
+
+def test_overflow_pauses_reader_when_nothing_can_be_shed(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[list[str], bool, dict[str, Any]]:
+        adapter = make_adapter(_CONFIG, negotiated_version=1)
+        release, handled = _blocking_handler(adapter, "bench.normal", PRIORITY_NORMAL)
+        ingress = adapter._ingress
+        for i in range(4):
+            await ingress.submit(world_event("bench.normal", f"evt-{i}"))
+        blocked = asyncio.create_task(ingress.submit(world_event("bench.normal", "evt-4")))
+        await asyncio.sleep(0.02)
+        paused = not blocked.done()
+        stats = ingress.snapshot_stats()
+        release.set()
+        await asyncio.wait_for(blocked, 1.0)
+        for _ in range(50):
+            if len(handled) == 5:
+                break
+            await asyncio.sleep(0.01)
+        await adapter.terminate()
+        return handled, paused, stats
+
+    handled, paused, stats = asyncio.run(scenario())
+    assert paused
+    assert stats["overflow"] == 3
+    assert stats["overflowShed"] == 0
+    assert stats["overflowPaused"] == 1
+    assert handled == [f"evt-{i}" for i in range(5)]
+
+
+def test_dropped_event_acks_do_not_block_the_reader(make_adapter: Callable[..., Any]) -> None:
+    async def scenario() -> tuple[bool, Any]:
+        adapter = make_adapter({"astrtown_state_coalesce_window_ms": 50}, negotiated_version=2)
+        gateway = adapter._ws
+        adapter._ws_writer.start(gateway)
+        adapter._event_dispatcher.mark_processed("dup-1")
+        # 写任务卡在一条命令帧上：ACK lane 的帧此时无法写出。
+        gateway.gate.clear()
+        command = asyncio.create_task(adapter._ws_writer.send(gateway, {"type": "command.say"}, LANE_COMMAND))
+        await asyncio.sleep(0)
+
+        ingress = adapter._ingress
+        submits = asyncio.gather(
+            ingress.submit(world_event("bench.any", "dup-1")),
+            ingress.submit(world_event("bench.any", "expired-1", ttl_ms=-1000)),
+            ingress.submit(world_event("agent.state_changed", "state-1", agentId="agent:test")),
+        )
+        done, _ = await asyncio.wait({submits}, timeout=0.05)
+        returned = bool(done)
+        gateway.gate.set()
+        await asyncio.gather(command, submits)
+        await asyncio.sleep(0.01)
+        await adapter.terminate()
+        return returned, gateway
+
+    returned, gateway = asyncio.run(scenario())
+    assert returned
+    assert gateway.frames[0]["type"] == "command.say"
+    assert sorted(gateway.acked_event_ids) == ["dup-1", "expired-1", "state-1"]
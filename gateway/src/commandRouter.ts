@@ -7,6 +7,7 @@ import type { CommandQueue } from './commandQueue.js';
 import type { BotQueueRegistry } from './queueRegistry.js';
 import type { EventDispatcher } from './eventDispatcher.js';
 import { classifyPriority, enqueueWorldEvent } from './queueRegistry.js';
+import type { IdempotencyCache } from './utils.js';
 import type {
   SocialRelationshipProposedEvent,
   SocialRelationshipRespondedEvent,
@@ -23,6 +24,8 @@ export type CommandRouterDeps = {
   worldEventQueues: BotQueueRegistry<WorldEvent>;
   worldEventDispatcher: EventDispatcher<WorldEvent>;
   send: (conn: BotConnection, msg: unknown) => void;
+  /** 已受理的命令（agentId:commandId），用于识别客户端重连后重放的命令，避免重复执行。 */
+  acceptedCommands?: IdempotencyCache;
   log: { info: (o: any, m?: string) => void; warn: (o: any, m?: string) => void; error: (o: any, m?: string) => void };
 };
 
@@ -73,9 +76,18 @@ export class CommandRouter {
 
   private safeAckSend(
     conn: BotConnection,
-    payload: { commandId: string; status: 'accepted' | 'rejected'; reason?: string; inputId?: string },
+    payload: {
+      commandId: string;
+      status: 'accepted' | 'rejected';
+      reason?: string;
+      inputId?: string;
+      duplicate?: boolean;
+    },
     commandType: string,
   ): void {
+    if (payload.status === 'accepted' && !payload.duplicate) {
+      this.deps.acceptedCommands?.add(`${conn.session.agentId}:${payload.commandId}`);
+    }
     try {
       this.deps.send(conn, {
         type: 'command.ack',
@@ -327,6 +339,13 @@ export class CommandRouter {
       return;
     }
 
+    // 客户端重连后会按原 commandId 重放未确认的命令；已受理过的直接回 ACK，不再执行。
+    if (this.deps.acceptedCommands?.has(`${conn.session.agentId}:${msg.id}`)) {
+      commandsTotal.inc({ type: commandType, status: 'deduplicated' });
+      this.safeAckSend(conn, { commandId: msg.id, status: 'accepted', duplicate: true }, commandType);
+      return;
+    }
+
     this.deps.queue.enqueue(conn.session.agentId, {
       commandId: msg.id,
       commandType,
@@ -448,7 +467,8 @@ export class CommandRouter {
           }
 
           const req = mapping.buildRequest({ agentId: conn.session.agentId, ...(msg.payload as any) });
-          const idempotencyKey = `${conn.session.agentId}:${commandType}:${Date.now()}:${createUuid().slice(0, 4)}`;
+          // 以 commandId 派生幂等键：重放的同一命令在后端也会命中幂等结果。
+          const idempotencyKey = `${conn.session.agentId}:${commandType}:${msg.id}`;
 
           const res = await this.deps.client.postCommand({
             token: conn.session.token,
@@ -76,7 +76,10 @@ export function loadConfig(): GatewayConfig {
     port,
     gatewaySecret,
     serverVersion: process.env.GATEWAY_VERSION ?? '0.1.0',
-    supportedProtocolVersions: [1],
+    // v2: event.ack may carry payload.eventIds (batched ACK).
+    // v3: adapter may group the commands of one LLM turn into command.batch.
+    // v4: adapter may grant event credits via flow.credit (credit-based flow control).
+    supportedProtocolVersions: [1, 2, 3, 4],
     ackTimeoutMs,
     ackMaxRetries,
     ackBackoffMs,
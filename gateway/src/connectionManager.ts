@@ -1,6 +1,7 @@
+import type { FlowCreditState } from './flowCredit.js';
 import type { BotSession, ConnectionState } from './types.js';
 
-export type BotConnection = {
+export type BotConnection = FlowCreditState & {
   state: ConnectionState;
   session: BotSession;
   socket: WebSocket;
@@ -6,10 +6,13 @@ import {
   eventsDispatchedTotal,
   eventsDroppedTotal,
   eventsExpiredTotal,
+  eventsFlowBlockedTotal,
+  flowCreditsAvailable,
   queueDepth,
 } from './metrics.js';
 import type { WsWorldEventBase } from './types.js';
 import { DEFAULT_ACK_PLAN, EventQueue, type QueuedEvent, type RetryPlan } from './eventQueue.js';
+import { consumeFlowCredit, grantFlowCredits, hasFlowCredit } from './flowCredit.js';
 
 export type EventDispatcherDeps<TEvent extends WsWorldEventBase<string, any>> = {
   connections: ConnectionManager;
@@ -50,7 +53,23 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
     this.tryDispatch(agentId);
   }
 
+  /**
+   * 客户端授予事件额度（flow.credit）。首次授予即对该连接启用流控：
+   * 额度耗尽后事件留在 Gateway 优先级队列中（照常过期/溢出淘汰），而不是堆积到处理不过来的客户端。
+   * 客户端声明了窗口（window）时，剩余额度不超过该窗口。
+   */
+  onCredit(agentId: string, credits: unknown, window?: unknown): void {
+    const conn = this.deps.connections.getByAgentId(agentId);
+    if (!conn) return;
+    const available = grantFlowCredits(conn, credits, window);
+    flowCreditsAvailable.set({ agent_id: agentId }, available);
+    while (hasFlowCredit(conn) && this.tryDispatch(agentId)) {
+      // 逐条下发直到额度耗尽或没有可发送的事件。
+    }
+  }
+
   onDisconnect(agentId: string): void {
+    flowCreditsAvailable.remove({ agent_id: agentId });
     for (const [key, entry] of this.inflight) {
       if (entry.agentId !== agentId) continue;
       clearTimeout(entry.timer);
@@ -58,16 +77,17 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
     }
   }
 
-  tryDispatch(agentId: string): void {
+  /** 尝试下发队首事件；返回是否发出了一条事件。 */
+  tryDispatch(agentId: string): boolean {
     const conn = this.deps.connections.getByAgentId(agentId);
-    if (!conn) return;
+    if (!conn) return false;
 
     const q = this.deps.getQueue(agentId);
     const now = Date.now();
 
     while (true) {
       const peek = q.peekNextReady(now);
-      if (peek.kind === 'empty') return;
+      if (peek.kind === 'empty') return false;
       if (peek.kind === 'expired') {
         eventsExpiredTotal.inc({ type: peek.dropped.event.type, priority: String(peek.dropped.priority) });
         this.deps.log.warn({ agentId, eventId: peek.dropped.event.id, type: peek.dropped.event.type }, 'event expired');
@@ -81,11 +101,15 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
         continue;
       }
 
-      if (this.isInflight(agentId, item.event.id)) return;
+      if (this.isInflight(agentId, item.event.id)) return false;
+
+      if (!hasFlowCredit(conn)) {
+        eventsFlowBlockedTotal.inc();
+        return false;
+      }
 
       q.dequeue();
-      this.sendWithRetry(conn, item);
-      return;
+      return this.sendWithRetry(conn, item);
     }
   }
 
@@ -93,13 +117,18 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
     return this.inflight.has(`${agentId}:${eventId}`);
   }
 
-  private sendWithRetry(conn: BotConnection, item: QueuedEvent<TEvent>): void {
+  private sendWithRetry(conn: BotConnection, item: QueuedEvent<TEvent>): boolean {
     const agentId = conn.session.agentId;
     const key = `${agentId}:${item.event.id}`;
 
     try {
       this.deps.send(conn, item.event);
       eventsDispatchedTotal.inc({ type: item.event.type, status: 'sent' });
+      if (conn.flowCredits !== undefined) {
+        // ACK 超时重传同样经过这里，按帧消耗额度（见 consumeFlowCredit）。
+        consumeFlowCredit(conn);
+        flowCreditsAvailable.set({ agent_id: agentId }, conn.flowCredits);
+      }
       this.updateQueueDepth(agentId);
     } catch (e: any) {
       eventsDispatchedTotal.inc({ type: item.event.type, status: 'failed' });
@@ -114,8 +143,7 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
       );
       // Treat as a failed attempt and schedule retry (or drop after max retries).
       this.onSendFailure(agentId, item);
-      this.tryDispatch(agentId);
-      return;
+      return this.tryDispatch(agentId);
     }
 
     const isQueueRefill = item.event.type === 'agent.queue_refill_requested';
@@ -166,6 +194,7 @@ export class EventDispatcher<TEvent extends WsWorldEventBase<string, any>> {
       enqueuedAt: item.enqueuedAt,
       timer,
     });
+    return true;
   }
 
   private onSendFailure(agentId: string, item: QueuedEvent<TEvent>): void {
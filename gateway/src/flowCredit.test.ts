@@ -0,0 +1,145 @@
+import assert from 'node:assert/strict';
+import { describe, test } from 'node:test';
+
+import {
+  MAX_FLOW_CREDITS,
+  consumeFlowCredit,
+  grantFlowCredits,
+  hasFlowCredit,
+  type FlowCreditState,
+} from './flowCredit.js';
+
+/**
+ * 客户端额度记账的替身，与 astrbot_plugin_astrtown FlowCreditController 一致：
+ * 每收到一帧世界事件扣减 1（额度为 0 时记为透支），处理完或丢弃重复副本后按窗口差额补发额度。
+ */
+class ClientStandIn {
+  outstanding = 0;
+  held = 0;
+  enabled = false;
+  readonly window: number;
+
+  constructor(window: number) {
+    this.window = window;
+  }
+
+  connect(): number {
+    this.outstanding = 0;
+    this.enabled = true;
+    return this.grant();
+  }
+
+  receive(): void {
+    this.held += 1;
+    if (this.enabled && this.outstanding > 0) this.outstanding -= 1;
+  }
+
+  release(): number {
+    if (this.held > 0) this.held -= 1;
+    return this.grant();
+  }
+
+  private grant(): number {
+    const credits = Math.max(1, this.window - this.held) - this.outstanding;
+    if (credits <= 0) return 0;
+    this.outstanding += credits;
+    return credits;
+  }
+}
+
+/** 按 EventDispatcher.tryDispatch/sendWithRetry 的顺序下发一帧；返回是否发出。 */
+function dispatch(conn: FlowCreditState, client: ClientStandIn): boolean {
+  if (!hasFlowCredit(conn)) return false;
+  consumeFlowCredit(conn);
+  client.receive();
+  return true;
+}
+
+describe('flow credit accounting', () => {
+  test('flow control is off until the first grant', () => {
+    const conn: FlowCreditState = {};
+    assert.equal(hasFlowCredit(conn), true);
+    consumeFlowCredit(conn);
+    assert.equal(conn.flowCredits, undefined);
+
+    assert.equal(grantFlowCredits(conn, 2), 2);
+    consumeFlowCredit(conn);
+    consumeFlowCredit(conn);
+    assert.equal(hasFlowCredit(conn), false);
+    consumeFlowCredit(conn);
+    assert.equal(conn.flowCredits, 0);
+  });
+
+  test('malformed grants add nothing', () => {
+    const conn: FlowCreditState = {};
+    for (const credits of [Number.NaN, -5, 'x', null, undefined, Number.POSITIVE_INFINITY]) {
+      assert.equal(grantFlowCredits(conn, credits), 0);
+    }
+    assert.equal(grantFlowCredits(conn, 2.9), 2);
+    assert.equal(grantFlowCredits(conn, '3'), 5);
+  });
+
+  test('credits are capped by the declared client window', () => {
+    const legacy: FlowCreditState = {};
+    assert.equal(grantFlowCredits(legacy, 5000), MAX_FLOW_CREDITS);
+
+    const conn: FlowCreditState = {};
+    assert.equal(grantFlowCredits(conn, 100, 64), 64);
+    // 之后的授予未带窗口时沿用已声明的窗口。
+    assert.equal(grantFlowCredits(conn, 10), 64);
+    assert.equal(grantFlowCredits(conn, 10, 0), 64);
+    // 窗口大于全局上限时仍以 MAX_FLOW_CREDITS 为界。
+    assert.equal(grantFlowCredits(conn, 10, 4096), 74);
+    assert.equal(grantFlowCredits(conn, 5000), MAX_FLOW_CREDITS);
+  });
+
+  test('retransmits consume credits in step with the client', () => {
+    const client = new ClientStandIn(4);
+    const conn: FlowCreditState = {};
+    grantFlowCredits(conn, client.connect(), client.window);
+
+    // 下发 4 条事件后额度耗尽，后续事件留在 Gateway 队列。
+    let sent = 0;
+    while (dispatch(conn, client)) sent += 1;
+    assert.equal(sent, 4);
+    assert.equal(conn.flowCredits, client.outstanding);
+
+    // 客户端处理完 1 条后补发额度；Gateway 以 ACK 超时重传另一条事件（客户端仍持有原事件）。
+    grantFlowCredits(conn, client.release(), client.window);
+    assert.equal(dispatch(conn, client), true);
+    assert.equal(conn.flowCredits, client.outstanding);
+    // 重复副本被客户端丢弃并归还额度，双方仍一致。
+    grantFlowCredits(conn, client.release(), client.window);
+    assert.equal(conn.flowCredits, client.outstanding);
+
+    for (let i = 0; i < 3; i += 1) grantFlowCredits(conn, client.release(), client.window);
+    assert.equal(client.held, 0);
+    assert.equal(conn.flowCredits, client.outstanding);
+    assert.equal(conn.flowCredits, client.window);
+  });
+
+  test('reconnect starts a fresh ledger bounded by the remaining client backlog', () => {
+    const client = new ClientStandIn(4);
+    const oldConn: FlowCreditState = {};
+    grantFlowCredits(oldConn, client.connect(), client.window);
+    dispatch(oldConn, client);
+    dispatch(oldConn, client);
+    assert.equal(oldConn.flowCredits, 2);
+
+    // 新连接不继承旧连接的额度；首次授予前下发的事件（如重投的 inflight 事件）不计额度。
+    const conn: FlowCreditState = {};
+    assert.equal(conn.flowCredits, undefined);
+    const initial = client.connect();
+    // 客户端仍持有 2 条未处理完的事件，只授予窗口剩余部分。
+    assert.equal(initial, 2);
+    grantFlowCredits(conn, initial, client.window);
+    assert.equal(conn.flowCredits, client.outstanding);
+
+    while (dispatch(conn, client)) {
+      // 耗尽新连接的额度。
+    }
+    assert.equal(client.held, 4);
+    assert.equal(conn.flowCredits, 0);
+    assert.equal(client.outstanding, 0);
+  });
+});
@@ -0,0 +1,41 @@
+// 单个连接可累积的事件额度上限，防止异常客户端授予无限额度。
+export const MAX_FLOW_CREDITS = 1024;
+
+/**
+ * 单个连接的事件额度（flow.credit，协议 v4）。
+ * 额度随连接存在：重连后的新连接在客户端首次授予前不启用流控，旧连接未用完的额度不继承。
+ */
+export type FlowCreditState = {
+  /** 剩余额度；undefined 表示客户端尚未授予（未启用流控），事件不受额度限制。 */
+  flowCredits?: number;
+  /** 客户端声明的额度窗口（flow.credit payload.window）；剩余额度不超过该值。 */
+  flowWindow?: number;
+};
+
+function toNonNegativeInt(value: unknown): number {
+  const n = Number(value);
+  return Number.isFinite(n) ? Math.max(0, Math.floor(n)) : 0;
+}
+
+/** 累加客户端授予的额度，返回新的剩余额度。首次授予即对该连接启用流控。 */
+export function grantFlowCredits(state: FlowCreditState, credits: unknown, window?: unknown): number {
+  const declaredWindow = toNonNegativeInt(window);
+  if (declaredWindow > 0) state.flowWindow = declaredWindow;
+  const cap = Math.min(MAX_FLOW_CREDITS, state.flowWindow ?? MAX_FLOW_CREDITS);
+  state.flowCredits = Math.min(cap, (state.flowCredits ?? 0) + toNonNegativeInt(credits));
+  return state.flowCredits;
+}
+
+/** 当前是否允许再下发一条事件。 */
+export function hasFlowCredit(state: FlowCreditState): boolean {
+  return state.flowCredits === undefined || state.flowCredits > 0;
+}
+
+/**
+ * 一条世界事件帧已写出：消耗 1 个额度（未启用流控时不变）。
+ * ACK 超时后的重传同样消耗额度：客户端对收到的每一帧（含已持有事件的重传副本）都扣减额度，
+ * 丢弃重复副本时再归还，双方按帧计数才能保持一致。
+ */
+export function consumeFlowCredit(state: FlowCreditState): void {
+  if (state.flowCredits !== undefined && state.flowCredits > 0) state.flowCredits -= 1;
+}
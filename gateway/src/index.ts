@@ -67,6 +67,7 @@ const commandRouter = new CommandRouter({
   connections,
   worldEventQueues: queues,
   worldEventDispatcher: dispatcher,
+  acceptedCommands: new IdempotencyCache(5000),
   send: (conn, msg) => {
     try {
       conn.socket.send(JSON.stringify(msg));
@@ -68,6 +68,17 @@ export const eventsDroppedTotal = new Counter({
   labelNames: ['type', 'priority', 'reason'] as const,
 });
 
+export const flowCreditsAvailable = new Gauge({
+  name: 'gateway_flow_credits_available',
+  help: 'Event credits granted by the client and not yet consumed',
+  labelNames: ['agent_id'] as const,
+});
+
+export const eventsFlowBlockedTotal = new Counter({
+  name: 'gateway_events_flow_blocked_total',
+  help: 'Dispatch attempts deferred because the client had no event credits',
+});
+
 export const queueDepth = new Gauge({
   name: 'gateway_queue_depth',
   help: 'Queue depth per agent and priority',
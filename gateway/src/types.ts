@@ -296,6 +296,8 @@ export type CommandAck = {
     ackSemantics: 'queued';
     reason?: string;
     inputId?: string;
+    /** 重放的命令此前已受理，本次未重复执行 */
+    duplicate?: boolean;
   };
 };
 
@@ -303,7 +305,17 @@ export type EventAck = {
   type: 'event.ack';
   id: string;
   timestamp: number;
-  payload: { eventId: string };
+  /** eventIds（批量 ACK）需协商协议版本 >= 2 */
+  payload: { eventId?: string; eventIds?: string[] };
+};
+
+/** 协议 v4：客户端按处理进度授予事件额度（增量），每下发一条世界事件消耗 1。 */
+export type FlowCreditMessage = {
+  type: 'flow.credit';
+  id: string;
+  timestamp: number;
+  /** window：客户端的额度窗口（可选），Gateway 据此限制累积额度。 */
+  payload: { credits: number; window?: number };
 };
 
 export type PingMessage = { type: 'ping'; id: string; timestamp: number; payload: {} };
@@ -360,6 +372,7 @@ export type WsInboundMessage =
   | RespondRelationshipCommand
   | CommandBatchMessage
   | EventAck
+  | FlowCreditMessage
   | PongMessage;
 
 export type ConnectionState = 'connecting' | 'authenticated' | 'closing' | 'closed';
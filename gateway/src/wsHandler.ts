@@ -285,6 +285,22 @@ export function registerWsRoutes<TEvent extends WsWorldEventBase<string, any>>(
           if (type === 'event.ack') {
             const eventId = String(parsed?.payload?.eventId ?? '');
             if (eventId) deps.dispatcher.onAck(session.agentId, eventId);
+            // Protocol v2: batched ACK carrying a list of event ids.
+            const eventIds = parsed?.payload?.eventIds;
+            if (Array.isArray(eventIds)) {
+              for (const raw of eventIds) {
+                const id = String(raw ?? '');
+                if (id) deps.dispatcher.onAck(session.agentId, id);
+              }
+            }
+            return;
+          }
+
+          if (type === 'flow.credit') {
+            // Protocol v4: client grants additional event credits as it drains its backlog.
+            if (session.negotiatedVersion >= 4) {
+              deps.dispatcher.onCredit(session.agentId, parsed?.payload?.credits, parsed?.payload?.window);
+            }
             return;
           }
 